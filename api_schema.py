@@ -0,0 +1,218 @@
+"""Precompiled request schemas for the JSON inference endpoints.
+
+A ``RecordSchema`` is built once at import from its ``Field`` list. ``validate``
+turns a list of records (JSON objects, or positional arrays for schemas that
+allow them) into one column per field: each column is pulled out with a
+single list comprehension, then numbers are type-, finiteness- and
+range-checked with NumPy, so a 10k-record payload never loops in Python per
+value. Problems are reported per record index and field, capped at
+``MAX_ERRORS``.
+"""
+import numpy as np
+
+MAX_ERRORS = 20
+_NUMBER_TYPES = frozenset((int, float))
+
+
+def _fits_float(value):
+    try:
+        float(value)
+    except OverflowError:
+        return False
+    return True
+
+
+class SchemaError(ValueError):
+    """Raised with ``errors``: a list of ``{'index', 'field', 'error'}`` dicts."""
+
+    def __init__(self, errors):
+        self.errors = errors[:MAX_ERRORS]
+        summary = '; '.join(
+            e['error'] if e['index'] is None else
+            f"record {e['index']}: {e['error']}" if e['field'] is None else
+            f"record {e['index']}: {e['field']} {e['error']}"
+            for e in self.errors[:3]
+        )
+        super().__init__(summary)
+
+
+class Field:
+    def __init__(self, name, kind='number', required=True, default=None, minimum=None, maximum=None,
+                 alias=None, max_length=64):
+        if kind not in ('number', 'string'):
+            raise ValueError(f"Unknown field kind {kind!r}")
+        self.name = name
+        self.kind = kind
+        self.required = required
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.alias = alias
+        self.max_length = max_length
+
+    def describe_range(self):
+        if self.minimum is not None and self.maximum is not None:
+            return f'must be between {self.minimum} and {self.maximum}'
+        if self.minimum is not None:
+            return f'must be at least {self.minimum}'
+        return f'must be at most {self.maximum}'
+
+    def _error(self, errors, indices, message):
+        for index in indices:
+            if len(errors) >= MAX_ERRORS:
+                return
+            errors.append({'index': int(index), 'field': self.name, 'error': message})
+
+    def convert(self, values, errors):
+        """Validate one column; returns a float64 array (NaN for absent optional numbers) or a list of str."""
+        if self.kind == 'number':
+            return self._convert_number(values, errors)
+        return self._convert_string(values, errors)
+
+    def _convert_number(self, values, errors):
+        present = np.ones(len(values), dtype=bool)
+        if None in values:
+            present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+            if self.required:
+                self._error(errors, np.flatnonzero(~present), 'is required')
+            fill = np.nan if self.default is None else self.default
+            values = [fill if v is None else v for v in values]
+        # bool is an int subclass but not a JSON number, so compare exact types
+        if not _NUMBER_TYPES.issuperset(map(type, values)):
+            bad = [i for i, v in enumerate(values) if type(v) not in _NUMBER_TYPES]
+            self._error(errors, bad, 'must be a number')
+            present[bad] = False
+            values = [v if type(v) in _NUMBER_TYPES else np.nan for v in values]
+
+        try:
+            column = np.array(values, dtype=float)
+        except OverflowError:
+            # A JSON integer beyond float range; rare, so only then look at values one by one
+            bad = [i for i, v in enumerate(values) if type(v) is int and not _fits_float(v)]
+            self._error(errors, bad, 'must be a number')
+            present[bad] = False
+            bad = frozenset(bad)
+            column = np.array([np.nan if i in bad else v for i, v in enumerate(values)], dtype=float)
+        invalid = ~np.isfinite(column) & present
+        if self.minimum is not None:
+            invalid |= present & (column < self.minimum)
+        if self.maximum is not None:
+            invalid |= present & (column > self.maximum)
+        if invalid.any():
+            self._error(errors, np.flatnonzero(invalid), self.describe_range())
+        return column
+
+    def _convert_string(self, values, errors):
+        missing = frozenset()
+        if None in values:
+            missing = frozenset(i for i, v in enumerate(values) if v is None)
+            if self.required:
+                self._error(errors, sorted(missing), 'is required')
+            fill = '' if self.default is None else self.default
+            values = [fill if v is None else v for v in values]
+        if not all(type(v) is str for v in values):
+            wrong_type = [i for i, v in enumerate(values) if type(v) is not str]
+            self._error(errors, wrong_type, 'must be a string')
+            # Blanked below, but already reported, so not again as empty
+            missing = missing | frozenset(wrong_type)
+            values = [v if type(v) is str else '' for v in values]
+        if self.max_length is not None and max(map(len, values), default=0) > self.max_length:
+            self._error(
+                errors, (i for i, v in enumerate(values) if len(v) > self.max_length),
+                f'must be at most {self.max_length} characters',
+            )
+        if self.required and not all(values):
+            self._error(errors, (i for i, v in enumerate(values) if not v and i not in missing), 'must not be empty')
+        return values
+
+
+class RecordSchema:
+    """Validate a list of records against a fixed set of fields."""
+
+    def __init__(self, fields, positional=False):
+        self.fields = list(fields)
+        self.names = [field.name for field in self.fields]
+        # Positional rows list the fields in declaration order, e.g. [N, P, K, ...]
+        self.positional = positional
+
+    def _as_row(self, record):
+        return [
+            record[field.name] if field.name in record else record.get(field.alias)
+            for field in self.fields
+        ]
+
+    def _column(self, field, position, records, as_rows):
+        if as_rows:
+            return [row[position] for row in records]
+        name, alias = field.name, field.alias
+        if alias is None:
+            return [record.get(name) for record in records]
+        return [record[name] if name in record else record.get(alias) for record in records]
+
+    def validate(self, records):
+        """Return ``{field: column}`` for ``records``; raises SchemaError listing what is wrong."""
+        if not isinstance(records, list) or not records:
+            raise SchemaError([{'index': None, 'field': None, 'error': 'records must be a non-empty list'}])
+
+        record_types = set(map(type, records))
+        if self.positional and record_types == {dict, list}:
+            # Mixed batches are normalised to rows; uniform batches skip this pass
+            records = [self._as_row(record) if type(record) is dict else record for record in records]
+            record_types = {list}
+        as_rows = self.positional and record_types == {list}
+        if as_rows:
+            wrong_length = [i for i, row in enumerate(records) if len(row) != len(self.fields)]
+            if wrong_length:
+                raise SchemaError([
+                    {'index': i, 'field': None, 'error': f'must have {len(self.fields)} values'}
+                    for i in wrong_length[:MAX_ERRORS]
+                ])
+        elif record_types != {dict}:
+            allowed = (dict, list) if self.positional else (dict,)
+            expected = 'an object or an array' if self.positional else 'an object'
+            raise SchemaError([
+                {'index': i, 'field': None, 'error': f'must be {expected}'}
+                for i, record in enumerate(records) if type(record) not in allowed
+            ][:MAX_ERRORS])
+
+        errors = []
+        columns = {}
+        for position, field in enumerate(self.fields):
+            columns[field.name] = field.convert(self._column(field, position, records, as_rows), errors)
+        if errors:
+            errors.sort(key=lambda e: e['index'])
+            raise SchemaError(errors)
+        return columns
+
+
+CROP_RECORD = RecordSchema(
+    [
+        Field('N', minimum=0, maximum=1000),
+        Field('P', minimum=0, maximum=1000),
+        Field('K', minimum=0, maximum=1000),
+        Field('temperature', minimum=-50, maximum=70),
+        Field('humidity', minimum=0, maximum=100),
+        Field('ph', minimum=0, maximum=14, alias='pH'),
+        Field('rainfall', minimum=0, maximum=10000),
+    ],
+    positional=True,
+)
+
+# crop_type may be left out, in which case pH and soil_moisture are needed to predict it
+FERTILIZER_RECORD = RecordSchema([
+    Field('crop_type', kind='string', required=False),
+    Field('N', minimum=0, maximum=1000),
+    Field('P', minimum=0, maximum=1000),
+    Field('K', minimum=0, maximum=1000),
+    Field('soil_type', kind='string', required=False),
+    Field('pH', required=False, minimum=0, maximum=14, alias='ph'),
+    Field('soil_moisture', required=False, minimum=0, maximum=100),
+])
+
+IRRIGATION_RECORD = RecordSchema([
+    Field('crop_type', kind='string'),
+    Field('soil_type', kind='string', required=False),
+    Field('area', minimum=0, maximum=1_000_000),
+    Field('temperature', minimum=-50, maximum=70),
+    Field('humidity', minimum=0, maximum=100),
+])
@@ -11,21 +11,370 @@ This project is a collaborative effort by CSBS Team 10 for
 educational and research purposes in smart agriculture.
 """
 
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify, g, Response
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from contextlib import nullcontext
 from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from sqlalchemy.exc import OperationalError
+import gc
 import json
 import os
+import time
+
+import numpy as np
 
 from config import app, db, login_manager
-from models import User, CropPrediction, IrrigationSchedule, FertilizerRecommendation
-from ml_models import CropPredictor, FertilizerRecommender, IrrigationScheduler
+from models import User, CropPrediction, IrrigationSchedule, FertilizerRecommendation, create_indexes
+from ml_models import (
+    CropPredictor,
+    FertilizerCropClassifier,
+    FertilizerRecommender,
+    IrrigationScheduler,
+    PredictionCache,
+)
+from inference_batcher import BatchedCropPredictor, BatchedFertilizerCropClassifier
+from model_registry import ModelRegistry, ModelNotReadyError
+from write_behind import WriteBehindBuffer
+from dashboard_cache import DashboardCache, LRUBackend, RedisBackend
+from api_schema import CROP_RECORD, FERTILIZER_RECORD, IRRIGATION_RECORD, SchemaError
+import instrumentation
+from instrumentation import stage
+
+try:
+    import orjson
+except ImportError:  # optional; JSON falls back to Flask's encoder
+    orjson = None
+
+
+def compiled_model_path(name):
+    if app.config['MODEL_ENGINE'] != 'compiled':
+        return None
+    return os.path.join(app.instance_path, name)
+
+
+def prediction_cache(feature_columns):
+    if not app.config['PREDICTION_CACHE']:
+        return None
+    return PredictionCache(
+        feature_columns,
+        steps=app.config['PREDICTION_CACHE_STEPS'],
+        max_entries=app.config['PREDICTION_CACHE_MAX_ENTRIES'],
+    )
+
+
+def build_crop_predictor():
+    predictor = CropPredictor(
+        allow_train=app.config['ALLOW_WEB_TRAINING'],
+        compiled_path=compiled_model_path('crop_trees'),
+        cache=prediction_cache(['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']),
+        reload_interval=app.config['MODEL_RELOAD_INTERVAL'],
+    )
+    # Optionally coalesce concurrent single-row predictions into batched model calls
+    if app.config['INFERENCE_BATCHING']:
+        predictor = BatchedCropPredictor(
+            predictor,
+            max_batch_size=app.config['INFERENCE_BATCH_MAX_SIZE'],
+            max_wait_ms=app.config['INFERENCE_BATCH_WAIT_MS'],
+        )
+    return predictor
+
+
+def build_fertilizer_recommender():
+    classifier = FertilizerCropClassifier(
+        allow_train=app.config['ALLOW_WEB_TRAINING'],
+        compiled_path=compiled_model_path('fertilizer_trees'),
+        cache=prediction_cache(['N', 'P', 'K', 'pH', 'soil_moisture']),
+        reload_interval=app.config['MODEL_RELOAD_INTERVAL'],
+    )
+    recommender = FertilizerRecommender(crop_classifier=classifier)
+    if app.config['INFERENCE_BATCHING']:
+        recommender.crop_classifier = BatchedFertilizerCropClassifier(
+            recommender.crop_classifier,
+            max_batch_size=app.config['INFERENCE_BATCH_MAX_SIZE'],
+            max_wait_ms=app.config['INFERENCE_BATCH_WAIT_MS'],
+        )
+    return recommender
+
+
+def insert_rows(batches):
+    """Bulk-insert ``{model: [row, ...]}`` in one transaction, then fold the rows into cached dashboards."""
+    if dashboard_cache is None:
+        writing = nullcontext()
+    else:
+        writing = dashboard_cache.writing(row['user_id'] for rows in batches.values() for row in rows)
+    with writing, app.app_context():
+        committed = {}
+        try:
+            for model, rows in batches.items():
+                if dashboard_cache is None:
+                    db.session.execute(insert(model), rows)
+                else:
+                    # RETURNING hands back stored rows (ids, defaults) shaped like the dashboard loader's
+                    inserted = db.session.scalars(insert(model).returning(model), rows)
+                    committed[model] = [row_to_dict(row) for row in inserted]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        for model, rows in committed.items():
+            dashboard_cache.record(model.__tablename__, rows)
+
+
+write_behind = None
+if app.config['WRITE_BEHIND']:
+    write_behind = WriteBehindBuffer(
+        insert_rows,
+        max_batch_size=app.config['WRITE_BEHIND_BATCH_SIZE'],
+        flush_interval_ms=app.config['WRITE_BEHIND_INTERVAL_MS'],
+        max_pending=app.config['WRITE_BEHIND_MAX_PENDING'],
+    )
+
+
+def init_db():
+    """Create missing tables and history indexes; runs on every start, under any server."""
+    with app.app_context():
+        try:
+            db.create_all()
+            create_indexes()
+        except OperationalError:
+            # Another worker created the same table or index first; the retry finds it
+            db.create_all()
+            create_indexes()
+
+
+init_db()
+
+
+def row_to_dict(row):
+    return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+
+def query_recent(model, order_column, user_id, limit=5):
+    rows = model.query.filter_by(user_id=user_id).order_by(order_column.desc(), model.id.desc()).limit(limit).all()
+    return [row_to_dict(row) for row in rows]
+
+
+def query_crop_counts(user_id):
+    # Count in SQL; ordering by first occurrence keeps the chart's label order stable
+    counts = (
+        db.session.query(CropPrediction.predicted_crop, func.count(CropPrediction.id))
+        .filter(CropPrediction.user_id == user_id)
+        .group_by(CropPrediction.predicted_crop)
+        .order_by(func.min(CropPrediction.id))
+        .all()
+    )
+    return dict(counts)
+
+
+def query_irrigation_series(user_id, limit=30):
+    rows = (
+        IrrigationSchedule.query.with_entities(IrrigationSchedule.schedule_date, IrrigationSchedule.water_amount)
+        .filter_by(user_id=user_id)
+        .order_by(IrrigationSchedule.schedule_date, IrrigationSchedule.id)
+        .limit(limit)
+        .all()
+    )
+    return [{'schedule_date': schedule_date, 'water_amount': water_amount} for schedule_date, water_amount in rows]
+
+
+def load_dashboard_aggregates(user_id):
+    """Everything /dashboard and its chart endpoints show for one user."""
+    return {
+        'recent_predictions': query_recent(CropPrediction, CropPrediction.created_at, user_id),
+        'recent_schedules': query_recent(IrrigationSchedule, IrrigationSchedule.schedule_date, user_id),
+        'recent_recommendations': query_recent(FertilizerRecommendation, FertilizerRecommendation.created_at, user_id),
+        'crop_counts': query_crop_counts(user_id),
+        'irrigation_series': query_irrigation_series(user_id),
+    }
+
+
+def dashboard_cache_backend():
+    if app.config['DASHBOARD_CACHE_BACKEND'] == 'redis':
+        import redis
+        return RedisBackend(
+            redis.Redis.from_url(app.config['REDIS_URL']),
+            ttl_seconds=app.config['DASHBOARD_CACHE_TTL'],
+        )
+    return LRUBackend(
+        max_entries=app.config['DASHBOARD_CACHE_MAX_ENTRIES'],
+        ttl_seconds=app.config['DASHBOARD_CACHE_TTL'],
+    )
+
+
+dashboard_cache = None
+if app.config['DASHBOARD_CACHE']:
+    dashboard_cache = DashboardCache(load_dashboard_aggregates, backend=dashboard_cache_backend())
+
+
+def save_history(model, rows):
+    """Persist history rows now, or hand them to the write-behind buffer when enabled."""
+    # Stamp rows here so buffered rows keep their request time rather than their flush time
+    now = datetime.utcnow()
+    rows = [dict(row, created_at=row.get('created_at', now)) for row in rows]
+    if write_behind is not None:
+        write_behind.add(model, rows)
+    else:
+        insert_rows({model: rows})
+
+
+def save_irrigation_schedules(user_id, fields, scheduler):
+    """Bulk-insert one IrrigationSchedule row per irrigation event of every field."""
+    plan = scheduler.schedule_arrays(
+        [field['crop_type'] for field in fields],
+        [field['soil_type'] for field in fields],
+        [field['area'] for field in fields],
+        [field['temperature'] for field in fields],
+        [field['humidity'] for field in fields],
+    )
+    now = datetime.now()
+    schedule_dates = [now + timedelta(days=day) for day in range(30)]
+    event_field = plan['event_field'].tolist()
+    water_amounts = plan['water_amount'][plan['event_field']].tolist()
+    durations = plan['duration'][plan['event_field']].tolist()
+    rows = [
+        {
+            'user_id': user_id,
+            'crop_type': fields[i]['crop_type'],
+            'soil_type': fields[i]['soil_type'],
+            'area': fields[i]['area'],
+            'schedule_date': schedule_dates[day],
+            'water_amount': water,
+            'duration': duration,
+        }
+        for i, day, water, duration in zip(event_field, plan['event_day'].tolist(), water_amounts, durations)
+    ]
+    if rows:
+        save_history(IrrigationSchedule, rows)
+    return len(rows)
+
+
+def use_orjson():
+    return orjson is not None and app.config['JSON_ORJSON']
+
+
+def parse_json(body):
+    """Parse a request body as a JSON object; returns None when it is missing or malformed."""
+    try:
+        data = orjson.loads(body) if use_orjson() else json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def dump_json(payload):
+    """Compact JSON bytes, encoded by orjson when it is installed and JSON_ORJSON is on."""
+    if use_orjson():
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return app.json.dumps(payload, separators=(',', ':')).encode()
+
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype='application/json')
+
+
+def error_body(message, status, **extra):
+    return dump_json({'success': False, 'message': message, **extra}), status
+
+
+def validate_records(data, key, schema, max_rows):
+    """Validate ``data[key]`` against ``schema``; returns ``(columns, None)`` or ``(None, (body, status))``."""
+    if data is None:
+        return None, error_body('Request body must be a JSON object', 400)
+    records = data.get(key)
+    if isinstance(records, list) and len(records) > max_rows:
+        return None, error_body(f'At most {max_rows} {key} are allowed per batch', 413)
+    try:
+        return schema.validate(records), None
+    except SchemaError as e:
+        return None, error_body(f'Invalid {key}: {e}', 400, errors=e.errors)
+
+
+def read_option(data, name, default, kind):
+    """Return ``data[name]`` (or ``default``) if it is exactly of type ``kind``, else None."""
+    value = data.get(name, default)
+    return value if type(value) is kind else None
+
+
+# ML models are loaded lazily so worker boot never waits on joblib loads or training
+model_registry = ModelRegistry(load_timeout=app.config['MODEL_LOAD_TIMEOUT'])
+model_registry.register(
+    'crop_predictor',
+    build_crop_predictor,
+    warmup=lambda predictor: predictor.predict(90, 42, 43, 20.8, 82.0, 6.5, 202.0),
+)
+model_registry.register(
+    'fertilizer_recommender',
+    build_fertilizer_recommender,
+    warmup=lambda recommender: recommender.recommend_from_soil(80, 40, 40, 6.5, 50, 'loamy'),
+)
+model_registry.register('irrigation_scheduler', IrrigationScheduler)
 
-# Initialize ML models
-crop_predictor = CropPredictor()
-fertilizer_recommender = FertilizerRecommender()
-irrigation_scheduler = IrrigationScheduler()
+if app.config['MODEL_PRELOAD']:
+    # Loaded once in the gunicorn master (preload_app) so forked workers share the pages;
+    # no warmup thread here, since threads do not survive fork
+    model_registry.load_all()
+    gc.collect()
+elif app.config['MODEL_WARMUP']:
+    model_registry.warmup_async()
+
+def collect_model_metrics():
+    """Scrape-time view of cache, batching, write-behind and model readiness counters."""
+    caches, batchers = [], []
+    for name, attr in (('crop_predictor', None), ('fertilizer_recommender', 'crop_classifier')):
+        if not model_registry.is_loaded(name):
+            continue
+        model = model_registry.get(name)
+        model = getattr(model, attr) if attr else model
+        if model.cache is not None:
+            caches.append((name, model.cache.stats()))
+        if app.config['INFERENCE_BATCHING']:
+            batchers.append((name, model.batcher.stats()))
+
+    yield ('agrismart_prediction_cache_hits_total', 'counter', 'Prediction cache hits',
+           [({'model': name}, stats['hits']) for name, stats in caches])
+    yield ('agrismart_prediction_cache_misses_total', 'counter', 'Prediction cache misses',
+           [({'model': name}, stats['misses']) for name, stats in caches])
+    yield ('agrismart_prediction_cache_entries', 'gauge', 'Prediction cache entries',
+           [({'model': name}, stats['entries']) for name, stats in caches])
+    yield ('agrismart_batcher_batches_total', 'counter', 'Micro-batches run',
+           [({'model': name}, stats['batches']) for name, stats in batchers])
+    yield ('agrismart_batcher_requests_total', 'counter', 'Requests served through micro-batches',
+           [({'model': name}, stats['requests']) for name, stats in batchers])
+    yield ('agrismart_batcher_queue_depth', 'gauge', 'Requests waiting for a micro-batch',
+           [({'model': name}, stats['queue_depth']) for name, stats in batchers])
+    yield ('agrismart_model_ready', 'gauge', 'Whether each model is loaded',
+           [({'model': name}, int(info['state'] == 'ready'))
+            for name, info in model_registry.readiness()['models'].items()])
+    if write_behind is not None:
+        stats = write_behind.stats()
+        yield ('agrismart_write_behind_depth', 'gauge', 'Rows waiting to be flushed', [({}, stats['depth'])])
+        yield ('agrismart_write_behind_flushed_rows_total', 'counter', 'Rows flushed', [({}, stats['flushed_rows'])])
+        yield ('agrismart_write_behind_dropped_rows_total', 'counter', 'Rows dropped after failed flushes',
+               [({}, stats['dropped_rows'])])
+    if dashboard_cache is not None:
+        stats = dashboard_cache.stats()
+        yield ('agrismart_dashboard_cache_hits_total', 'counter', 'Dashboard cache hits', [({}, stats['hits'])])
+        yield ('agrismart_dashboard_cache_misses_total', 'counter', 'Dashboard cache misses', [({}, stats['misses'])])
+
+
+if app.config['METRICS_ENABLED']:
+    instrumentation.enable()
+    instrumentation.REGISTRY.register_collector(collect_model_metrics)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            instrumentation.REQUEST_SECONDS.observe(
+                time.perf_counter() - started, request.endpoint or 'unknown', request.method, response.status_code
+            )
+        return response
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -93,9 +442,15 @@ def logout():
 @login_required
 def dashboard():
     # Get user's recent activities
-    recent_predictions = CropPrediction.query.filter_by(user_id=current_user.id).order_by(CropPrediction.created_at.desc()).limit(5).all()  # type: ignore
-    irrigation_schedules = IrrigationSchedule.query.filter_by(user_id=current_user.id).order_by(IrrigationSchedule.schedule_date.desc()).limit(5).all()  # type: ignore
-    fertilizer_recs = FertilizerRecommendation.query.filter_by(user_id=current_user.id).order_by(FertilizerRecommendation.created_at.desc()).limit(5).all()  # type: ignore
+    if dashboard_cache is not None:
+        aggregates = dashboard_cache.get(current_user.id)
+        recent_predictions = aggregates['recent_predictions']
+        irrigation_schedules = aggregates['recent_schedules']
+        fertilizer_recs = aggregates['recent_recommendations']
+    else:
+        recent_predictions = query_recent(CropPrediction, CropPrediction.created_at, current_user.id)
+        irrigation_schedules = query_recent(IrrigationSchedule, IrrigationSchedule.schedule_date, current_user.id)
+        fertilizer_recs = query_recent(FertilizerRecommendation, FertilizerRecommendation.created_at, current_user.id)
     
     return render_template('dashboard.html', 
                         predictions=recent_predictions,
@@ -108,35 +463,38 @@ def crop_prediction():
     if request.method == 'POST':
         try:
             # Get form data
-            nitrogen = float(request.form.get('nitrogen') or 0)
-            phosphorus = float(request.form.get('phosphorus') or 0)
-            potassium = float(request.form.get('potassium') or 0)
-            temperature = float(request.form.get('temperature') or 0)
-            humidity = float(request.form.get('humidity') or 0)
-            ph = float(request.form.get('ph') or 0)
-            rainfall = float(request.form.get('rainfall') or 0)
+            with stage('crop_prediction', 'parse'):
+                nitrogen = float(request.form.get('nitrogen') or 0)
+                phosphorus = float(request.form.get('phosphorus') or 0)
+                potassium = float(request.form.get('potassium') or 0)
+                temperature = float(request.form.get('temperature') or 0)
+                humidity = float(request.form.get('humidity') or 0)
+                ph = float(request.form.get('ph') or 0)
+                rainfall = float(request.form.get('rainfall') or 0)
             
             # Predict crop
-            prediction = crop_predictor.predict(nitrogen, phosphorus, potassium, 
-                                            temperature, humidity, ph, rainfall)
+            with stage('crop_prediction', 'predict'):
+                crop_predictor = model_registry.get('crop_predictor')
+                prediction = crop_predictor.predict(nitrogen, phosphorus, potassium, 
+                                                temperature, humidity, ph, rainfall)
             
             # Save prediction
-            new_prediction = CropPrediction(
-                user_id=current_user.id, # type: ignore
-                nitrogen=nitrogen,
-                phosphorus=phosphorus,
-                potassium=potassium,
-                temperature=temperature,
-                humidity=humidity,
-                ph=ph,
-                rainfall=rainfall,
-                predicted_crop=prediction['crop'],
-                confidence=prediction['confidence']
-            )
-            db.session.add(new_prediction)
-            db.session.commit()
+            with stage('crop_prediction', 'persist'):
+                save_history(CropPrediction, [{
+                    'user_id': current_user.id,
+                    'nitrogen': nitrogen,
+                    'phosphorus': phosphorus,
+                    'potassium': potassium,
+                    'temperature': temperature,
+                    'humidity': humidity,
+                    'ph': ph,
+                    'rainfall': rainfall,
+                    'predicted_crop': prediction['crop'],
+                    'confidence': prediction['confidence']
+                }])
             
-            return render_template('crop_prediction.html', prediction=prediction)
+            with stage('crop_prediction', 'render'):
+                return render_template('crop_prediction.html', prediction=prediction)
         except Exception as e:
             flash(f'Error: {str(e)}')
             return render_template('crop_prediction.html')
@@ -149,45 +507,49 @@ def fertilizer_recommendation():
     if request.method == 'POST':
         try:
             # Get form data
-            crop_type = request.form.get('crop_type', '')
-            nitrogen = float(request.form.get('nitrogen') or 0)
-            phosphorus = float(request.form.get('phosphorus') or 0)
-            potassium = float(request.form.get('potassium') or 0)
-            soil_type = request.form.get('soil_type', '')
-            ph = float(request.form.get('ph') or 0)
-            soil_moisture = float(request.form.get('soil_moisture') or 0)
+            with stage('fertilizer_recommendation', 'parse'):
+                crop_type = request.form.get('crop_type', '')
+                nitrogen = float(request.form.get('nitrogen') or 0)
+                phosphorus = float(request.form.get('phosphorus') or 0)
+                potassium = float(request.form.get('potassium') or 0)
+                soil_type = request.form.get('soil_type', '')
+                ph = float(request.form.get('ph') or 0)
+                soil_moisture = float(request.form.get('soil_moisture') or 0)
             
-            # If crop_type not provided, infer crop from soil stats using XGBoost model
-            if crop_type:
-                recommendation = fertilizer_recommender.recommend(
-                    crop_type, nitrogen, phosphorus, potassium, soil_type
-                )
-                recommendation['predicted_crop'] = crop_type
-                recommendation['prediction_confidence'] = None
-                recommendation['prediction_candidates'] = None
-                recommendation['target_levels'] = None
-            else:
-                recommendation = fertilizer_recommender.recommend_from_soil(
-                    nitrogen, phosphorus, potassium, ph, soil_moisture, soil_type
-                )
-                crop_type = recommendation['predicted_crop']
+            with stage('fertilizer_recommendation', 'predict'):
+                fertilizer_recommender = model_registry.get('fertilizer_recommender')
+                
+                # If crop_type not provided, infer crop from soil stats using XGBoost model
+                if crop_type:
+                    recommendation = fertilizer_recommender.recommend(
+                        crop_type, nitrogen, phosphorus, potassium, soil_type
+                    )
+                    recommendation['predicted_crop'] = crop_type
+                    recommendation['prediction_confidence'] = None
+                    recommendation['prediction_candidates'] = None
+                    recommendation['target_levels'] = None
+                else:
+                    recommendation = fertilizer_recommender.recommend_from_soil(
+                        nitrogen, phosphorus, potassium, ph, soil_moisture, soil_type
+                    )
+                    crop_type = recommendation['predicted_crop']
             
             # Save recommendation
-            new_rec = FertilizerRecommendation(
-                user_id=current_user.id,
-                crop_type=crop_type,
-                nitrogen=nitrogen,
-                phosphorus=phosphorus,
-                potassium=potassium,
-                soil_type=soil_type,
-                fertilizer_name=recommendation['fertilizer'],
-                npk_ratio=recommendation['npk_ratio'],
-                application_rate=recommendation['application_rate']
-            )
-            db.session.add(new_rec)
-            db.session.commit()
+            with stage('fertilizer_recommendation', 'persist'):
+                save_history(FertilizerRecommendation, [{
+                    'user_id': current_user.id,
+                    'crop_type': crop_type,
+                    'nitrogen': nitrogen,
+                    'phosphorus': phosphorus,
+                    'potassium': potassium,
+                    'soil_type': soil_type,
+                    'fertilizer_name': recommendation['fertilizer'],
+                    'npk_ratio': recommendation['npk_ratio'],
+                    'application_rate': recommendation['application_rate']
+                }])
             
-            return render_template('fertilizer_recommendation.html', recommendation=recommendation)
+            with stage('fertilizer_recommendation', 'render'):
+                return render_template('fertilizer_recommendation.html', recommendation=recommendation)
         except Exception as e:
             flash(f'Error: {str(e)}')
             return render_template('fertilizer_recommendation.html')
@@ -200,48 +562,282 @@ def irrigation_scheduling():
     if request.method == 'POST':
         try:
             # Get form data
-            crop_type = request.form.get('crop_type', '')
-            soil_type = request.form.get('soil_type', '')
-            area = float(request.form.get('area') or 0)
-            temperature = float(request.form.get('temperature') or 0)
-            humidity = float(request.form.get('humidity') or 0)
+            with stage('irrigation_scheduling', 'parse'):
+                crop_type = request.form.get('crop_type', '')
+                soil_type = request.form.get('soil_type', '')
+                area = float(request.form.get('area') or 0)
+                temperature = float(request.form.get('temperature') or 0)
+                humidity = float(request.form.get('humidity') or 0)
             
             # Get irrigation schedule
-            schedule = irrigation_scheduler.create_schedule(
-                crop_type, soil_type, area, temperature, humidity
-            )
-            
-            # Save schedules
-            for item in schedule['schedule']:
-                new_schedule = IrrigationSchedule(
-                    user_id=current_user.id,
-                    crop_type=crop_type,
-                    soil_type=soil_type,
-                    area=area,
-                    schedule_date=datetime.now() + timedelta(days=item['day']),
-                    water_amount=item['water_amount'],
-                    duration=item['duration']
+            with stage('irrigation_scheduling', 'predict'):
+                irrigation_scheduler = model_registry.get('irrigation_scheduler')
+                schedule = irrigation_scheduler.create_schedule(
+                    crop_type, soil_type, area, temperature, humidity
                 )
-                db.session.add(new_schedule)
-            db.session.commit()
             
-            return render_template('irrigation_scheduling.html', schedule=schedule)
+            # Save schedules in one executemany INSERT
+            with stage('irrigation_scheduling', 'persist'):
+                save_irrigation_schedules(current_user.id, [{
+                    'crop_type': crop_type,
+                    'soil_type': soil_type,
+                    'area': area,
+                    'temperature': temperature,
+                    'humidity': humidity,
+                }], irrigation_scheduler)
+            
+            with stage('irrigation_scheduling', 'render'):
+                return render_template('irrigation_scheduling.html', schedule=schedule)
         except Exception as e:
             flash(f'Error: {str(e)}')
             return render_template('irrigation_scheduling.html')
     
     return render_template('irrigation_scheduling.html')
 
+# JSON batch handlers shared by the Flask routes below and the ASGI app in asgi.py.
+# Each takes the raw request body and the user id and returns ``(body, status)``.
+
+def irrigation_batch(body, user_id):
+    """Schedule irrigation for a whole list of fields in one request"""
+    with stage('irrigation_scheduling_batch', 'parse'):
+        data = parse_json(body)
+        columns, error = validate_records(
+            data, 'fields', IRRIGATION_RECORD, app.config['IRRIGATION_BATCH_MAX_FIELDS']
+        )
+        if error:
+            return error
+        save = read_option(data, 'save', True, bool)
+        if save is None:
+            return error_body('save must be true or false', 400)
+        names = IRRIGATION_RECORD.names
+        fields = [
+            dict(zip(names, values))
+            for values in zip(*(columns[name] if isinstance(columns[name], list) else columns[name].tolist()
+                                for name in names))
+        ]
+    
+    try:
+        irrigation_scheduler = model_registry.get('irrigation_scheduler')
+    except ModelNotReadyError as e:
+        return error_body(str(e), 503)
+    
+    with stage('irrigation_scheduling_batch', 'predict'):
+        schedules = irrigation_scheduler.create_schedules(fields)
+    
+    saved = 0
+    if save:
+        with stage('irrigation_scheduling_batch', 'persist'):
+            saved = save_irrigation_schedules(user_id, fields, irrigation_scheduler)
+    
+    with stage('irrigation_scheduling_batch', 'render'):
+        return dump_json({
+            'success': True,
+            'count': len(schedules),
+            'saved_events': saved,
+            'schedules': schedules
+        }), 200
+
+def crop_batch(body, user_id):
+    """Score many soil samples in a single model call"""
+    with stage('crop_prediction_batch', 'parse'):
+        data = parse_json(body)
+        # Records may be objects keyed by feature name or plain 7-value rows
+        columns, error = validate_records(data, 'records', CROP_RECORD, app.config['BATCH_PREDICTION_MAX_ROWS'])
+        if error:
+            return error
+        top_k = read_option(data, 'top_k', 3, int)
+        save = read_option(data, 'save', False, bool)
+        if top_k is None or top_k < 1 or save is None:
+            return error_body('top_k must be a positive integer and save must be true or false', 400)
+    
+    try:
+        crop_predictor = model_registry.get('crop_predictor')
+    except ModelNotReadyError as e:
+        return error_body(str(e), 503)
+    
+    with stage('crop_prediction_batch', 'predict'):
+        features = np.column_stack([columns[name] for name in CROP_RECORD.names])
+        predictions = crop_predictor.predict_batch(features, top_k=top_k)
+    
+    if save:
+        with stage('crop_prediction_batch', 'persist'):
+            save_history(CropPrediction, [{
+                'user_id': user_id,
+                'nitrogen': row[0],
+                'phosphorus': row[1],
+                'potassium': row[2],
+                'temperature': row[3],
+                'humidity': row[4],
+                'ph': row[5],
+                'rainfall': row[6],
+                'predicted_crop': prediction['crop'],
+                'confidence': prediction['confidence']
+            } for row, prediction in zip(features.tolist(), predictions)])
+    
+    with stage('crop_prediction_batch', 'render'):
+        return dump_json({
+            'success': True,
+            'count': len(predictions),
+            'saved': len(predictions) if save else 0,
+            'predictions': predictions
+        }), 200
+
+def fertilizer_batch(body, user_id):
+    """Plan fertilizer for many plots; plots without a crop_type get one predicted"""
+    with stage('fertilizer_recommendation_batch', 'parse'):
+        data = parse_json(body)
+        columns, error = validate_records(
+            data, 'records', FERTILIZER_RECORD, app.config['BATCH_PREDICTION_MAX_ROWS']
+        )
+        if error:
+            return error
+        save = read_option(data, 'save', False, bool)
+        if save is None:
+            return error_body('save must be true or false', 400)
+        
+        crop_types = columns['crop_type']
+        to_predict = [i for i, crop_type in enumerate(crop_types) if not crop_type]
+        soil = np.column_stack([columns[name] for name in ('N', 'P', 'K', 'pH', 'soil_moisture')])[to_predict]
+        incomplete = np.flatnonzero(np.isnan(soil[:, 3:]).any(axis=1))
+        if len(incomplete):
+            errors = [{
+                'index': to_predict[i],
+                'field': 'crop_type',
+                'error': 'is required unless pH and soil_moisture are given'
+            } for i in incomplete[:20].tolist()]
+            return error_body(
+                f"Invalid records: record {errors[0]['index']}: crop_type {errors[0]['error']}", 400, errors=errors
+            )
+    
+    try:
+        fertilizer_recommender = model_registry.get('fertilizer_recommender')
+    except ModelNotReadyError as e:
+        return error_body(str(e), 503)
+    
+    with stage('fertilizer_recommendation_batch', 'predict'):
+        predictions = {}
+        if to_predict:
+            batch = fertilizer_recommender.crop_classifier.predict_crop_batch(soil)
+            predictions = dict(zip(to_predict, batch))
+            crop_types = list(crop_types)
+            for i, prediction in predictions.items():
+                crop_types[i] = prediction['crop']
+        
+        plan = fertilizer_recommender.recommend_many(
+            crop_types, columns['N'], columns['P'], columns['K'], columns['soil_type']
+        )
+        recommendations = plan.to_dict(orient='records')
+        for i, recommendation in enumerate(recommendations):
+            prediction = predictions.get(i)
+            recommendation['predicted_crop'] = crop_types[i]
+            recommendation['prediction_confidence'] = prediction['confidence'] if prediction else None
+            recommendation['prediction_candidates'] = prediction['recommendations'] if prediction else None
+            recommendation['target_levels'] = prediction.get('target_levels', {}) if prediction else None
+    
+    if save:
+        with stage('fertilizer_recommendation_batch', 'persist'):
+            save_history(FertilizerRecommendation, [{
+                'user_id': user_id,
+                'crop_type': crop_type,
+                'nitrogen': nitrogen,
+                'phosphorus': phosphorus,
+                'potassium': potassium,
+                'soil_type': soil_type,
+                'fertilizer_name': recommendation['fertilizer'],
+                'npk_ratio': recommendation['npk_ratio'],
+                'application_rate': recommendation['application_rate']
+            } for crop_type, nitrogen, phosphorus, potassium, soil_type, recommendation in zip(
+                crop_types, columns['N'].tolist(), columns['P'].tolist(), columns['K'].tolist(),
+                columns['soil_type'], recommendations
+            )])
+    
+    with stage('fertilizer_recommendation_batch', 'render'):
+        return dump_json({
+            'success': True,
+            'count': len(recommendations),
+            'saved': len(recommendations) if save else 0,
+            'recommendations': recommendations
+        }), 200
+
+@app.route('/api/irrigation-scheduling/batch', methods=['POST'])
+@login_required
+def irrigation_scheduling_batch():
+    """API endpoint to schedule irrigation for a whole list of fields in one request"""
+    return json_response(*irrigation_batch(request.get_data(cache=False), current_user.id))
+
+@app.route('/api/crop-prediction/batch', methods=['POST'])
+@login_required
+def crop_prediction_batch():
+    """API endpoint to score many soil samples in a single model call"""
+    return json_response(*crop_batch(request.get_data(cache=False), current_user.id))
+
+@app.route('/api/fertilizer-recommendation/batch', methods=['POST'])
+@login_required
+def fertilizer_recommendation_batch():
+    """API endpoint to plan fertilizer for many plots; plots without a crop_type get one predicted"""
+    return json_response(*fertilizer_batch(request.get_data(cache=False), current_user.id))
+
+@app.route('/api/inference-stats')
+def inference_stats():
+    """API endpoint exposing micro-batching and prediction cache metrics"""
+    stats = {
+        'batching_enabled': app.config['INFERENCE_BATCHING'],
+        'cache_enabled': app.config['PREDICTION_CACHE'],
+    }
+    
+    if model_registry.is_loaded('crop_predictor'):
+        crop_predictor = model_registry.get('crop_predictor')
+        stats['crop_model_version'] = crop_predictor.version
+        if app.config['INFERENCE_BATCHING']:
+            stats['crop_prediction'] = crop_predictor.batcher.stats()
+        if crop_predictor.cache is not None:
+            stats['crop_prediction_cache'] = crop_predictor.cache.stats()
+    
+    if model_registry.is_loaded('fertilizer_recommender'):
+        classifier = model_registry.get('fertilizer_recommender').crop_classifier
+        stats['fertilizer_model_version'] = classifier.version
+        if app.config['INFERENCE_BATCHING']:
+            stats['fertilizer_classifier'] = classifier.batcher.stats()
+        if classifier.cache is not None:
+            stats['fertilizer_classifier_cache'] = classifier.cache.stats()
+    
+    return jsonify(stats)
+
+@app.route('/api/write-behind-stats')
+def write_behind_stats():
+    """API endpoint exposing write-behind buffer depth and flush latency"""
+    if write_behind is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(write_behind.stats(), enabled=True))
+
+@app.route('/api/dashboard-cache-stats')
+def dashboard_cache_stats():
+    """API endpoint exposing dashboard cache hit rate, TTL and eviction counts"""
+    if dashboard_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(dashboard_cache.stats(), enabled=True))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of request, stage and model metrics"""
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({'success': False, 'message': 'Metrics are disabled'}), 404
+    return Response(instrumentation.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz/ready')
+def healthz_ready():
+    """Readiness probe: 200 once every model is loaded and warmed up"""
+    readiness = model_registry.readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
 @app.route('/api/crop-stats')
 @login_required
 def crop_stats():
     """API endpoint for dashboard visualizations"""
-    predictions = CropPrediction.query.filter_by(user_id=current_user.id).all()
-    
-    crop_counts = {}
-    for pred in predictions:
-        crop = pred.predicted_crop
-        crop_counts[crop] = crop_counts.get(crop, 0) + 1
+    if dashboard_cache is not None:
+        crop_counts = dashboard_cache.get(current_user.id)['crop_counts']
+    else:
+        crop_counts = query_crop_counts(current_user.id)
     
     return jsonify({
         'labels': list(crop_counts.keys()),
@@ -252,10 +848,13 @@ def crop_stats():
 @login_required
 def irrigation_stats():
     """API endpoint for irrigation statistics"""
-    schedules = IrrigationSchedule.query.filter_by(user_id=current_user.id).order_by(IrrigationSchedule.schedule_date).all()  # type: ignore
+    if dashboard_cache is not None:
+        schedules = dashboard_cache.get(current_user.id)['irrigation_series']
+    else:
+        schedules = query_irrigation_series(current_user.id)
     
-    dates = [s.schedule_date.strftime('%Y-%m-%d') for s in schedules[:30]]
-    water_amounts = [s.water_amount for s in schedules[:30]]
+    dates = [s['schedule_date'].strftime('%Y-%m-%d') for s in schedules]
+    water_amounts = [s['water_amount'] for s in schedules]
     
     return jsonify({
         'dates': dates,
@@ -321,8 +920,6 @@ def auto_fill_location():
         }), 500
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     # For development only. Use a production WSGI server (e.g., Gunicorn) for production
     debug_mode = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     app.run(debug=debug_mode, host='127.0.0.1', port=5000)
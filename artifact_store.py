@@ -0,0 +1,261 @@
+"""Versioned model artifacts with checksummed manifests and atomic publication.
+
+Layout under a store root (one per model, e.g. ``instance/models/crop``)::
+
+    versions/<version>/model.ubj       native XGBoost booster (or model.joblib, a pickled payload)
+    versions/<version>/manifest.json   sha256, size, feature columns, classes, ...
+    versions/<version>/checkpoint.json incremental-training watermark (crop model only)
+    current -> versions/<version>
+
+For ``model.ubj`` versions the manifest is also the sidecar for everything the
+booster file cannot hold (classes, crop stats, sklearn parameters), and
+loading returns a ``tree_engine.NativeBooster`` rather than an unpickled
+XGBClassifier, so it does not depend on the sklearn wrapper's pickle format.
+
+``publish`` writes a version into a temporary directory, fsyncs it and renames
+it into ``versions/``; only then is ``current`` repointed by renaming a fresh
+symlink over it. Readers therefore see the old version or the new one, never
+a half-written pickle, and ``load`` re-checks the checksum before unpickling.
+
+Usage:
+    python artifact_store.py list instance/models/crop
+    python artifact_store.py activate instance/models/crop 20260101-120000-3f2a9c1d0b7e
+    python artifact_store.py prune instance/models/crop --keep 3
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+MODEL_FILES = {'ubj': 'model.ubj', 'joblib': 'model.joblib'}
+MANIFEST_FILE = 'manifest.json'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class ArtifactError(RuntimeError):
+    """Raised when a version is missing, corrupt or does not match the model's schema."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def umask():
+    """Return the process umask (it can only be read by setting it, so it is put straight back)."""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def _fsync_file(path):
+    with open(path, 'rb') as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_dir(path):
+    # Directory fsync makes renames durable; not every platform allows it
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ArtifactStore:
+    def __init__(self, root):
+        self.root = root
+        self.versions_dir = os.path.join(root, 'versions')
+        self.current_link = os.path.join(root, 'current')
+
+    def current_version(self):
+        """Return the active version name, or None when nothing has been published."""
+        try:
+            return os.path.basename(os.readlink(self.current_link))
+        except FileNotFoundError:
+            return None
+        except OSError:
+            # Platforms without symlinks keep the version name in a plain file
+            with open(self.current_link) as f:
+                return f.read().strip() or None
+
+    def versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.versions_dir)
+            if os.path.exists(os.path.join(self.versions_dir, name, MANIFEST_FILE))
+        )
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def model_file(self, version=None):
+        version = version or self.current_version()
+        if version is None:
+            return None
+        return os.path.join(self.version_dir(version), self.manifest(version)['model_file'])
+
+    def manifest(self, version):
+        path = os.path.join(self.version_dir(version), MANIFEST_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ArtifactError(f"No manifest for version {version} in {self.root}") from None
+
+    def publish(self, payload, feature_columns, classes, metadata=None, activate=True, keep=5,
+                model_format='joblib'):
+        """Write ``payload`` as a new version, make it current and return its manifest.
+
+        ``model_format='ubj'`` saves ``payload['model']``'s booster natively and
+        keeps the rest of the payload in the manifest.
+        """
+        if model_format not in MODEL_FILES:
+            raise ValueError(f"Unknown model format {model_format!r}; expected one of {sorted(MODEL_FILES)}")
+        os.makedirs(self.versions_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.versions_dir, prefix='.staging-')
+        try:
+            # mkdtemp creates 0700 directories; workers running as another user must read versions
+            os.chmod(staging, 0o777 & ~umask())
+            model_path = os.path.join(staging, MODEL_FILES[model_format])
+            sidecar = {}
+            if model_format == 'ubj':
+                model = payload['model']
+                model.get_booster().save_model(model_path)
+                sidecar = {
+                    'xgb_params': {k: v for k, v in model.get_xgb_params().items() if v is not None},
+                    'payload': {k: v for k, v in payload.items() if k not in ('model', 'classes')},
+                }
+            else:
+                joblib.dump(payload, model_path)
+            _fsync_file(model_path)
+            checksum = _sha256(model_path)
+
+            version = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{checksum[:12]}"
+            manifest = {
+                'version': version,
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'format': model_format,
+                'model_file': MODEL_FILES[model_format],
+                'sha256': checksum,
+                'size_bytes': os.path.getsize(model_path),
+                'feature_columns': [str(c) for c in feature_columns],
+                'classes': [str(c) for c in classes],
+                **sidecar,
+                **(metadata or {}),
+            }
+            manifest_path = os.path.join(staging, MANIFEST_FILE)
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            _fsync_dir(staging)
+
+            target = self.version_dir(version)
+            if os.path.exists(target):
+                # Same content published within the same second; the existing copy is identical
+                shutil.rmtree(staging)
+            else:
+                os.rename(staging, target)
+                _fsync_dir(self.versions_dir)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+            self.prune(keep)
+        return manifest
+
+    def activate(self, version):
+        """Atomically point ``current`` at ``version``; also how a rollback is done."""
+        self.manifest(version)
+        tmp_link = os.path.join(self.root, f'.current-{os.getpid()}-{time.monotonic_ns()}')
+        try:
+            os.symlink(os.path.join('versions', version), tmp_link)
+        except (OSError, NotImplementedError):
+            with open(tmp_link, 'w') as f:
+                f.write(version)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_link, self.current_link)
+        _fsync_dir(self.root)
+
+    def load(self, version=None):
+        """Return ``(payload, manifest)`` for ``version`` (default: current) after verifying its checksum."""
+        version = version or self.current_version()
+        if version is None:
+            raise ArtifactError(f"Nothing published in {self.root}")
+        manifest = self.manifest(version)
+        model_path = os.path.join(self.version_dir(version), manifest['model_file'])
+        checksum = _sha256(model_path)
+        if checksum != manifest['sha256']:
+            raise ArtifactError(
+                f"Checksum mismatch for {model_path}: expected {manifest['sha256']}, got {checksum}"
+            )
+        if manifest.get('format', 'joblib') == 'ubj':
+            from tree_engine import NativeBooster
+
+            payload = {
+                'model': NativeBooster.load(model_path, manifest.get('xgb_params')),
+                'classes': np.asarray(manifest['classes'], dtype=object),
+                **manifest.get('payload', {}),
+            }
+            return payload, manifest
+        return joblib.load(model_path), manifest
+
+    def prune(self, keep=5):
+        """Delete all but the newest ``keep`` versions, never the current one."""
+        if keep is None:
+            return []
+        current = self.current_version()
+        versions = self.versions()
+        stale = [v for v in versions[:max(0, len(versions) - keep)] if v != current]
+        for version in stale:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        return stale
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect, roll back or prune a model artifact store.')
+    parser.add_argument('command', choices=['list', 'activate', 'prune'])
+    parser.add_argument('root', help='store directory, e.g. instance/models/crop')
+    parser.add_argument('version', nargs='?', help='version to activate')
+    parser.add_argument('--keep', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.root)
+    if args.command == 'activate':
+        if not args.version:
+            parser.error('activate needs a version')
+        store.activate(args.version)
+        print(f"{args.root}: current -> {args.version}")
+    elif args.command == 'prune':
+        removed = store.prune(args.keep)
+        print(f"Removed {len(removed)} version(s): {', '.join(removed) or '-'}")
+    else:
+        current = store.current_version()
+        for version in store.versions():
+            manifest = store.manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version}  {manifest.get('format', 'joblib'):<6} {manifest['size_bytes']:>10} bytes  "
+                  f"{len(manifest['classes'])} classes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""ASGI entry point for the JSON batch APIs, for clients that poll them at high rates.
+
+    uvicorn asgi:application --host 127.0.0.1 --port 8000 --workers 2
+
+Serves ``POST /api/crop-prediction/batch``, ``/api/fertilizer-recommendation/batch``
+and ``/api/irrigation-scheduling/batch`` with the same handlers (and so the
+same validation, models and history writes) as the Flask routes in app.py,
+plus ``GET /healthz/ready`` and ``GET /metrics``. The HTML pages stay on the
+Flask app.
+
+The event loop only reads bodies and writes responses. Parsing, inference,
+the database commit and JSON encoding run on ``InferencePool``, a thread pool
+that admits at most ``ASGI_INFERENCE_THREADS + ASGI_MAX_QUEUE`` requests at a
+time; past that, requests are answered 503 with ``Retry-After`` straight away
+instead of queueing until clients time out. Clients authenticate with the
+Flask session cookie set by ``/login``.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from itsdangerous import BadSignature
+
+import instrumentation
+from app import (
+    app,
+    crop_batch,
+    dump_json,
+    error_body,
+    fertilizer_batch,
+    irrigation_batch,
+    load_user,
+    model_registry,
+)
+
+logger = logging.getLogger(__name__)
+
+# path -> (handler, endpoint name used for request metrics, as in the Flask app)
+ROUTES = {
+    '/api/crop-prediction/batch': (crop_batch, 'crop_prediction_batch'),
+    '/api/fertilizer-recommendation/batch': (fertilizer_batch, 'fertilizer_recommendation_batch'),
+    '/api/irrigation-scheduling/batch': (irrigation_batch, 'irrigation_scheduling_batch'),
+}
+ENDPOINTS = {'/healthz/ready': 'healthz_ready', '/metrics': 'metrics'}
+
+
+class InferencePool:
+    """Thread pool that refuses work once ``threads + max_queue`` requests are in flight.
+
+    Counters are only touched from the event loop thread, so they need no lock.
+    """
+
+    def __init__(self, threads, max_queue):
+        self.threads = threads
+        self.limit = threads + max_queue
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='inference')
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args):
+        """Return an asyncio future for ``fn(*args)``, or None when the pool is saturated."""
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return None
+        self.in_flight += 1
+        future = asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        self.in_flight -= 1
+        self.completed += 1
+
+    def stats(self):
+        return {
+            'threads': self.threads,
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+pool = InferencePool(app.config['ASGI_INFERENCE_THREADS'], app.config['ASGI_MAX_QUEUE'])
+session_serializer = app.session_interface.get_signing_serializer(app)
+
+
+def collect_pool_metrics():
+    stats = pool.stats()
+    yield ('agrismart_asgi_inflight_requests', 'gauge', 'Requests running or queued on the inference pool',
+           [({}, stats['in_flight'])])
+    yield ('agrismart_asgi_rejected_requests_total', 'counter', 'Requests refused with 503 by backpressure',
+           [({}, stats['rejected'])])
+
+
+if app.config['METRICS_ENABLED']:
+    instrumentation.REGISTRY.register_collector(collect_pool_metrics)
+
+
+def session_user_id(headers):
+    """Return the Flask-Login user id from the signed session cookie, or None."""
+    cookie = SimpleCookie()
+    for name, value in headers:
+        if name == b'cookie':
+            cookie.load(value.decode('latin-1'))
+    morsel = cookie.get(app.config['SESSION_COOKIE_NAME'])
+    if morsel is None:
+        return None
+    try:
+        session = session_serializer.loads(
+            morsel.value, max_age=int(app.permanent_session_lifetime.total_seconds())
+        )
+    except BadSignature:
+        return None
+    return session.get('_user_id')
+
+
+def run_handler(handler, body, user_id):
+    """Runs on the pool: check the user still exists, then run the shared Flask-free handler."""
+    with app.app_context():
+        user = load_user(user_id)
+        if user is None:
+            return error_body('Login required', 401)
+        return handler(body, user.id)
+
+
+DISCONNECTED = object()
+
+
+async def read_body(receive, limit):
+    """Return the request body, None if it grows past ``limit`` bytes, or DISCONNECTED if the client left."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return DISCONNECTED
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_response(send, body, status=200, content_type=b'application/json', headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def handle_api(scope, receive, send, handler):
+    # Check the session first so anonymous clients cannot make the server buffer a body
+    user_id = session_user_id(scope['headers'])
+    if user_id is None:
+        return await send_response(send, *error_body('Login required', 401))
+    body = await read_body(receive, app.config['ASGI_MAX_BODY_BYTES'])
+    if body is DISCONNECTED:
+        return
+    if body is None:
+        return await send_response(send, *error_body('Request body is too large', 413))
+
+    future = pool.submit(run_handler, handler, body, user_id)
+    if future is None:
+        return await send_response(send, *error_body('Server is busy; retry shortly', 503),
+                                   headers=[(b'retry-after', b'1')])
+    try:
+        body, status = await future
+    except Exception:
+        logger.exception("Unhandled error in %s", scope['path'])
+        body, status = error_body('Internal server error', 500)
+    await send_response(send, body, status)
+
+
+async def handle_http(scope, receive, send):
+    path, method = scope['path'], scope['method']
+    if path in ROUTES:
+        if method != 'POST':
+            return await send_response(send, *error_body('Method not allowed', 405), headers=[(b'allow', b'POST')])
+        return await handle_api(scope, receive, send, ROUTES[path][0])
+    if path == '/healthz/ready' and method == 'GET':
+        readiness = model_registry.readiness()
+        return await send_response(send, dump_json(readiness), 200 if readiness['ready'] else 503)
+    if path == '/metrics' and method == 'GET' and app.config['METRICS_ENABLED']:
+        body = instrumentation.REGISTRY.render().encode()
+        return await send_response(send, body, content_type=b'text/plain; version=0.0.4')
+    await send_response(send, *error_body('Not found', 404))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            # Let admitted requests finish their commits before the server exits
+            await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def timed_http(scope, receive, send):
+    """``handle_http`` plus a REQUEST_SECONDS observation, labelled like the Flask app's."""
+    started = time.perf_counter()
+    status = 500
+
+    async def send_and_record(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        await send(message)
+
+    try:
+        await handle_http(scope, receive, send_and_record)
+    finally:
+        path = scope['path']
+        endpoint = ROUTES[path][1] if path in ROUTES else ENDPOINTS.get(path, 'unknown')
+        instrumentation.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, scope['method'], status)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http':
+        if instrumentation.is_enabled():
+            return await timed_http(scope, receive, send)
+        return await handle_http(scope, receive, send)
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
@@ -0,0 +1,223 @@
+"""Sustained load test: the Flask app (gunicorn gthread) against asgi.py (uvicorn).
+
+    python -m benchmarks.asgi_load
+    python -m benchmarks.asgi_load --endpoint fertilizer --concurrency 128 --duration 20 --save
+    python -m benchmarks.asgi_load --servers asgi --concurrency 512 --output load.json
+
+Each server is started as a subprocess on a throwaway SQLite file with the
+same worker count, and driven by ``--concurrency`` keep-alive connections for
+``--duration`` seconds after a ``--warmup``. Every connection posts the same
+``--records``-record batch back to back. The report gives sustained req/s,
+p50/p99 latency, 503s (ASGI backpressure, or models not ready) and other
+errors. Needs gunicorn and uvicorn installed (without gunicorn the Flask side
+falls back to the threaded development server) and trained models in instance/.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+SETUP = '''
+from config import app, db
+from models import User
+with app.app_context():
+    db.create_all()
+    user = User(username='loadtest', email='loadtest@example.com', password_hash='!')
+    db.session.add(user)
+    db.session.commit()
+    print(app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user.id), '_fresh': True}))
+'''
+
+ENDPOINTS = {
+    'crop': ('/api/crop-prediction/batch', 'records'),
+    'fertilizer': ('/api/fertilizer-recommendation/batch', 'records'),
+    'irrigation': ('/api/irrigation-scheduling/batch', 'fields'),
+}
+
+
+def make_payload(endpoint, records, save, seed=0):
+    rng = np.random.default_rng(seed)
+    soil_types = ['loamy', 'clay', 'sandy']
+    if endpoint == 'crop':
+        rows = [
+            [float(rng.uniform(0, 140)), float(rng.uniform(5, 145)), float(rng.uniform(5, 205)),
+             float(rng.uniform(10, 40)), float(rng.uniform(15, 99)), float(rng.uniform(4, 9)),
+             float(rng.uniform(20, 300))]
+            for _ in range(records)
+        ]
+    elif endpoint == 'fertilizer':
+        rows = [
+            {'N': float(rng.uniform(0, 140)), 'P': float(rng.uniform(5, 145)), 'K': float(rng.uniform(5, 205)),
+             'pH': float(rng.uniform(4, 9)), 'soil_moisture': float(rng.uniform(10, 90)),
+             'soil_type': soil_types[i % 3]}
+            for i in range(records)
+        ]
+    else:
+        rows = [
+            {'crop_type': 'rice', 'soil_type': soil_types[i % 3], 'area': float(rng.uniform(0.5, 20)),
+             'temperature': float(rng.uniform(10, 40)), 'humidity': float(rng.uniform(15, 99))}
+            for i in range(records)
+        ]
+    return json.dumps({ENDPOINTS[endpoint][1]: rows, 'save': save}).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(server, port, workers, threads):
+    if server == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(port),
+                '--workers', str(workers), '--no-access-log', '--log-level', 'warning']
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return [sys.executable, '-c',
+                f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', str(threads), '--worker-class', 'gthread',
+            '--log-level', 'warning', 'app:app']
+
+
+def wait_ready(port, proc, timeout=60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited with status {proc.returncode} before becoming ready")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1) as s:
+                s.sendall(b'GET /healthz/ready HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n')
+                if s.recv(64).startswith(b'HTTP/1.1 200'):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Server on port {port} was not ready after {timeout:.0f}s")
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def connection(port, request, measure_from, deadline, samples):
+    """One keep-alive client; appends ``(status, seconds)`` for responses after ``measure_from``."""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            started = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            status, started = None, time.perf_counter()
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.01)
+        if started >= measure_from:
+            samples.append((status, time.perf_counter() - started))
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, path, body, cookie, concurrency, warmup, duration):
+    request = (
+        f'POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+        f'Cookie: session={cookie}\r\nContent-Length: {len(body)}\r\n\r\n'
+    ).encode() + body
+    now = time.perf_counter()
+    samples = []
+    await asyncio.gather(*(
+        connection(port, request, now + warmup, now + warmup + duration, samples) for _ in range(concurrency)
+    ))
+    return samples
+
+
+def summarize(server, samples, duration):
+    ok = np.array([seconds for status, seconds in samples if status == 200])
+    return {
+        'server': server,
+        'requests': len(samples),
+        'ok': len(ok),
+        'ok_per_second': len(ok) / duration,
+        'p50_ms': float(np.percentile(ok, 50) * 1000) if len(ok) else None,
+        'p99_ms': float(np.percentile(ok, 99) * 1000) if len(ok) else None,
+        'rejected_503': sum(1 for status, _ in samples if status == 503),
+        'errors': sum(1 for status, _ in samples if status not in (200, 503)),
+    }
+
+
+def run_server(server, args, env, cookie, body):
+    port = free_port()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(server_command(server, port, args.workers, args.threads), cwd=root, env=env)
+    try:
+        wait_ready(port, proc)
+        path = ENDPOINTS[args.endpoint][0]
+        samples = asyncio.run(drive(port, path, body, cookie, args.concurrency, args.warmup, args.duration))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return summarize(server, samples, args.duration)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sustained req/s and p99: Flask (gunicorn) vs ASGI (uvicorn)')
+    parser.add_argument('--servers', nargs='+', choices=['flask', 'asgi'], default=['flask', 'asgi'])
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), default='crop')
+    parser.add_argument('--records', type=int, default=1, help='records per request')
+    parser.add_argument('--save', action='store_true', help='store history rows (adds a SQLite commit per request)')
+    parser.add_argument('--concurrency', type=int, default=64, help='open keep-alive connections')
+    parser.add_argument('--duration', type=float, default=15.0, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='unmeasured seconds before that')
+    parser.add_argument('--workers', type=int, default=1, help='server processes for both servers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args(argv)
+
+    body = make_payload(args.endpoint, args.records, args.save)
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        for server in args.servers:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(directory, f'{server}.db')}",
+                       MODEL_WARMUP='true')
+            cookie = subprocess.run(
+                [sys.executable, '-c', SETUP], env=env, check=True, capture_output=True, text=True
+            ).stdout.strip().splitlines()[-1]
+            reports.append(run_server(server, args, env, cookie, body))
+
+    print(f"endpoint={args.endpoint} records={args.records} save={args.save} "
+          f"concurrency={args.concurrency} workers={args.workers} duration={args.duration:.0f}s")
+    print(f"{'server':<8}{'requests':>10}{'ok/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'503s':>8}{'errors':>8}")
+    for r in reports:
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else '-'
+        p99 = f"{r['p99_ms']:.1f}" if r['p99_ms'] is not None else '-'
+        print(f"{r['server']:<8}{r['requests']:>10}{r['ok_per_second']:>10.1f}{p50:>10}{p99:>10}"
+              f"{r['rejected_503']:>8}{r['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'results': reports}, f, indent=2)
+    return reports
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Concurrent write load test for the app's database configuration.
+
+Starts N worker processes (like gunicorn workers), each committing one
+CropPrediction per simulated request through the app's Flask-SQLAlchemy
+session, and reports committed rows per second and failed writes. Runs every
+requested SQLite tuning mode against a fresh database file:
+
+    python -m benchmarks.db_write_load --workers 4 --writes 250
+    python -m benchmarks.db_write_load --modes tuned          # only the WAL pragmas
+
+Mode ``default`` disables the connect-event pragmas (rollback journal,
+synchronous=FULL, Python's 5s lock timeout); ``tuned`` uses the config.py
+defaults (WAL, synchronous=NORMAL, busy_timeout, mmap_size).
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = {
+    'default': {'SQLITE_TUNING': 'false'},
+    'tuned': {'SQLITE_TUNING': 'true'},
+}
+
+
+def run_worker(writes, start_barrier):
+    from config import app, db
+    from models import CropPrediction
+
+    with app.app_context():
+        while time.time() < start_barrier:
+            time.sleep(0.001)
+        committed = failed = 0
+        started = time.perf_counter()
+        for _ in range(writes):
+            try:
+                db.session.add(CropPrediction(
+                    user_id=1, nitrogen=90, phosphorus=42, potassium=43, temperature=20.8,
+                    humidity=82.0, ph=6.5, rainfall=202.0, predicted_crop='rice', confidence=0.9,
+                ))
+                db.session.commit()
+                committed += 1
+            except Exception as e:
+                db.session.rollback()
+                failed += 1
+                if failed == 1:
+                    print(f"worker {os.getpid()}: {e.__class__.__name__}: {str(e).splitlines()[0]}", file=sys.stderr)
+        print(f"{committed} {failed} {time.perf_counter() - started:.6f}")
+
+
+def run_mode(mode, workers, writes, directory):
+    db_path = os.path.join(directory, f'load-{mode}.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', MODEL_WARMUP='false', **MODES[mode])
+
+    # Create the schema once, outside the timed section
+    setup = 'from config import app, db\nimport models\nwith app.app_context(): db.create_all()'
+    subprocess.run([sys.executable, '-c', setup], env=env, check=True)
+
+    start_barrier = time.time() + 2.0
+    procs = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.db_write_load', '--worker', str(writes), str(start_barrier)],
+            env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    results = [proc.communicate()[0].split() for proc in procs]
+    committed = sum(int(r[0]) for r in results)
+    failed = sum(int(r[1]) for r in results)
+    wall = max(float(r[2]) for r in results)
+    return {'mode': mode, 'committed': committed, 'failed': failed, 'wall_seconds': wall,
+            'writes_per_second': committed / wall if wall else 0.0}
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--worker':
+        return run_worker(int(sys.argv[2]), float(sys.argv[3]))
+
+    parser = argparse.ArgumentParser(description='Concurrent database write throughput')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=250, help='commits per worker')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['default', 'tuned'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        reports = [run_mode(mode, args.workers, args.writes, directory) for mode in args.modes]
+
+    print(f"workers={args.workers} writes/worker={args.writes}")
+    print(f"{'mode':<10}{'committed':>10}{'failed':>8}{'wall s':>9}{'writes/s':>10}")
+    for report in reports:
+        print(f"{report['mode']:<10}{report['committed']:>10}{report['failed']:>8}"
+              f"{report['wall_seconds']:>9.2f}{report['writes_per_second']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
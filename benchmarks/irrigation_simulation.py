@@ -0,0 +1,91 @@
+"""Time IrrigationScheduler.simulate on a fields x days weather grid.
+
+    python -m benchmarks.irrigation_simulation
+    python -m benchmarks.irrigation_simulation --fields 10000 --days 365 --budget 1.0
+
+Weather is synthetic (seasonal temperature and humidity with random rain
+events, independent per field). The first ``--check-fields`` fields are
+re-simulated with a plain Python day-by-day loop and must produce the same
+irrigation events. Exits non-zero if the best run exceeds ``--budget`` seconds.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ml_models import IrrigationScheduler
+
+
+def synthetic_weather(n_fields, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    season = np.sin(np.linspace(0, 2 * np.pi, n_days, endpoint=False))
+    temperature = 26 + 8 * season + rng.normal(0, 2, size=(n_fields, n_days))
+    humidity = np.clip(65 - 15 * season + rng.normal(0, 5, size=(n_fields, n_days)), 10, 100)
+    rainfall = np.where(rng.random((n_fields, n_days)) < 0.15, rng.gamma(2.0, 6.0, size=(n_fields, n_days)), 0.0)
+    return temperature, humidity, rainfall
+
+
+def reference_events(scheduler, crop_type, soil_type, area, temperature, humidity, rainfall, threshold):
+    """Straightforward per-field, per-day loop used to check the vectorized result."""
+    daily = scheduler.crop_water_requirements.get(crop_type, {'daily': 6})['daily']
+    capacity = scheduler.soil_water_capacity.get(soil_type, scheduler.default_soil_water_capacity)
+    depletion = 0.0
+    events = []
+    for day in range(len(temperature)):
+        water_use = daily * (1 + (temperature[day] - 25) * 0.02) * (1 - (humidity[day] - 60) * 0.005)
+        loss = water_use - scheduler.effective_rainfall_fraction * rainfall[day]
+        depletion = min(max(depletion + loss, 0.0), capacity)
+        if depletion > threshold * capacity:
+            events.append((day, depletion * area))
+            depletion = 0.0
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized irrigation simulation')
+    parser.add_argument('--fields', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='maximum seconds for the best run')
+    parser.add_argument('--check-fields', type=int, default=100)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    args = parser.parse_args()
+
+    scheduler = IrrigationScheduler()
+    rng = np.random.default_rng(1)
+    crops = rng.choice(list(scheduler.crop_water_requirements) + ['unknown'], args.fields)
+    soils = rng.choice(list(scheduler.soil_water_capacity) + ['silt'], args.fields)
+    areas = rng.uniform(0.5, 20.0, args.fields)
+    temperature, humidity, rainfall = synthetic_weather(args.fields, args.days)
+
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = scheduler.simulate(crops, soils, areas, temperature, humidity, rainfall,
+                                    depletion_threshold=args.threshold)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    n_events = len(result['event_field'])
+    print(f"fields={args.fields} days={args.days} events={n_events}")
+    print(f"best {best:.3f}s, median {sorted(timings)[len(timings) // 2]:.3f}s over {args.repeat} runs "
+          f"({args.fields * args.days / best / 1e6:.1f}M field-days/s)")
+
+    mismatches = 0
+    starts = np.searchsorted(result['event_field'], np.arange(args.fields + 1))
+    for field in range(min(args.check_fields, args.fields)):
+        expected = reference_events(scheduler, crops[field], soils[field], areas[field], temperature[field],
+                                    humidity[field], rainfall[field], args.threshold)
+        days = result['event_day'][starts[field]:starts[field + 1]].tolist()
+        water = result['water_amount'][starts[field]:starts[field + 1]]
+        if days != [day for day, _ in expected] or not np.allclose(water, [w for _, w in expected]):
+            mismatches += 1
+    print(f"reference check: {mismatches} of {min(args.check_fields, args.fields)} fields differ")
+
+    if mismatches or best > args.budget:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
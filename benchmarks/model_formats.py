@@ -0,0 +1,110 @@
+"""Compare joblib-pickled XGBClassifier payloads with native UBJSON boosters.
+
+    python -m benchmarks.model_formats
+    python -m benchmarks.model_formats --models crop --batch-sizes 1 100 10000 --output formats.json
+
+Each model currently in instance/ (store version or legacy joblib file) is
+written both ways to a temporary artifact store. The script reports artifact
+size, load time (``ArtifactStore.load``: checksum plus unpickle or
+``Booster.load_model``) and per-call ``predict_proba`` latency for the sklearn
+wrapper and for ``NativeBooster.inplace_predict``. Exits non-zero if the two
+paths return different probabilities.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+
+from artifact_store import ArtifactStore
+from benchmarks.suite import measure
+
+MODELS = {
+    'crop': ('crop_xgb_model.joblib', ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']),
+    'fertilizer': ('fertilizer_xgb_model.joblib', ['N', 'P', 'K', 'pH', 'soil_moisture']),
+}
+
+
+def load_payload(instance_dir, name):
+    """Return the served payload as ``{'model': XGBClassifier, ...}``, or None if there is no model."""
+    model_file, _ = MODELS[name]
+    store = ArtifactStore(os.path.join(instance_dir, 'models', name))
+    if store.current_version() is not None and store.manifest(store.current_version()).get('format') == 'joblib':
+        return store.load()[0]
+    legacy = os.path.join(instance_dir, model_file)
+    return joblib.load(legacy) if os.path.exists(legacy) else None
+
+
+def compare_model(name, payload, batch_sizes, repeat, workdir):
+    feature_columns = MODELS[name][1]
+    results = {}
+    loaded = {}
+    for model_format in ('joblib', 'ubj'):
+        store = ArtifactStore(os.path.join(workdir, f'{name}-{model_format}'))
+        manifest = store.publish(payload, feature_columns, payload['classes'], model_format=model_format)
+        loaded[model_format] = store.load()[0]['model']
+        results[f'{name}.{model_format}.load'] = dict(
+            measure(store.load, warmup=1, repeat=repeat), size_bytes=manifest['size_bytes']
+        )
+
+    rng = np.random.default_rng(0)
+    mismatched = False
+    for size in batch_sizes:
+        X = rng.uniform(0, 200, size=(size, len(feature_columns)))
+        expected = loaded['joblib'].predict_proba(X)
+        actual = loaded['ubj'].predict_proba(X)
+        if not np.array_equal(expected, actual):
+            print(f"{name}[{size}]: probabilities differ by up to {np.abs(expected - actual).max():.2e}")
+            mismatched = True
+        for model_format, model in loaded.items():
+            results[f'{name}.{model_format}.predict_proba[{size}]'] = measure(
+                lambda model=model, X=X: model.predict_proba(X), repeat=repeat
+            )
+    return results, mismatched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load and predict latency: joblib pickle vs native UBJSON')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 100, 10000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', help='write results JSON here')
+    args = parser.parse_args(argv)
+
+    instance_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+    results = {}
+    mismatched = False
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.models:
+            payload = load_payload(instance_dir, name)
+            if payload is None:
+                print(f"Skipping {name}: no joblib model in {instance_dir}; run train_models.py --model-format joblib")
+                continue
+            model_results, model_mismatched = compare_model(name, payload, args.batch_sizes, args.repeat, workdir)
+            results.update(model_results)
+            mismatched = mismatched or model_mismatched
+
+    print(f"{'case':<40}{'joblib ms':>12}{'ubj ms':>10}{'speedup':>9}")
+    for name in results:
+        if '.joblib.' not in name:
+            continue
+        joblib_ms = results[name]['median_ms']
+        ubj_ms = results[name.replace('.joblib.', '.ubj.')]['median_ms']
+        print(f"{name.replace('.joblib', ''):<40}{joblib_ms:>12.4f}{ubj_ms:>10.4f}{joblib_ms / ubj_ms:>8.2f}x")
+    for name in results:
+        if name.endswith('.load'):
+            print(f"{name} artifact: {results[name]['size_bytes']:,} bytes")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+    if mismatched:
+        sys.exit(1)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Benchmark suite for the inference, recommendation and scheduling hot paths.
+
+Each case is warmed up, then timed for ``--repeat`` samples; fast cases run
+several calls per sample so every sample lasts at least ``--min-sample-ms``.
+Results (per-call min/median/mean/p90/p99 in milliseconds) go to a JSON file
+that can be compared against an earlier run:
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --output new.json --compare bench.json --threshold 0.15
+    python -m benchmarks.suite --filter crop.predict_batch --max-batch 10000
+
+With ``--compare`` the exit status is 1 when any case's ``--metric`` (median
+by default) is more than ``--threshold`` slower than the baseline. Needs
+trained models in instance/ (``python train_models.py``); route cases run
+against a throwaway SQLite file.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+
+
+def measure(fn, warmup=3, repeat=20, min_sample_ms=5.0):
+    """Time ``fn`` and return per-call statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+
+    # Calibrate how many calls make one sample long enough to time reliably
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed * 1000.0 >= min_sample_ms or number >= 1 << 16:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_sample_ms / 1000.0 / elapsed) + 1))
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) * 1000.0 / number)
+
+    return {
+        'calls_per_sample': number,
+        'samples': repeat,
+        'min_ms': min(samples),
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'stdev_ms': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'p90_ms': float(np.percentile(samples, 90)),
+        'p99_ms': float(np.percentile(samples, 99)),
+    }
+
+
+def random_rows(n_rows, n_features, seed=0):
+    return np.random.default_rng(seed).uniform(0, 200, size=(n_rows, n_features))
+
+
+def model_cases(max_batch):
+    from ml_models import CropPredictor, FertilizerCropClassifier, FertilizerRecommender, IrrigationScheduler
+
+    crop = CropPredictor(allow_train=False)
+    fertilizer = FertilizerCropClassifier(allow_train=False)
+    recommender = FertilizerRecommender(crop_classifier=fertilizer, allow_train=False)
+    scheduler = IrrigationScheduler()
+
+    yield 'crop.predict', lambda: crop.predict(90, 42, 43, 20.8, 82.0, 6.5, 202.0)
+    for size in (s for s in BATCH_SIZES if s <= max_batch):
+        rows = random_rows(size, len(crop.feature_columns))
+        yield f'crop.predict_batch[{size}]', lambda rows=rows: crop.predict_batch(rows)
+
+    yield 'fertilizer.predict_crop', lambda: fertilizer.predict_crop(80, 40, 40, 6.5, 50)
+    rows = random_rows(min(1000, max_batch), len(fertilizer.feature_columns))
+    yield f'fertilizer.predict_crop_batch[{len(rows)}]', lambda: fertilizer.predict_crop_batch(rows)
+
+    yield 'recommender.recommend', lambda: recommender.recommend('rice', 40, 20, 20, 'clay')
+    yield 'recommender.recommend_from_soil', lambda: recommender.recommend_from_soil(80, 40, 40, 6.5, 50, 'loamy')
+    n_plots = min(10000, max_batch)
+    rng = np.random.default_rng(1)
+    plots = (
+        rng.choice(list(recommender.fertilizer_db), n_plots),
+        rng.uniform(0, 150, n_plots), rng.uniform(0, 100, n_plots), rng.uniform(0, 100, n_plots),
+    )
+    yield f'recommender.recommend_many[{n_plots}]', lambda: recommender.recommend_many(*plots, 'clay')
+
+    yield 'irrigation.create_schedule', lambda: scheduler.create_schedule('rice', 'clay', 2.0, 30.0, 70.0)
+    fields = [
+        {'crop_type': crop_type, 'soil_type': 'loamy', 'area': 2.0, 'temperature': 28.0, 'humidity': 65.0}
+        for crop_type in rng.choice(list(scheduler.crop_water_requirements), min(1000, max_batch))
+    ]
+    yield f'irrigation.create_schedules[{len(fields)}]', lambda: scheduler.create_schedules(fields)
+
+
+def load_cases():
+    from ml_models import CropPredictor, FertilizerCropClassifier
+
+    yield 'load.crop_predictor', lambda: CropPredictor(allow_train=False)
+    yield 'load.fertilizer_classifier', lambda: FertilizerCropClassifier(allow_train=False)
+    instance_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance')
+    compiled_path = os.path.join(instance_dir, 'crop_trees')
+    if os.path.isdir(compiled_path):
+        yield 'load.crop_predictor_compiled', lambda: CropPredictor(allow_train=False, compiled_path=compiled_path)
+
+
+def route_cases(db_dir):
+    # Configure a throwaway database and synchronous model loading before the app is imported
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ['MODEL_WARMUP'] = 'false'
+    os.environ['MODEL_PRELOAD'] = 'false'
+    from werkzeug.security import generate_password_hash
+
+    from app import app, db, model_registry
+    from models import User
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='bench', email='bench@example.com', password_hash=generate_password_hash('bench')))
+        db.session.commit()
+    model_registry.load_all()
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'bench@example.com', 'password': 'bench'})
+    records = random_rows(100, 7).tolist()
+    fields = [{'crop_type': 'rice', 'soil_type': 'clay', 'area': 2, 'temperature': 30, 'humidity': 70}] * 10
+
+    def call(method, url, **kwargs):
+        def run():
+            response = getattr(client, method)(url, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+        return run
+
+    yield 'route.healthz_ready', call('get', '/healthz/ready')
+    yield 'route.crop_prediction_batch[100]', call('post', '/api/crop-prediction/batch', json={'records': records})
+    yield 'route.irrigation_scheduling_batch[10]', call(
+        'post', '/api/irrigation-scheduling/batch', json={'fields': fields, 'save': False}
+    )
+    yield 'route.crop_stats', call('get', '/api/crop-stats')
+    yield 'route.irrigation_stats', call('get', '/api/irrigation-stats')
+
+
+def environment():
+    import xgboost
+
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'xgboost': xgboost.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, threshold, metric='median_ms'):
+    """Print ``metric`` changes against ``baseline`` and return the names that regressed."""
+    regressions = []
+    print(f"\n{'case':<44}{'baseline ms':>13}{'current ms':>12}{'change':>9}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<44}{'-':>13}{current[metric]:>12.4f}{'new':>9}")
+            continue
+        change = current[metric] / previous[metric] - 1.0 if previous[metric] else 0.0
+        flag = ' REGRESSION' if change > threshold else ''
+        print(f"{name:<44}{previous[metric]:>13.4f}{current[metric]:>12.4f}{change:>+9.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ML and web hot paths')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed slowdown vs the baseline before failing (0.15 = 15%%)')
+    parser.add_argument('--metric', choices=['min_ms', 'median_ms', 'p90_ms'], default='median_ms',
+                        help='statistic compared against the baseline; min_ms is steadiest on noisy hosts')
+    parser.add_argument('--filter', action='append', default=[], help='only run cases containing this text')
+    parser.add_argument('--groups', nargs='+', choices=['models', 'load', 'routes'],
+                        default=['models', 'load', 'routes'])
+    parser.add_argument('--max-batch', type=int, default=max(BATCH_SIZES))
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--min-sample-ms', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        groups = {
+            'models': lambda: model_cases(args.max_batch),
+            'load': load_cases,
+            'routes': lambda: route_cases(db_dir),
+        }
+        results = {}
+        print(f"{'case':<44}{'median ms':>12}{'p90 ms':>11}{'p99 ms':>11}{'calls':>8}")
+        for group in args.groups:
+            for name, fn in groups[group]():
+                if args.filter and not any(text in name for text in args.filter):
+                    continue
+                stats = measure(fn, warmup=args.warmup, repeat=args.repeat, min_sample_ms=args.min_sample_ms)
+                results[name] = stats
+                print(f"{name:<44}{stats['median_ms']:>12.4f}{stats['p90_ms']:>11.4f}"
+                      f"{stats['p99_ms']:>11.4f}{stats['calls_per_sample']:>8}")
+
+    report = {'environment': environment(), 'settings': vars(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.metric)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    return report
+
+
+if __name__ == '__main__':
+    main()
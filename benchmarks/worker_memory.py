@@ -0,0 +1,129 @@
+"""Measure per-worker RSS/PSS for N forked workers serving the ML models.
+
+Mimics gunicorn's pre-fork model with plain os.fork() and reads
+/proc/<pid>/smaps_rollup for each worker (Linux only).
+
+    python -m benchmarks.worker_memory --workers 4 --mode per-worker
+    python -m benchmarks.worker_memory --workers 4 --mode preload
+    python -m benchmarks.worker_memory --workers 4 --mode compiled
+
+Modes:
+    per-worker  every worker joblib-loads its own models after fork (default gunicorn)
+    preload     models are loaded once in the parent before fork (MODEL_PRELOAD=true)
+    compiled    every worker memory-maps the NumPy forests from tree_engine.py
+                (MODEL_ENGINE=compiled); run ``python tree_engine.py`` first
+"""
+import argparse
+import gc
+import os
+import signal
+import time
+import traceback
+
+import numpy as np
+
+from ml_models import CropPredictor, FertilizerCropClassifier
+
+FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def read_memory(pid):
+    """Return the smaps_rollup counters for ``pid`` in MiB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in FIELDS:
+                values[key] = int(rest.split()[0]) / 1024.0
+    return values
+
+
+def load_models(mode, instance_dir):
+    compiled = mode == 'compiled'
+    crop = CropPredictor(
+        allow_train=False,
+        compiled_path=os.path.join(instance_dir, 'crop_trees') if compiled else None,
+    )
+    fertilizer = FertilizerCropClassifier(
+        allow_train=False,
+        compiled_path=os.path.join(instance_dir, 'fertilizer_trees') if compiled else None,
+    )
+    return crop, fertilizer
+
+
+def serve(models, rows=256):
+    """Run a few predictions so each worker touches the model memory like a live one."""
+    crop, fertilizer = models
+    rng = np.random.default_rng(os.getpid())
+    crop.predict_batch(rng.uniform(0, 200, size=(rows, len(crop.feature_columns))))
+    fertilizer.predict_crop_batch(rng.uniform(0, 200, size=(rows, len(fertilizer.feature_columns))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-worker memory for forked model servers')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--mode', choices=['per-worker', 'preload', 'compiled'], default='per-worker')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    instance_dir = os.path.join(base_dir, 'instance')
+
+    models = None
+    if args.mode == 'preload':
+        models = load_models(args.mode, instance_dir)
+        gc.collect()
+        gc.freeze()
+
+    ready_r, ready_w = os.pipe()
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            try:
+                worker_models = models if models is not None else load_models(args.mode, instance_dir)
+                serve(worker_models)
+            except Exception:
+                traceback.print_exc()
+                os.write(ready_w, b'x')
+                os._exit(1)
+            os.write(ready_w, b'.')
+            signal.pause()
+            os._exit(0)
+        children.append(pid)
+    os.close(ready_w)
+
+    statuses = b''
+    while len(statuses) < args.workers:
+        statuses += os.read(ready_r, args.workers)
+    time.sleep(0.2)
+
+    try:
+        if b'x' in statuses:
+            raise SystemExit('A worker failed to load the models')
+        parent = read_memory(os.getpid())
+        workers = [read_memory(pid) for pid in children]
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            os.waitpid(pid, 0)
+
+    print(f"mode={args.mode} workers={args.workers} (MiB)")
+    print(f"{'process':>10} {'RSS':>9} {'PSS':>9} {'shared':>9} {'private':>9}")
+    rows = [('parent', parent)] + [(f'worker {i}', mem) for i, mem in enumerate(workers)]
+    for label, mem in rows:
+        shared = mem['Shared_Clean'] + mem['Shared_Dirty']
+        private = mem['Private_Clean'] + mem['Private_Dirty']
+        print(f"{label:>10} {mem['Rss']:9.1f} {mem['Pss']:9.1f} {shared:9.1f} {private:9.1f}")
+
+    total_pss = parent['Pss'] + sum(mem['Pss'] for mem in workers)
+    mean_private = sum(mem['Private_Clean'] + mem['Private_Dirty'] for mem in workers) / len(workers)
+    print(f"total PSS: {total_pss:.1f} MiB, mean private per worker: {mean_private:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
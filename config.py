@@ -1,14 +1,108 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 import os
+import sqlite3
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///agriculture.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///agriculture.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true',
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+}
+# In-memory SQLite runs on a single static connection, which takes no pool sizing
+if ':memory:' not in app.config['SQLALCHEMY_DATABASE_URI'] and app.config['SQLALCHEMY_DATABASE_URI'] != 'sqlite://':
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    })
+
+# SQLite connection pragmas: WAL lets readers run alongside the single writer, and
+# busy_timeout makes concurrent writers wait instead of failing with "database is locked"
+app.config['SQLITE_TUNING'] = os.environ.get('SQLITE_TUNING', 'True').lower() == 'true'
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['BATCH_PREDICTION_MAX_ROWS'] = int(os.environ.get('BATCH_PREDICTION_MAX_ROWS', 10000))
+app.config['IRRIGATION_BATCH_MAX_FIELDS'] = int(os.environ.get('IRRIGATION_BATCH_MAX_FIELDS', 1000))
+# JSON API bodies are parsed and encoded with orjson when it is installed
+app.config['JSON_ORJSON'] = os.environ.get('JSON_ORJSON', 'True').lower() == 'true'
+
+# Model loading: never train inside the web process unless explicitly allowed
+app.config['ALLOW_WEB_TRAINING'] = os.environ.get('ALLOW_WEB_TRAINING', 'False').lower() == 'true'
+app.config['MODEL_WARMUP'] = os.environ.get('MODEL_WARMUP', 'True').lower() == 'true'
+app.config['MODEL_LOAD_TIMEOUT'] = float(os.environ.get('MODEL_LOAD_TIMEOUT', 30))
+# MODEL_PRELOAD loads every model synchronously at import (e.g. in the gunicorn master before fork).
+# MODEL_ENGINE=compiled serves memory-mapped NumPy forests exported by tree_engine.py.
+app.config['MODEL_PRELOAD'] = os.environ.get('MODEL_PRELOAD', 'False').lower() == 'true'
+app.config['MODEL_ENGINE'] = os.environ.get('MODEL_ENGINE', 'xgboost').lower()
+# Seconds between checks for a newly published model version in instance/models/ (0 disables hot reload)
+app.config['MODEL_RELOAD_INTERVAL'] = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+
+# Optional LRU cache of prediction results keyed on quantized inputs.
+# PREDICTION_CACHE_STEPS overrides per-feature steps, e.g. "N=1,P=1,K=1,ph=0.1,rainfall=5".
+app.config['PREDICTION_CACHE'] = os.environ.get('PREDICTION_CACHE', 'False').lower() == 'true'
+app.config['PREDICTION_CACHE_MAX_ENTRIES'] = int(os.environ.get('PREDICTION_CACHE_MAX_ENTRIES', 10000))
+app.config['PREDICTION_CACHE_STEPS'] = {
+    'N': 1.0, 'P': 1.0, 'K': 1.0, 'temperature': 0.5, 'humidity': 1.0,
+    'ph': 0.1, 'pH': 0.1, 'rainfall': 1.0, 'soil_moisture': 1.0,
+}
+for item in filter(None, os.environ.get('PREDICTION_CACHE_STEPS', '').split(',')):
+    feature, _, step = item.partition('=')
+    app.config['PREDICTION_CACHE_STEPS'][feature.strip()] = float(step)
+
+# Opt-in micro-batching of concurrent prediction requests
+app.config['INFERENCE_BATCHING'] = os.environ.get('INFERENCE_BATCHING', 'False').lower() == 'true'
+app.config['INFERENCE_BATCH_MAX_SIZE'] = int(os.environ.get('INFERENCE_BATCH_MAX_SIZE', 32))
+app.config['INFERENCE_BATCH_WAIT_MS'] = float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 2.0))
+
+# Opt-in write-behind of prediction/recommendation/schedule history. WRITE_BEHIND_MAX_PENDING
+# is the most acknowledged rows a crash can lose (0 writes synchronously).
+app.config['WRITE_BEHIND'] = os.environ.get('WRITE_BEHIND', 'False').lower() == 'true'
+app.config['WRITE_BEHIND_BATCH_SIZE'] = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', 500))
+app.config['WRITE_BEHIND_INTERVAL_MS'] = float(os.environ.get('WRITE_BEHIND_INTERVAL_MS', 1000))
+app.config['WRITE_BEHIND_MAX_PENDING'] = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 1000))
+
+# Per-user dashboard aggregates, updated in place on writes. The default 'lru' backend is
+# per process, so other workers see a write after at most DASHBOARD_CACHE_TTL seconds;
+# 'redis' (needs the redis package and REDIS_URL) shares entries between workers and drops them on writes.
+app.config['DASHBOARD_CACHE'] = os.environ.get('DASHBOARD_CACHE', 'False').lower() == 'true'
+app.config['DASHBOARD_CACHE_BACKEND'] = os.environ.get('DASHBOARD_CACHE_BACKEND', 'lru').lower()
+app.config['DASHBOARD_CACHE_TTL'] = float(os.environ.get('DASHBOARD_CACHE_TTL', 60))
+app.config['DASHBOARD_CACHE_MAX_ENTRIES'] = int(os.environ.get('DASHBOARD_CACHE_MAX_ENTRIES', 1000))
+app.config['REDIS_URL'] = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+# Stage timings and model counters served as Prometheus text at /metrics (per process)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'False').lower() == 'true'
+
+# ASGI serving (asgi.py): batch requests run on a bounded thread pool; once ASGI_INFERENCE_THREADS
+# are busy and ASGI_MAX_QUEUE more are waiting, further requests get 503 with Retry-After
+app.config['ASGI_INFERENCE_THREADS'] = int(os.environ.get('ASGI_INFERENCE_THREADS', min(8, (os.cpu_count() or 1) + 2)))
+app.config['ASGI_MAX_QUEUE'] = int(os.environ.get('ASGI_MAX_QUEUE', 64))
+app.config['ASGI_MAX_BODY_BYTES'] = int(os.environ.get('ASGI_MAX_BODY_BYTES', 16 * 1024 * 1024))
 
 db = SQLAlchemy(app)
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not app.config['SQLITE_TUNING'] or not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    if app.config['SQLITE_SYNCHRONOUS'] not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {app.config['SQLITE_SYNCHRONOUS']}")
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    cursor.execute(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    cursor.execute(f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}")
+    cursor.close()
+
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -0,0 +1,251 @@
+"""Per-user dashboard aggregates with pluggable cache backends.
+
+``DashboardCache`` keeps, per user, the recent items shown on /dashboard, the
+crop-count histogram behind /api/crop-stats and the irrigation series behind
+/api/irrigation-stats. Entries are built once by a loader (SQL queries) and
+then updated as new history rows are committed, so page views never recompute
+them. Writers bracket each commit with ``writing()`` and call ``record()``
+inside it; a load that overlaps a commit for the same user is returned but not
+cached, since it cannot tell whether it saw the new rows (caching it could
+drop them, or count them twice once ``record()`` adds them).
+
+Backends only need get/set/delete/stats. ``LRUBackend`` is the in-process
+default; ``RedisBackend`` wraps any client exposing redis-py's
+``get``/``set(..., ex=)``/``delete``, so entries can be shared across workers.
+Entries in a shared backend are invalidated on write rather than updated, as
+the in-process lock cannot stop two workers overwriting each other's update.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class LRUBackend:
+    """Thread-safe in-process LRU with a per-entry TTL."""
+
+    shared = False
+
+    def __init__(self, max_entries=1000, ttl_seconds=300.0):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': 'lru',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
+
+
+class RedisBackend:
+    """Store pickled entries in Redis (or a compatible stand-in) with a TTL; eviction is Redis's job."""
+
+    shared = True
+
+    def __init__(self, client, ttl_seconds=300.0, prefix='dashboard:'):
+        self.client = client
+        self.ttl = float(ttl_seconds)
+        self.prefix = prefix
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        payload = self.client.get(f'{self.prefix}{key}')
+        if payload is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return pickle.loads(payload)
+
+    def set(self, key, value):
+        self.client.set(f'{self.prefix}{key}', pickle.dumps(value), ex=max(1, int(self.ttl)))
+
+    def delete(self, key):
+        self.client.delete(f'{self.prefix}{key}')
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            'backend': 'redis',
+            'ttl_seconds': self.ttl,
+            'hits': self._hits,
+            'misses': self._misses,
+            'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Rows saved together share a timestamp; ties fall back to the id, as in the loader's ORDER BY
+def _created_at(row):
+    return row.get('created_at') or datetime.min, row.get('id') or 0
+
+
+def _schedule_date(row):
+    return row['schedule_date'], row.get('id') or 0
+
+
+def _merge(items, new_items, key, limit, reverse):
+    merged = sorted(list(items) + list(new_items), key=key, reverse=reverse)
+    return merged[:limit]
+
+
+class DashboardCache:
+    """Cache ``loader(user_id)`` aggregates and fold new history rows into them."""
+
+    def __init__(self, loader, backend=None, recent_limit=5, series_limit=30):
+        self.loader = loader
+        self.backend = backend if backend is not None else LRUBackend()
+        self.recent_limit = recent_limit
+        self.series_limit = series_limit
+        self._lock = threading.Lock()
+        self._incremental_updates = 0
+        self._invalidations = 0
+        # user_id -> [commits started, commits finished, loads running]; dropped once all are settled,
+        # since no running load can then hold a snapshot of it
+        self._writes = {}
+
+    def _state(self, user_id):
+        return self._writes.setdefault(user_id, [0, 0, 0])
+
+    def _forget_if_idle(self, user_id, state):
+        if state[0] == state[1] and state[2] == 0:
+            del self._writes[user_id]
+
+    def get(self, user_id):
+        aggregates = self.backend.get(user_id)
+        if aggregates is None:
+            with self._lock:
+                state = self._state(user_id)
+                state[2] += 1
+                before = state[:2]
+            try:
+                aggregates = self.loader(user_id)
+            finally:
+                with self._lock:
+                    state[2] -= 1
+                    # Cache only if no commit for this user was running when the load began or started since
+                    if aggregates is not None and before[0] == before[1] and state[:2] == before:
+                        self.backend.set(user_id, aggregates)
+                    self._forget_if_idle(user_id, state)
+        return aggregates
+
+    def invalidate(self, user_id):
+        self.backend.delete(user_id)
+
+    @contextmanager
+    def writing(self, user_ids):
+        """Bracket a commit of history rows for ``user_ids``; call ``record()`` inside, after the commit."""
+        user_ids = set(user_ids)
+        with self._lock:
+            states = {user_id: self._state(user_id) for user_id in user_ids}
+            for state in states.values():
+                state[0] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                for user_id, state in states.items():
+                    state[1] += 1
+                    self._forget_if_idle(user_id, state)
+
+    def record(self, table, rows):
+        """Fold just-committed ``table`` rows into any cached aggregates; uncached users are skipped."""
+        by_user = {}
+        for row in rows:
+            by_user.setdefault(row['user_id'], []).append(row)
+
+        if self.backend.shared:
+            # Other workers update the same entries, so drop them and let the next read reload
+            for user_id in by_user:
+                self.backend.delete(user_id)
+            with self._lock:
+                self._invalidations += len(by_user)
+            return
+
+        # Read-modify-write under one lock so concurrent request threads don't drop updates
+        with self._lock:
+            for user_id, user_rows in by_user.items():
+                aggregates = self.backend.get(user_id)
+                if aggregates is None:
+                    continue
+                self.backend.set(user_id, self._apply(aggregates, table, user_rows))
+                self._incremental_updates += 1
+
+    def _apply(self, aggregates, table, rows):
+        # Build a new entry rather than mutating one that readers may be rendering
+        aggregates = dict(aggregates)
+        if table == 'crop_prediction':
+            aggregates['recent_predictions'] = _merge(
+                aggregates['recent_predictions'], rows, _created_at, self.recent_limit, reverse=True
+            )
+            counts = dict(aggregates['crop_counts'])
+            for row in rows:
+                counts[row['predicted_crop']] = counts.get(row['predicted_crop'], 0) + 1
+            aggregates['crop_counts'] = counts
+        elif table == 'fertilizer_recommendation':
+            aggregates['recent_recommendations'] = _merge(
+                aggregates['recent_recommendations'], rows, _created_at, self.recent_limit, reverse=True
+            )
+        elif table == 'irrigation_schedule':
+            aggregates['recent_schedules'] = _merge(
+                aggregates['recent_schedules'], rows, _schedule_date, self.recent_limit, reverse=True
+            )
+            aggregates['irrigation_series'] = _merge(
+                aggregates['irrigation_series'],
+                [{'schedule_date': row['schedule_date'], 'water_amount': row['water_amount']} for row in rows],
+                _schedule_date, self.series_limit, reverse=False,
+            )
+        return aggregates
+
+    def stats(self):
+        return dict(
+            self.backend.stats(), incremental_updates=self._incremental_updates, invalidations=self._invalidations
+        )
@@ -0,0 +1,246 @@
+"""Fast, cached loading of the training CSVs.
+
+Only the needed columns are parsed, with explicit float32 feature and
+categorical label dtypes. The cleaned frame is cached as a Parquet snapshot
+(a pickle when no Parquet engine is installed) keyed by the source file's
+SHA-256, size and mtime, so unchanged datasets are never re-parsed.
+Files too large to load are trained on chunk by chunk instead: ``scan_dataset``
+finds the classes in one pass and ``clean_chunk_iter`` feeds ``iter_clean_chunks``
+to an XGBoost external-memory matrix. xgboost is only imported for that, so
+loading data never pulls in its runtime.
+"""
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, 'instance', 'data_cache')
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def _parquet_available():
+    for engine in ('pyarrow', 'fastparquet'):
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _check_columns(path, columns):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset not found at {path}")
+    header = pd.read_csv(path, nrows=0).columns
+    missing_cols = [c for c in columns if c not in header]
+    if missing_cols:
+        raise ValueError(f"Dataset missing required columns: {', '.join(missing_cols)}")
+
+
+def _lowercase_categories(series):
+    """Lowercase a categorical's labels without touching the row data."""
+    categories = series.cat.categories.astype(str).str.lower()
+    merged, inverse = np.unique(categories, return_inverse=True)
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(codes, merged), index=series.index, name=series.name)
+
+
+def _clean(df, label_column, dropna_columns):
+    df = df.dropna(subset=dropna_columns)
+    df[label_column] = _lowercase_categories(df[label_column])
+    return df
+
+
+def iter_clean_chunks(path, feature_columns, label_column, dropna_columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield cleaned DataFrame chunks of at most ``chunksize`` source rows."""
+    columns = list(feature_columns) + [label_column]
+    dropna_columns = dropna_columns or [label_column]
+    _check_columns(path, columns)
+
+    dtypes = {col: 'float32' for col in feature_columns}
+    dtypes[label_column] = 'category'
+    reader = pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize)
+    for chunk in reader:
+        yield _clean(chunk[columns], label_column, dropna_columns)
+
+
+def scan_dataset(path, feature_columns, label_column, dropna_columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Return sorted class names and a frame of per-class feature means, reading one chunk at a time."""
+    feature_columns = list(feature_columns)
+    sums, counts = None, None
+    for chunk in iter_clean_chunks(path, feature_columns, label_column, dropna_columns, chunksize):
+        grouped = chunk[feature_columns].astype(float).groupby(chunk[label_column].astype(str))
+        chunk_sums, chunk_counts = grouped.sum(), grouped.size()
+        if sums is None:
+            sums, counts = chunk_sums, chunk_counts
+        else:
+            sums = sums.add(chunk_sums, fill_value=0)
+            counts = counts.add(chunk_counts, fill_value=0)
+    if sums is None or not len(sums):
+        raise ValueError(f"Dataset at {path} has no rows")
+    sums = sums.sort_index()
+    return sums.index.to_numpy(dtype=object), sums.div(counts, axis=0)
+
+
+@functools.lru_cache(maxsize=None)
+def _clean_chunk_iter_class():
+    # Defined on first use: the base class lives in xgboost, which serving never imports
+    import xgboost as xgb
+
+    class CleanChunkIter(xgb.DataIter):
+        def __init__(self, path, feature_columns, label_column, classes, dropna_columns=None,
+                     chunksize=DEFAULT_CHUNKSIZE, holdout=None, cache_prefix=None):
+            self.path = path
+            self.feature_columns = list(feature_columns)
+            self.label_column = label_column
+            self.classes = pd.Index(classes)
+            self.dropna_columns = dropna_columns
+            self.chunksize = chunksize
+            self.holdout = holdout
+            self._chunks = None
+            self._position = 0
+            super().__init__(cache_prefix=cache_prefix)
+
+        def reset(self):
+            self._chunks = None
+            self._position = 0
+
+        def next(self, input_data):
+            if self._chunks is None:
+                self._chunks = iter_clean_chunks(
+                    self.path, self.feature_columns, self.label_column, self.dropna_columns, self.chunksize
+                )
+            for chunk in self._chunks:
+                start, self._position = self._position, self._position + len(chunk)
+                if self.holdout is not None:
+                    every, keep = self.holdout
+                    held_out = np.arange(start, self._position) % every == 0
+                    chunk = chunk[held_out if keep else ~held_out]
+                if not len(chunk):
+                    continue
+                labels = chunk[self.label_column]
+                codes = self.classes.get_indexer(labels.cat.categories.astype(str))[labels.cat.codes.to_numpy()]
+                input_data(
+                    data=chunk[self.feature_columns].to_numpy(), label=codes, feature_names=self.feature_columns
+                )
+                return True
+            return False
+
+    return CleanChunkIter
+
+
+def clean_chunk_iter(path, feature_columns, label_column, classes, dropna_columns=None,
+                     chunksize=DEFAULT_CHUNKSIZE, holdout=None, cache_prefix=None):
+    """Return an xgboost DataIter feeding ``iter_clean_chunks`` to an (external-memory) QuantileDMatrix.
+
+    Labels are encoded against ``classes``, as ``encode_labels`` would.
+    ``holdout=(every, keep)`` splits rows by position: every ``every``-th row
+    is held out, and only those rows are passed on when ``keep`` is true,
+    only the others when it is false.
+    """
+    return _clean_chunk_iter_class()(
+        path, feature_columns, label_column, classes, dropna_columns, chunksize, holdout, cache_prefix
+    )
+
+
+def _snapshot_paths(path, cache_dir):
+    source_id = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    name = f'{os.path.basename(path)}-{source_id}'
+    extension = 'parquet' if _parquet_available() else 'pkl'
+    return (
+        os.path.join(cache_dir, f'{name}.snapshot.{extension}'),
+        os.path.join(cache_dir, f'{name}.snapshot.json'),
+    )
+
+
+def _snapshot_is_valid(meta_path, source_path, cache_key, stat):
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        # Missing, or truncated by a crash mid-write: rebuild the snapshot
+        return False
+    if meta.get('cache_key') != cache_key:
+        return False
+    if meta.get('size') != stat.st_size:
+        return False
+    # Same size and mtime: trust the recorded hash instead of re-reading the file
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    return meta.get('sha256') == file_sha256(source_path)
+
+
+def load_clean_dataset(path, feature_columns, label_column, dropna_columns=None,
+                       cache_dir=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Return the cleaned dataset, reusing a cached snapshot when the source is unchanged.
+
+    ``dropna_columns`` defaults to the label column. Pass ``cache_dir=False``
+    to skip the snapshot cache.
+    """
+    columns = list(feature_columns) + [label_column]
+    dropna_columns = list(dropna_columns or [label_column])
+    cache_key = json.dumps({'columns': columns, 'dropna': dropna_columns})
+
+    if cache_dir is not False:
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        snapshot_path, meta_path = _snapshot_paths(path, cache_dir)
+        _check_columns(path, columns)
+        stat = os.stat(path)
+        if os.path.exists(snapshot_path) and _snapshot_is_valid(meta_path, path, cache_key, stat):
+            if snapshot_path.endswith('.parquet'):
+                return pd.read_parquet(snapshot_path)
+            return pd.read_pickle(snapshot_path)
+
+    chunks = list(iter_clean_chunks(path, feature_columns, label_column, dropna_columns, chunksize))
+    if not chunks:
+        raise ValueError(f"Dataset at {path} has no rows")
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0].reset_index(drop=True)
+    # Chunks can disagree on categories; union them back into one categorical
+    if not isinstance(df[label_column].dtype, pd.CategoricalDtype):
+        df[label_column] = df[label_column].astype('category')
+    df[label_column] = df[label_column].cat.remove_unused_categories()
+
+    if cache_dir is not False:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = snapshot_path + '.tmp'
+        if snapshot_path.endswith('.parquet'):
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, snapshot_path)
+        meta = {
+            'source': os.path.abspath(path),
+            'cache_key': cache_key,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(path),
+            'rows': len(df),
+        }
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    return df
+
+
+def encode_labels(labels):
+    """Return sorted class names and integer codes for a categorical label column."""
+    labels = labels.astype('category').cat.remove_unused_categories()
+    order = np.argsort(labels.cat.categories.to_numpy(dtype=str))
+    classes = labels.cat.categories.to_numpy(dtype=object)[order]
+    remap = np.empty(len(order), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return classes, remap[labels.cat.codes.to_numpy()]
@@ -0,0 +1,21 @@
+"""Gunicorn settings for AgriSmart.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+MODEL_PRELOAD=true imports the app, and with it every ML model, once in the
+master before forking so workers share the model pages copy-on-write instead
+of each unpickling a private copy.
+"""
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = os.environ.get('MODEL_PRELOAD', 'False').lower() == 'true'
+
+
+def pre_fork(server, worker):
+    # Move everything built so far out of the cyclic GC's reach; otherwise its
+    # bookkeeping writes to every object header and un-shares the pages
+    gc.freeze()
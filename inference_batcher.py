@@ -0,0 +1,138 @@
+"""In-process micro-batching for the XGBoost predictors.
+
+Concurrent request threads submit single rows; a background thread collects
+them for up to ``max_wait_ms`` (or until ``max_batch_size`` rows are queued),
+runs one batched model call and hands each caller its own result.
+"""
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row predictions into one batched model call."""
+
+    def __init__(self, batch_fn, max_batch_size=32, max_wait_ms=2.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._owner_pid = None
+
+        self._batches = 0
+        self._requests = 0
+        self._batch_sizes = Counter()
+        self._last_batch_seconds = 0.0
+
+    def _ensure_worker(self):
+        # The worker starts on first use, and again in a forked child, so the
+        # batcher is safe to build before gunicorn forks its workers.
+        if self._thread is not None and self._owner_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._owner_pid == os.getpid():
+                return
+            if self._owner_pid != os.getpid():
+                self._queue = queue.Queue()
+            self._owner_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+            self._thread.start()
+
+    def submit(self, row, timeout=None):
+        """Queue one feature row and block until its prediction is ready."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future.result(timeout)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect(self._queue.get())
+            rows = [row for row, _ in batch]
+
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn(rows)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._last_batch_seconds = elapsed
+
+    def stats(self):
+        """Return queue depth and batch-size metrics."""
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'requests': self._requests,
+                'avg_batch_size': round(self._requests / self._batches, 2) if self._batches else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'last_batch_ms': round(self._last_batch_seconds * 1000.0, 3),
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+            }
+
+
+class BatchedCropPredictor:
+    """Drop-in front for CropPredictor that routes predict() through a MicroBatcher."""
+
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=2.0):
+        self.predictor = predictor
+        self.batcher = MicroBatcher(predictor.predict_batch, max_batch_size, max_wait_ms)
+
+    def predict(self, nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, top_k=3):
+        row = [nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall]
+        if top_k != 3:
+            # Batches are ranked with the default k; other depths go straight to the model
+            return self.predictor.predict_batch([row], top_k=top_k)[0]
+        return self.batcher.submit(row)
+
+    def __getattr__(self, name):
+        return getattr(self.predictor, name)
+
+
+class BatchedFertilizerCropClassifier:
+    """Drop-in front for FertilizerCropClassifier that batches predict_crop()."""
+
+    def __init__(self, classifier, max_batch_size=32, max_wait_ms=2.0):
+        self.classifier = classifier
+        self.batcher = MicroBatcher(classifier.predict_crop_batch, max_batch_size, max_wait_ms)
+
+    def predict_crop(self, nitrogen, phosphorus, potassium, ph, soil_moisture, top_k=3):
+        row = [nitrogen, phosphorus, potassium, ph, soil_moisture]
+        if top_k != 3:
+            return self.classifier.predict_crop_batch([row], top_k=top_k)[0]
+        return self.batcher.submit(row)
+
+    def __getattr__(self, name):
+        return getattr(self.classifier, name)
@@ -0,0 +1,183 @@
+"""Stage timings, model counters and a Prometheus text exposition for /metrics.
+
+Instrumentation is off until ``enable()`` is called (METRICS_ENABLED=true):
+``stage()`` then returns a shared no-op context manager and ``timed`` wrappers
+skip straight to the wrapped call, so the disabled cost is one flag check.
+Values are per process; under gunicorn each worker serves its own numbers.
+"""
+import bisect
+import functools
+import threading
+import time
+from contextlib import nullcontext
+
+_enabled = False
+_NOOP = nullcontext()
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(float(bound))
+                    lines.append(
+                        f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", le)])} {cumulative}'
+                    )
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """Metrics plus collector callbacks that report gauges/counters at scrape time."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """``collect()`` yields ``(name, type, help, [(labels_dict, value), ...])``."""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    'agrismart_request_duration_seconds', 'Request latency by endpoint', ('endpoint', 'method', 'status')
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    'agrismart_stage_duration_seconds', 'Time spent in each stage of a route handler', ('route', 'stage')
+)
+MODEL_CALLS = REGISTRY.counter('agrismart_model_calls_total', 'Model invocations', ('model', 'method'))
+MODEL_SECONDS = REGISTRY.histogram(
+    'agrismart_model_duration_seconds', 'Model call latency', ('model', 'method')
+)
+MODEL_BATCH_ROWS = REGISTRY.histogram(
+    'agrismart_model_batch_rows', 'Rows per model call', ('model', 'method'), buckets=ROW_BUCKETS
+)
+
+
+class _StageTimer:
+    __slots__ = ('labels', 'started')
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        STAGE_SECONDS.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+def stage(route, name):
+    """Context manager timing one stage (parse, predict, persist, render) of ``route``."""
+    if not _enabled:
+        return _NOOP
+    return _StageTimer((route, name))
+
+
+def timed(model, method):
+    """Decorate a ``(self, X, ...)`` model method to count calls, rows and latency."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, X, *args, **kwargs):
+            if not _enabled:
+                return fn(self, X, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(self, X, *args, **kwargs)
+            finally:
+                MODEL_SECONDS.observe(time.perf_counter() - started, model, method)
+                MODEL_CALLS.inc(model, method)
+                MODEL_BATCH_ROWS.observe(len(X), model, method)
+        return wrapper
+    return decorator
@@ -1,268 +1,914 @@
+import copy
+import json
+import logging
+import tempfile
+import threading
+import time
+from datetime import datetime
+from collections import OrderedDict
+
 import numpy as np
-import xgboost as xgb
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 import joblib
 import os
 import pandas as pd
 
+import instrumentation
+from artifact_store import CHECKPOINT_FILE, ArtifactError, ArtifactStore, umask
+from data_loading import DEFAULT_CHUNKSIZE, clean_chunk_iter, encode_labels, load_clean_dataset, scan_dataset
+from tree_engine import CompiledForest, NativeBooster
+
+logger = logging.getLogger(__name__)
+
+
+def _as_feature_matrix(features, feature_columns):
+    """Coerce an N×F array or DataFrame into a float matrix in feature order."""
+    if isinstance(features, pd.DataFrame):
+        missing_cols = [c for c in feature_columns if c not in features.columns]
+        if missing_cols:
+            raise ValueError(f"Batch missing required columns: {', '.join(missing_cols)}")
+        features = features[feature_columns]
+
+    X = np.asarray(features, dtype=float)
+    if X.size == 0:
+        return np.empty((0, len(feature_columns)))
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    if X.ndim != 2 or X.shape[1] != len(feature_columns):
+        raise ValueError(f"Expected an N×{len(feature_columns)} feature matrix, got shape {X.shape}")
+    return X
+
+
+def _top_k(probabilities, top_k):
+    """Return per-row top-k column indices and probabilities, best first.
+
+    Ties rank the lower class index first, so column 0 always equals argmax.
+    """
+    k = max(1, min(int(top_k), probabilities.shape[1]))
+    # argpartition picks the top-k columns per row, then only those k are sorted
+    top = np.argpartition(probabilities, -k, axis=1)[:, -k:]
+    top_probs = np.take_along_axis(probabilities, top, axis=1)
+    order = np.lexsort((top, -top_probs), axis=1)
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_probs, order, axis=1)
+
+
+class ClassRanker:
+    """Batch top-k over class probabilities with the labels cached as a NumPy string array."""
+
+    def __init__(self, classes):
+        self.classes = np.asarray(classes).astype(str)
+
+    def __len__(self):
+        return len(self.classes)
+
+    def top_k(self, probabilities, k=3):
+        """Return labels (lists of str) and probabilities (N×k array) for the k best classes per row."""
+        top, top_probs = _top_k(probabilities, k)
+        return self.classes[top].tolist(), top_probs
+
+
+def _atomic_write(path, write):
+    """Write a file through a temp file in the same directory, then rename it into place."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # mkstemp creates 0600 files; give the result the mode a plain open() would
+        os.chmod(tmp_path, 0o666 & ~umask())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _round_like_python(values, ndigits):
+    """Round with Python's correctly rounded ``round``; np.round differs on halfway cases."""
+    return np.array([round(v, ndigits) for v in np.asarray(values, dtype=float).tolist()])
+
+
+def _load_compiled_forest(compiled_path, model_path):
+    """Memory-map a compiled forest unless it is missing or older than the joblib artifact."""
+    meta_path = os.path.join(compiled_path, 'meta.json') if compiled_path else None
+    if not meta_path or not os.path.exists(meta_path):
+        return None
+    if os.path.exists(model_path) and os.path.getmtime(model_path) > os.path.getmtime(meta_path):
+        return None
+    # Read-only maps share the page cache across worker processes
+    return CompiledForest.load(compiled_path, mmap_mode='r')
+
+
+def _artifact_file(store, model_path):
+    """Path of the artifact currently being served: the store's current version, else the legacy file."""
+    current = store.model_file() if store is not None else None
+    return current or model_path
+
+
+def _load_artifact(store, model_path, feature_columns):
+    """Return ``(payload, version)`` from the store's current version or the legacy file, or None."""
+    if store is not None and store.current_version() is not None:
+        payload, manifest = store.load()
+        if manifest['feature_columns'] != list(feature_columns):
+            raise ArtifactError(
+                f"Version {manifest['version']} expects features {manifest['feature_columns']}, "
+                f"not {list(feature_columns)}"
+            )
+        return payload, manifest['version']
+    if os.path.exists(model_path):
+        return joblib.load(model_path), None
+    return None
+
+
+def _save_artifact(store, model_path, payload, feature_columns, metadata=None, model_format='ubj'):
+    """Publish ``payload`` as a new store version (or atomically replace the legacy file); returns the version.
+
+    Store versions default to XGBoost's native UBJSON format; the legacy single file is always a joblib pickle.
+    """
+    if store is None:
+        _atomic_write(model_path, lambda path: joblib.dump(payload, path))
+        return None
+    manifest = store.publish(
+        payload, feature_columns, payload['classes'], metadata=metadata, model_format=model_format
+    )
+    return manifest['version']
+
+
+def _maybe_reload(predictor):
+    """Pick up a newly published version at most once per ``reload_interval`` seconds.
+
+    Only the thread that wins the lock checks (and loads); every other request
+    keeps predicting with the model already being served.
+    """
+    if not predictor.reload_interval or predictor.store is None:
+        return
+    now = time.monotonic()
+    if now < predictor._next_reload_check or not predictor._reload_lock.acquire(blocking=False):
+        return
+    try:
+        predictor._next_reload_check = now + predictor.reload_interval
+        predictor.reload_if_changed()
+    finally:
+        predictor._reload_lock.release()
+
+
+# Label set for synthetic training data; served models decode through their saved classes
+SYNTHETIC_CROPS = (
+    'rice', 'wheat', 'maize', 'chickpea', 'kidneybeans', 'pigeonpeas', 'mothbeans', 'mungbean',
+    'blackgram', 'lentil', 'pomegranate', 'banana', 'mango', 'grapes', 'watermelon', 'muskmelon',
+    'apple', 'orange', 'papaya', 'coconut', 'cotton', 'jute', 'coffee',
+)
+# Uniform sampling ranges for N, P, K, temperature, humidity, ph, rainfall
+SYNTHETIC_FEATURE_RANGES = np.array([
+    [0, 140],
+    [5, 145],
+    [5, 205],
+    [8, 44],
+    [14, 100],
+    [3.5, 9.5],
+    [20, 300],
+])
+_SYNTHETIC_BLOCK_ROWS = 65536
+
+
+def _synthetic_crop_labels(X, rng, n_classes):
+    """Rule-based crop indices for synthetic rows, first matching rule wins."""
+    n, k, temp, ph, rain = X[:, 0], X[:, 2], X[:, 3], X[:, 5], X[:, 6]
+    conditions = [
+        (temp < 20) & (rain > 100),
+        (temp > 30) & (rain > 200),
+        (temp >= 20) & (temp <= 30) & (rain < 100),
+        (ph > 7) & (temp > 25),
+        (n > 80) & (k > 80),
+        (temp > 28) & (rain > 150),
+    ]
+    choices = [1, 0, 2, 11, 20, 22]  # wheat, rice, maize, banana, cotton, coffee
+    fallback = rng.integers(0, n_classes, size=len(X))
+    return np.select(conditions, choices, default=fallback)
+
+
+def iter_synthetic_crop_data(n_samples, seed=42, n_classes=23, chunk_size=1_000_000, dtype=np.float32):
+    """Yield ``(X, crop_idx)`` chunks of at most ``chunk_size`` synthetic rows.
+
+    Rows are generated in fixed-size blocks, each with its own generator seeded
+    from ``(seed, block_index)``, so the stream is identical for any chunk size
+    and never holds more than one chunk plus one block in memory.
+    """
+    low, high = SYNTHETIC_FEATURE_RANGES[:, 0], SYNTHETIC_FEATURE_RANGES[:, 1]
+    pending_X, pending_y, pending_rows = [], [], 0
+
+    for block, start in enumerate(range(0, n_samples, _SYNTHETIC_BLOCK_ROWS)):
+        rows = min(_SYNTHETIC_BLOCK_ROWS, n_samples - start)
+        rng = np.random.default_rng([seed, block])
+        X = rng.uniform(low, high, size=(rows, len(low))).astype(dtype, copy=False)
+        pending_X.append(X)
+        pending_y.append(_synthetic_crop_labels(X, rng, n_classes))
+        pending_rows += rows
+
+        while pending_rows >= chunk_size:
+            X_all, y_all = np.concatenate(pending_X), np.concatenate(pending_y)
+            yield X_all[:chunk_size], y_all[:chunk_size]
+            pending_X, pending_y = [X_all[chunk_size:]], [y_all[chunk_size:]]
+            pending_rows -= chunk_size
+
+    if pending_rows:
+        yield np.concatenate(pending_X), np.concatenate(pending_y)
+
+
+def generate_synthetic_crop_data(n_samples, seed=42, n_classes=23, dtype=np.float32):
+    """Return the full synthetic feature matrix and crop indices in memory."""
+    chunks = list(iter_synthetic_crop_data(n_samples, seed, n_classes, chunk_size=max(n_samples, 1), dtype=dtype))
+    if not chunks:
+        return np.empty((0, len(SYNTHETIC_FEATURE_RANGES)), dtype=dtype), np.empty(0, dtype=np.int64)
+    return chunks[0]
+
+
+def _fit_xgb_classifier(params, X, y, train_options=None):
+    """Fit an XGBClassifier and return it with a small training report.
+
+    ``train_options`` may set ``n_jobs`` and ``tree_method`` (passed to
+    XGBoost), ``validation_fraction`` for a stratified holdout used to score
+    the model, and ``early_stopping_rounds`` to stop boosting once the holdout
+    loss stops improving (a 20% holdout is used if no fraction is given). The
+    returned model is then refit on all rows, with the early-stopped round count.
+    """
+    import xgboost as xgb
+
+    options = train_options or {}
+    params = dict(params)
+    for key in ('n_jobs', 'tree_method'):
+        if options.get(key) is not None:
+            params[key] = options[key]
+
+    early_stopping_rounds = options.get('early_stopping_rounds')
+    validation_fraction = options.get('validation_fraction') or (0.2 if early_stopping_rounds else 0)
+    if not validation_fraction:
+        model = xgb.XGBClassifier(**params)
+        model.fit(X, y)
+        return model, {'n_train': len(y)}
+
+    try:
+        X_train, X_valid, y_train, y_valid = train_test_split(
+            X, y, test_size=validation_fraction, random_state=42, stratify=y
+        )
+    except ValueError:
+        # Classes with a single sample cannot be stratified
+        X_train, X_valid, y_train, y_valid = train_test_split(
+            X, y, test_size=validation_fraction, random_state=42
+        )
+
+    if early_stopping_rounds:
+        params['early_stopping_rounds'] = early_stopping_rounds
+    model = xgb.XGBClassifier(**params)
+    model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+
+    report = {
+        'n_train': len(y),
+        'n_valid': len(y_valid),
+        'accuracy': float(np.mean(model.predict(X_valid) == np.asarray(y_valid))),
+    }
+    if early_stopping_rounds:
+        report['best_iteration'] = int(model.best_iteration)
+        params.pop('early_stopping_rounds')
+        params['n_estimators'] = report['best_iteration'] + 1
+
+    # The holdout only scores the model (and picks the round count); the served model sees every row
+    model = xgb.XGBClassifier(**params)
+    model.fit(X, y)
+    return model, report
+
+
+# XGBClassifier settings that are not booster parameters; xgb.train warns about them
+_WRAPPER_ONLY_PARAMS = frozenset((
+    'n_estimators', 'early_stopping_rounds', 'callbacks', 'importance_type', 'missing',
+    'enable_categorical', 'feature_types', 'feature_weights', 'use_label_encoder', 'kwargs',
+))
+
+
+def _booster_params(params):
+    """Keep the booster parameters of sklearn-wrapper ``params`` (n_jobs and random_state are aliases)."""
+    return {k: v for k, v in params.items() if v is not None and k not in _WRAPPER_ONLY_PARAMS}
+
+
+def _fit_xgb_streaming(params, chunk_iter, train_options=None):
+    """Out-of-core ``_fit_xgb_classifier``: train from ``chunk_iter(holdout, cache_prefix)`` iterators.
+
+    Each pass quantises the chunks into an ExtMemQuantileDMatrix whose pages
+    are cached in a temporary directory, so neither the parsed frame nor the
+    float matrix is held in memory. The holdout is every
+    ``round(1 / validation_fraction)``-th row rather than a stratified sample;
+    the returned model is refit on all rows, as in ``_fit_xgb_classifier``.
+    """
+    import xgboost as xgb
+
+    options = train_options or {}
+    params = dict(params)
+    for key in ('n_jobs', 'tree_method'):
+        if options.get(key) is not None:
+            params[key] = options[key]
+    # ``params`` keeps n_estimators for the manifest; xgb.train takes the round count separately
+    booster_params = _booster_params(params)
+
+    early_stopping_rounds = options.get('early_stopping_rounds')
+    validation_fraction = options.get('validation_fraction') or (0.2 if early_stopping_rounds else 0)
+    rounds = params['n_estimators']
+    report = {}
+    with tempfile.TemporaryDirectory(prefix='xgb-pages-') as cache_dir:
+        def matrix(holdout, name, ref=None):
+            return xgb.ExtMemQuantileDMatrix(chunk_iter(holdout, os.path.join(cache_dir, name)), ref=ref)
+
+        if validation_fraction:
+            every = max(2, round(1 / validation_fraction))
+            train_matrix = matrix((every, False), 'train')
+            valid_matrix = matrix((every, True), 'valid', ref=train_matrix)
+            booster = xgb.train(
+                booster_params, train_matrix, rounds, evals=[(valid_matrix, 'valid')],
+                early_stopping_rounds=early_stopping_rounds, verbose_eval=False,
+            )
+            iteration_range = (0, booster.best_iteration + 1) if early_stopping_rounds else (0, 0)
+            predicted = booster.predict(valid_matrix, iteration_range=iteration_range)
+            if predicted.ndim == 2:
+                predicted = predicted.argmax(axis=1)
+            report['n_valid'] = valid_matrix.num_row()
+            report['accuracy'] = float(np.mean(predicted == valid_matrix.get_label()))
+            if early_stopping_rounds:
+                report['best_iteration'] = int(booster.best_iteration)
+                rounds = report['best_iteration'] + 1
+            del train_matrix, valid_matrix
+
+        full_matrix = matrix(None, 'full')
+        booster = xgb.train(booster_params, full_matrix, rounds)
+        report = {'n_train': full_matrix.num_row(), **report}
+        del full_matrix
+
+    params['n_estimators'] = rounds
+    return NativeBooster(booster, params), report
+
+
+def _streamed_dataset(path, feature_columns, label_column, dropna_columns, train_options):
+    """Scan a CSV for its classes and per-class means; return them with a ``clean_chunk_iter`` factory."""
+    chunksize = train_options.get('chunksize') or DEFAULT_CHUNKSIZE
+    classes, means = scan_dataset(path, feature_columns, label_column, dropna_columns, chunksize)
+
+    def chunk_iter(holdout, cache_prefix):
+        return clean_chunk_iter(
+            path, feature_columns, label_column, classes, dropna_columns, chunksize,
+            holdout=holdout, cache_prefix=cache_prefix,
+        )
+
+    return classes, means, chunk_iter
+
+
+class PredictionCache:
+    """Bounded LRU cache of prediction results keyed on quantized inputs.
+
+    Each feature is snapped to a grid of ``steps[name]`` (e.g. N to 1 unit, pH
+    to 0.1) so near-identical soil readings share one entry: the first reading
+    predicted in a bucket answers for the rest of it.  Owners clear the cache
+    whenever their model is trained or reloaded.
+    """
+
+    def __init__(self, feature_columns, steps=None, max_entries=10000):
+        steps = steps or {}
+        self.feature_columns = list(feature_columns)
+        self.steps = np.array([float(steps.get(col, 1.0)) for col in self.feature_columns])
+        if (self.steps <= 0).any():
+            raise ValueError("Quantization steps must be positive")
+        self.max_entries = int(max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def quantize(self, X):
+        """Return the integer grid coordinates of each row."""
+        return np.round(X / self.steps)
+
+    def keys(self, grid, *extra):
+        finite = np.isfinite(grid).all(axis=1)
+        return [
+            (*row, *extra) if ok else None
+            for row, ok in zip(grid.astype(np.int64).tolist(), finite)
+        ]
+
+    def get_many(self, keys):
+        """Look up every key under one lock; misses (and None keys) come back as None."""
+        results = []
+        with self._lock:
+            for key in keys:
+                value = self._entries.get(key) if key is not None else None
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                elif key is not None:
+                    self.misses += 1
+                results.append(value)
+        return results
+
+    def put_many(self, items):
+        """Store ``(key, value)`` pairs under one lock, skipping None keys."""
+        with self._lock:
+            for key, value in items:
+                if key is None:
+                    continue
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _predict_with_cache(cache, X, predict_fn, top_k, version=None):
+    """Serve rows from ``cache`` and run ``predict_fn`` only on the misses.
+
+    Misses are predicted on the actual readings; the grid only forms the key.
+    Keys include the model version, so results computed while a reload swaps
+    models can never be served for the new one.
+    """
+    keys = cache.keys(cache.quantize(X), top_k, version)
+    results = cache.get_many(keys)
+    missing = [row for row, result in enumerate(results) if result is None]
+    if missing:
+        fresh = predict_fn(X[missing], top_k)
+        cache.put_many((keys[row], result) for row, result in zip(missing, fresh))
+        for row, result in zip(missing, fresh):
+            results[row] = result
+    # Entries are shared between callers: each gets its own top-level dict, nested values are read-only
+    return [dict(result) for result in results]
+
+
+_EMPTY_CHECKPOINT = {'watermark': 0, 'incremental_rows': 0, 'incremental_rounds': 0}
+
 
 class CropPredictor:
-    def __init__(self, data_path=None, model_path=None, force_retrain=False):
+    def __init__(self, data_path=None, model_path=None, force_retrain=False, allow_train=True,
+                 compiled_path=None, cache=None, train_options=None, artifact_dir=None, reload_interval=None):
         self.model = None
+        self.cache = cache
+        self.train_options = train_options or {}
+        self.training_report = None
+        self.allow_train = allow_train
+        self.compiled_path = compiled_path
         self.label_encoder = LabelEncoder()
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.data_path = data_path or os.path.join(base_dir, 'Data', 'Crop_recommendation.csv')
         self.model_path = model_path or os.path.join(base_dir, 'instance', 'crop_xgb_model.joblib')
+        # Versions live in the artifact store; an explicit model_path alone keeps the single-file layout
+        if artifact_dir is None and model_path is None:
+            artifact_dir = os.path.join(base_dir, 'instance', 'models', 'crop')
+        self.store = ArtifactStore(artifact_dir) if artifact_dir else None
+        self.version = None
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._next_reload_check = 0.0
+        self._rejected_version = None
         self.feature_columns = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
-        self.crops = [
-            'rice',
-            'wheat',
-            'maize',
-            'chickpea',
-            'kidneybeans',
-            'pigeonpeas',
-            'mothbeans',
-            'mungbean',
-            'blackgram',
-            'lentil',
-            'pomegranate',
-            'banana',
-            'mango',
-            'grapes',
-            'watermelon',
-            'muskmelon',
-            'apple',
-            'orange',
-            'papaya',
-            'coconut',
-            'cotton',
-            'jute',
-            'coffee',
-        ]
+        self._serving = (None, None)
 
         self._load_or_train(force_retrain)
 
     def _load_or_train(self, force_retrain):
-        if not force_retrain and os.path.exists(self.model_path):
-            payload = joblib.load(self.model_path)
-            self.model = payload['model']
-            self.label_encoder.classes_ = payload['classes']
-            return
+        if not force_retrain:
+            forest = _load_compiled_forest(self.compiled_path, _artifact_file(self.store, self.model_path))
+            if forest is not None:
+                # A compiled export newer than the current version stands in for it
+                self._activate(forest, forest.classes_, self.store.current_version() if self.store else None)
+                return
+
+            loaded = _load_artifact(self.store, self.model_path, self.feature_columns)
+            if loaded is not None:
+                payload, version = loaded
+                self._activate(payload['model'], payload['classes'], version)
+                return
+
+        if not self.allow_train:
+            raise FileNotFoundError(
+                f"No trained crop model at {self.store.root if self.store else self.model_path}; "
+                "run train_models.py to create it"
+            )
 
         if os.path.exists(self.data_path):
             self._train_from_dataset()
         else:
-            self._train_synthetic()
+            self._train_synthetic(n_samples=self.train_options.get('synthetic_samples', 2200))
 
-    def _train_from_dataset(self):
-        df = pd.read_csv(self.data_path)
-        df = df.drop(columns=[c for c in df.columns if c.lower().startswith('unnamed')], errors='ignore')
-        df = df.dropna(subset=self.feature_columns + ['label'])
-        df['label'] = df['label'].str.lower()
-
-        X = df[self.feature_columns].astype(float)
-        y = df['label']
-        y_encoded = self.label_encoder.fit_transform(y)
-
-        self.model = xgb.XGBClassifier(
-            n_estimators=300,
-            max_depth=6,
-            learning_rate=0.08,
-            subsample=0.9,
-            colsample_bytree=0.9,
-            objective='multi:softprob',
-            num_class=len(self.label_encoder.classes_),
-            random_state=42,
+    def _activate(self, model, classes, version=None):
+        """Swap in a model and its labels with one assignment so in-flight predictions never mix versions."""
+        self.label_encoder.classes_ = classes
+        self.model = model
+        self.version = version
+        self._serving = (model, ClassRanker(classes))
+        self._invalidate_cache()
+
+    def _publish(self, model, metadata=None, checkpoint=None):
+        """Publish ``model``; its watermark is ``checkpoint``, so a full retrain starts from zero again."""
+        payload = {'model': model, 'classes': self.label_encoder.classes_}
+        metadata = {'model': 'crop', 'training_report': self.training_report, **(metadata or {})}
+        version = _save_artifact(
+            self.store, self.model_path, payload, self.feature_columns, metadata,
+            self.train_options.get('model_format', 'ubj'),
         )
-        self.model.fit(X, y_encoded)
-
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump({'model': self.model, 'classes': self.label_encoder.classes_}, self.model_path)
-
-    def _train_synthetic(self):
-        np.random.seed(42)
-        n_samples = 2200
-
-        N = np.random.uniform(0, 140, n_samples)
-        P = np.random.uniform(5, 145, n_samples)
-        K = np.random.uniform(5, 205, n_samples)
-        temperature = np.random.uniform(8, 44, n_samples)
-        humidity = np.random.uniform(14, 100, n_samples)
-        ph = np.random.uniform(3.5, 9.5, n_samples)
-        rainfall = np.random.uniform(20, 300, n_samples)
-
-        X = np.column_stack([N, P, K, temperature, humidity, ph, rainfall])
-
-        y = []
-        for i in range(n_samples):
-            crop_idx = self._determine_crop(
-                N[i],
-                P[i],
-                K[i],
-                temperature[i],
-                humidity[i],
-                ph[i],
-                rainfall[i],
+        self._write_checkpoint(checkpoint or _EMPTY_CHECKPOINT, version)
+        self._activate(model, payload['classes'], version)
+
+    def reload_if_changed(self):
+        """Serve the store's current version if it differs from the loaded one; returns True on a swap."""
+        version = self.store.current_version() if self.store is not None else None
+        if version is None or version in (self.version, self._rejected_version):
+            return False
+        try:
+            self._load_or_train(force_retrain=False)
+        except Exception:
+            # Keep serving the model we have; a bad version is not retried
+            logger.exception("Could not load crop model version %s", version)
+            self._rejected_version = version
+            return False
+        logger.info("Crop model reloaded: now serving version %s", self.version)
+        return True
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+    @property
+    def ranker(self):
+        return self._serving[1]
+
+    def _train_from_dataset(self):
+        dropna_columns = self.feature_columns + ['label']
+        params = {
+            'n_estimators': 300,
+            'max_depth': 6,
+            'learning_rate': 0.08,
+            'subsample': 0.9,
+            'colsample_bytree': 0.9,
+            'objective': 'multi:softprob',
+            'random_state': 42,
+        }
+        if self.train_options.get('stream'):
+            self.label_encoder.classes_, _, chunk_iter = _streamed_dataset(
+                self.data_path, self.feature_columns, 'label', dropna_columns, self.train_options
+            )
+            params['num_class'] = len(self.label_encoder.classes_)
+            model, self.training_report = _fit_xgb_streaming(params, chunk_iter, self.train_options)
+        else:
+            df = load_clean_dataset(self.data_path, self.feature_columns, 'label', dropna_columns=dropna_columns)
+            self.label_encoder.classes_, y_encoded = encode_labels(df['label'])
+            params['num_class'] = len(self.label_encoder.classes_)
+            model, self.training_report = _fit_xgb_classifier(
+                params, df[self.feature_columns], y_encoded, self.train_options
             )
-            y.append(self.crops[crop_idx])
+        self._publish(model)
 
-        y_encoded = self.label_encoder.fit_transform(y)
+    def _train_synthetic(self, n_samples=2200, seed=42):
+        X, crop_idx = generate_synthetic_crop_data(n_samples, seed=seed, n_classes=len(SYNTHETIC_CROPS))
 
-        self.model = xgb.XGBClassifier(
-            n_estimators=100,
-            max_depth=8,
-            learning_rate=0.1,
-            random_state=42,
-            objective='multi:softmax',
-            num_class=len(self.crops),
+        # Encode via integer lookups instead of LabelEncoder over millions of strings
+        present = np.unique(crop_idx)
+        names = np.asarray(SYNTHETIC_CROPS)[present]
+        order = np.argsort(names)
+        lookup = np.full(len(SYNTHETIC_CROPS), -1, dtype=np.int64)
+        lookup[present[order]] = np.arange(len(present))
+        self.label_encoder.classes_ = names[order].astype(object)
+        y_encoded = lookup[crop_idx]
+
+        model, self.training_report = _fit_xgb_classifier(
+            {
+                'n_estimators': 100,
+                'max_depth': 8,
+                'learning_rate': 0.1,
+                'random_state': 42,
+                'objective': 'multi:softmax',
+                'num_class': len(self.label_encoder.classes_),
+            },
+            X,
+            y_encoded,
+            self.train_options,
         )
-        self.model.fit(X, y_encoded)
-
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump({'model': self.model, 'classes': self.label_encoder.classes_}, self.model_path)
-
-    def _determine_crop(self, n, p, k, temp, hum, ph, rain):
-        """Rule-based crop determination for synthetic data."""
-        if temp < 20 and rain > 100:
-            return 1  # wheat
-        if temp > 30 and rain > 200:
-            return 0  # rice
-        if 20 <= temp <= 30 and rain < 100:
-            return 2  # maize
-        if ph > 7 and temp > 25:
-            return 11  # banana
-        if n > 80 and k > 80:
-            return 20  # cotton
-        if temp > 28 and rain > 150:
-            return 22  # coffee
-        return np.random.randint(0, len(self.crops))
-
-    def predict(self, nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall):
-        """Predict the best crop for given conditions."""
-        features = np.array([[nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall]])
+        self._publish(model)
+
+    def checkpoint_path(self, version=None):
+        """Incremental-training watermark of a store version (default: current), or beside a single-file model."""
+        version = version or (self.store.current_version() if self.store is not None else None)
+        if version is not None:
+            return os.path.join(self.store.version_dir(version), CHECKPOINT_FILE)
+        return os.path.splitext(self.model_path)[0] + '.checkpoint.json'
+
+    def read_checkpoint(self, version=None):
+        path = self.checkpoint_path(version)
+        if not os.path.exists(path):
+            return dict(_EMPTY_CHECKPOINT)
+        with open(path) as f:
+            return json.load(f)
 
-        prediction = self.model.predict(features)
-        probabilities = self.model.predict_proba(features)[0]
+    def _write_checkpoint(self, checkpoint, version=None):
+        checkpoint = dict(checkpoint, updated_at=datetime.utcnow().isoformat())
+        _atomic_write(self.checkpoint_path(version), lambda path: _write_json(path, checkpoint))
 
-        crop = self.label_encoder.inverse_transform(prediction)[0]
-        confidence = float(max(probabilities)) * 100
+    def train_incremental(self, features, labels, watermark, n_rounds=20):
+        """Continue boosting the saved model on rows added since the last checkpoint.
 
-        top_indices = np.argsort(probabilities)[-3:][::-1]
-        recommendations = [
+        ``watermark`` is the highest source row id included in this update; it is
+        stored in the checkpoint so the next run only picks up newer rows.
+        Labels outside the model's class list are dropped, since the number of
+        output classes is fixed once a booster has been trained.
+        """
+        import xgboost as xgb
+
+        loaded = _load_artifact(self.store, self.model_path, self.feature_columns)
+        if loaded is None:
+            raise FileNotFoundError("No trained crop model to update; run train_models.py first")
+        payload, base_version = loaded
+        base_model = payload['model']
+        classes = np.asarray(payload['classes'])
+
+        X = _as_feature_matrix(features, self.feature_columns)
+        class_index = {str(c): i for i, c in enumerate(classes)}
+        y = np.array([class_index.get(str(label).lower(), -1) for label in labels], dtype=np.int64)
+        known = y >= 0
+        X, y = X[known], y[known]
+
+        checkpoint = self.read_checkpoint(base_version)
+        report = {'rows': int(len(y)), 'dropped_rows': int((~known).sum()), 'rounds': 0}
+        checkpoint = {
+            'watermark': int(max(watermark, checkpoint['watermark'])),
+            'incremental_rows': checkpoint['incremental_rows'] + report['rows'],
+            'incremental_rounds': checkpoint['incremental_rounds'] + (n_rounds if len(y) else 0),
+        }
+        if len(y):
+            booster = base_model.get_booster()
+            # Continue from the early-stopped model that predict_proba actually uses
+            best_iteration = booster.attr('best_iteration')
+            if best_iteration is not None:
+                booster = booster[: int(best_iteration) + 1]
+
+            params = _booster_params(base_model.get_xgb_params())
+            if self.train_options.get('n_jobs') is not None:
+                params['n_jobs'] = self.train_options['n_jobs']
+            dtrain = xgb.DMatrix(X, label=y, feature_names=booster.feature_names)
+            booster = xgb.train(params, dtrain, num_boost_round=n_rounds, xgb_model=booster)
+            booster.set_attr(best_iteration=None, best_score=None)
+
+            if isinstance(base_model, NativeBooster):
+                model = NativeBooster(booster, params)
+            else:
+                model = copy.copy(base_model)
+                model._Booster = booster
+                model.set_params(n_estimators=booster.num_boosted_rounds())
+            self.label_encoder.classes_ = payload['classes']
+            self._publish(model, {
+                'training_report': None,
+                'incremental': {'base_version': base_version, 'rows': int(len(y)), 'rounds': n_rounds},
+            }, checkpoint=checkpoint)
+            report['rounds'] = n_rounds
+            report['total_rounds'] = booster.num_boosted_rounds()
+        else:
+            # Nothing new to learn; still advance the watermark past the dropped rows
+            self._write_checkpoint(checkpoint, base_version)
+        report['watermark'] = checkpoint['watermark']
+        return report
+
+    def predict_batch(self, features, top_k=3):
+        """Predict the best crops for many samples with a single booster call."""
+        X = _as_feature_matrix(features, self.feature_columns)
+        if len(X) == 0:
+            return []
+        _maybe_reload(self)
+        if self.cache is not None:
+            return _predict_with_cache(self.cache, X, self._predict_matrix, top_k, self.version)
+        return self._predict_matrix(X, top_k)
+
+    @instrumentation.timed('crop_predictor', 'predict')
+    def _predict_matrix(self, X, top_k):
+        model, ranker = self._serving
+        probabilities = model.predict_proba(X)
+        labels, top_probs = ranker.top_k(probabilities, top_k)
+        percents = (top_probs.astype(float) * 100).tolist()
+
+        return [
             {
-                'crop': self.crops[idx],
-                'probability': float(probabilities[idx]) * 100,
+                'crop': row_labels[0],
+                'confidence': round(row_percents[0], 2),
+                'recommendations': [
+                    {
+                        'crop': crop,
+                        'probability': percent,
+                    }
+                    for crop, percent in zip(row_labels, row_percents)
+                ],
             }
-            for idx in top_indices
+            for row_labels, row_percents in zip(labels, percents)
         ]
 
-        return {
-            'crop': crop,
-            'confidence': round(confidence, 2),
-            'recommendations': recommendations,
-        }
+    def predict(self, nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall, top_k=3):
+        """Predict the best crop for given conditions."""
+        features = [[nitrogen, phosphorus, potassium, temperature, humidity, ph, rainfall]]
+        return self.predict_batch(features, top_k=top_k)[0]
 
 
 class FertilizerCropClassifier:
     """Train an XGBoost classifier on fertilizer.csv to map soil stats to crops."""
 
-    def __init__(self, data_path=None, model_path=None, force_retrain=False):
+    def __init__(self, data_path=None, model_path=None, force_retrain=False, allow_train=True,
+                 compiled_path=None, cache=None, train_options=None, artifact_dir=None, reload_interval=None):
         base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.allow_train = allow_train
+        self.cache = cache
+        self.train_options = train_options or {}
+        self.training_report = None
+        self.compiled_path = compiled_path
         self.data_path = data_path or os.path.join(base_dir, 'Data', 'fertilizer.csv')
         self.model_path = model_path or os.path.join(base_dir, 'instance', 'fertilizer_xgb_model.joblib')
+        if artifact_dir is None and model_path is None:
+            artifact_dir = os.path.join(base_dir, 'instance', 'models', 'fertilizer')
+        self.store = ArtifactStore(artifact_dir) if artifact_dir else None
+        self.version = None
+        self.reload_interval = reload_interval
+        self._reload_lock = threading.Lock()
+        self._next_reload_check = 0.0
+        self._rejected_version = None
         self.model = None
         self.label_encoder = LabelEncoder()
         self.feature_columns = ['N', 'P', 'K', 'pH', 'soil_moisture']
         self.crop_stats = {}
+        self._serving = (None, None, {})
 
         self._load_or_train(force_retrain)
 
     def _load_or_train(self, force_retrain):
-        if not force_retrain and os.path.exists(self.model_path):
-            payload = joblib.load(self.model_path)
-            self.model = payload['model']
-            self.label_encoder.classes_ = payload['classes']
-            self.crop_stats = payload.get('crop_stats', {})
+        if force_retrain:
+            forest = loaded = None
+        else:
+            forest = _load_compiled_forest(self.compiled_path, _artifact_file(self.store, self.model_path))
+            loaded = None if forest is not None else _load_artifact(self.store, self.model_path, self.feature_columns)
+
+        if forest is not None:
+            version = self.store.current_version() if self.store else None
+            self._activate(forest, forest.classes_, forest.extra.get('crop_stats', {}), version)
+        elif loaded is not None:
+            payload, version = loaded
+            self._activate(payload['model'], payload['classes'], payload.get('crop_stats', {}), version)
+        elif not self.allow_train:
+            raise FileNotFoundError(
+                f"No trained fertilizer model at {self.store.root if self.store else self.model_path}; "
+                "run train_models.py to create it"
+            )
         else:
             self.train()
 
+    def _activate(self, model, classes, crop_stats, version=None):
+        """Swap in a model, its labels and crop stats with one assignment (see CropPredictor._activate)."""
+        self.label_encoder.classes_ = classes
+        self.model = model
+        self.crop_stats = crop_stats
+        self.version = version
+        self._serving = (model, ClassRanker(classes), crop_stats)
+        self._invalidate_cache()
+
+    def reload_if_changed(self):
+        """Serve the store's current version if it differs from the loaded one; returns True on a swap."""
+        version = self.store.current_version() if self.store is not None else None
+        if version is None or version in (self.version, self._rejected_version):
+            return False
+        try:
+            self._load_or_train(force_retrain=False)
+        except Exception:
+            logger.exception("Could not load fertilizer model version %s", version)
+            self._rejected_version = version
+            return False
+        logger.info("Fertilizer model reloaded: now serving version %s", self.version)
+        return True
+
+    def _invalidate_cache(self):
+        if self.cache is not None:
+            self.cache.clear()
+
+    @property
+    def ranker(self):
+        return self._serving[1]
+
     def _prepare_dataframe(self):
         if not os.path.exists(self.data_path):
             raise FileNotFoundError(f"Fertilizer dataset not found at {self.data_path}")
 
-        df = pd.read_csv(self.data_path)
-        df = df.drop(columns=[c for c in df.columns if c.lower().startswith('unnamed')], errors='ignore')
-        df = df.dropna(subset=['Crop'])
-        df['Crop'] = df['Crop'].str.lower()
-        missing_cols = [c for c in self.feature_columns if c not in df.columns]
-        if missing_cols:
-            raise ValueError(f"Dataset missing required columns: {', '.join(missing_cols)}")
-
-        return df
+        return load_clean_dataset(self.data_path, self.feature_columns, 'Crop')
 
     def train(self):
-        df = self._prepare_dataframe()
-
-        X = df[self.feature_columns].astype(float)
-        y = df['Crop']
-        y_encoded = self.label_encoder.fit_transform(y)
-
-        self.model = xgb.XGBClassifier(
-            n_estimators=300,
-            max_depth=4,
-            learning_rate=0.08,
-            subsample=0.9,
-            colsample_bytree=0.9,
-            objective='multi:softprob',
-            num_class=len(self.label_encoder.classes_),
-            random_state=42,
-        )
-        self.model.fit(X, y_encoded)
-
-        grouped = df.groupby('Crop')[self.feature_columns].mean().round(2)
-        self.crop_stats = grouped.to_dict(orient='index')
+        params = {
+            'n_estimators': 300,
+            'max_depth': 4,
+            'learning_rate': 0.08,
+            'subsample': 0.9,
+            'colsample_bytree': 0.9,
+            'objective': 'multi:softprob',
+            'random_state': 42,
+        }
+        if self.train_options.get('stream'):
+            if not os.path.exists(self.data_path):
+                raise FileNotFoundError(f"Fertilizer dataset not found at {self.data_path}")
+            self.label_encoder.classes_, means, chunk_iter = _streamed_dataset(
+                self.data_path, self.feature_columns, 'Crop', None, self.train_options
+            )
+            params['num_class'] = len(self.label_encoder.classes_)
+            model, self.training_report = _fit_xgb_streaming(params, chunk_iter, self.train_options)
+        else:
+            df = self._prepare_dataframe()
+            self.label_encoder.classes_, y_encoded = encode_labels(df['Crop'])
+            params['num_class'] = len(self.label_encoder.classes_)
+            model, self.training_report = _fit_xgb_classifier(
+                params, df[self.feature_columns], y_encoded, self.train_options
+            )
+            stats_frame = df[self.feature_columns].astype(float).assign(Crop=df['Crop'])
+            means = stats_frame.groupby('Crop', observed=True)[self.feature_columns].mean()
+        crop_stats = means.round(2).to_dict(orient='index')
 
-        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
-        joblib.dump(
-            {
-                'model': self.model,
-                'classes': self.label_encoder.classes_,
-                'crop_stats': self.crop_stats,
-            },
-            self.model_path,
+        payload = {'model': model, 'classes': self.label_encoder.classes_, 'crop_stats': crop_stats}
+        metadata = {'model': 'fertilizer', 'training_report': self.training_report}
+        version = _save_artifact(
+            self.store, self.model_path, payload, self.feature_columns, metadata,
+            self.train_options.get('model_format', 'ubj'),
         )
+        self._activate(model, payload['classes'], crop_stats, version)
 
-    def predict_crop(self, nitrogen, phosphorus, potassium, ph, soil_moisture):
+    def predict_crop_batch(self, features, top_k=3):
+        """Predict likely crops for many soil samples with a single booster call."""
         if self.model is None:
-            self._load_or_train()
+            self._load_or_train(force_retrain=False)
 
-        features = np.array([[nitrogen, phosphorus, potassium, ph, soil_moisture]], dtype=float)
-        probabilities = self.model.predict_proba(features)[0]
+        X = _as_feature_matrix(features, self.feature_columns)
+        if len(X) == 0:
+            return []
+        _maybe_reload(self)
+        if self.cache is not None:
+            return _predict_with_cache(self.cache, X, self._predict_matrix, top_k, self.version)
+        return self._predict_matrix(X, top_k)
 
-        top_indices = np.argsort(probabilities)[-3:][::-1]
-        top = [
-            {
-                'crop': self.label_encoder.inverse_transform([idx])[0],
-                'probability': round(float(probabilities[idx]) * 100, 2),
-            }
-            for idx in top_indices
-        ]
+    @instrumentation.timed('fertilizer_classifier', 'predict_crop')
+    def _predict_matrix(self, X, top_k):
+        model, ranker, crop_stats = self._serving
+        probabilities = model.predict_proba(X)
+        labels, top_probs = ranker.top_k(probabilities, top_k)
+        percents = (top_probs.astype(float) * 100).tolist()
 
-        best_crop = top[0]['crop']
-        confidence = top[0]['probability']
+        results = []
+        for row_labels, row_percents in zip(labels, percents):
+            top_row = [
+                {
+                    'crop': crop,
+                    'probability': round(percent, 2),
+                }
+                for crop, percent in zip(row_labels, row_percents)
+            ]
+            best_crop = row_labels[0]
+            results.append(
+                {
+                    'crop': best_crop,
+                    'confidence': top_row[0]['probability'],
+                    'recommendations': top_row,
+                    'target_levels': crop_stats.get(best_crop, {}),
+                }
+            )
+        return results
 
-        return {
-            'crop': best_crop,
-            'confidence': confidence,
-            'recommendations': top,
-            'target_levels': self.crop_stats.get(best_crop, {}),
-        }
+    def predict_crop(self, nitrogen, phosphorus, potassium, ph, soil_moisture, top_k=3):
+        features = [[nitrogen, phosphorus, potassium, ph, soil_moisture]]
+        return self.predict_crop_batch(features, top_k=top_k)[0]
 
 
 class FertilizerRecommender:
-    def __init__(self):
-        self.crop_classifier = FertilizerCropClassifier()
-        self.fertilizer_db = {
+    def __init__(self, crop_classifier=None, allow_train=True):
+        self.crop_classifier = crop_classifier or FertilizerCropClassifier(allow_train=allow_train)
+        self.base_fertilizer_db = {
             'rice': {'N': 80, 'P': 40, 'K': 40, 'fertilizers': ['Urea', 'DAP', 'MOP']},
             'wheat': {'N': 120, 'P': 60, 'K': 40, 'fertilizers': ['Urea', 'DAP', 'MOP']},
             'maize': {'N': 100, 'P': 50, 'K': 50, 'fertilizers': ['Urea', 'SSP', 'MOP']},
@@ -273,24 +919,42 @@ class FertilizerRecommender:
             'potato': {'N': 120, 'P': 80, 'K': 120, 'fertilizers': ['Urea', 'DAP', 'MOP']},
             'tomato': {'N': 150, 'P': 100, 'K': 100, 'fertilizers': ['NPK Complex', 'DAP']},
         }
+        self._targets = None
 
-        for crop, stats in self.crop_classifier.crop_stats.items():
-            base = self.fertilizer_db.get(crop, {})
-            self.fertilizer_db[crop] = {
-                'N': stats.get('N', base.get('N', 100)),
-                'P': stats.get('P', base.get('P', 50)),
-                'K': stats.get('K', base.get('K', 50)),
-                'pH': stats.get('pH', base.get('pH')),
-                'soil_moisture': stats.get('soil_moisture', base.get('soil_moisture')),
-                'fertilizers': base.get('fertilizers', ['NPK Complex']),
-            }
+    @property
+    def fertilizer_db(self):
+        return self._current_targets()[1]
+
+    def _current_targets(self):
+        """Return ``(crop_stats, fertilizer_db, table)`` for the crop stats the classifier serves now.
+
+        Rebuilt whenever a hot reload swaps in another version's crop stats, so
+        nutrient targets always come from the same version as ``target_levels``.
+        """
+        crop_stats = self.crop_classifier.crop_stats
+        targets = self._targets
+        if targets is None or targets[0] is not crop_stats:
+            fertilizer_db = dict(self.base_fertilizer_db)
+            for crop, stats in crop_stats.items():
+                base = fertilizer_db.get(crop, {})
+                fertilizer_db[crop] = {
+                    'N': stats.get('N', base.get('N', 100)),
+                    'P': stats.get('P', base.get('P', 50)),
+                    'K': stats.get('K', base.get('K', 50)),
+                    'pH': stats.get('pH', base.get('pH')),
+                    'soil_moisture': stats.get('soil_moisture', base.get('soil_moisture')),
+                    'fertilizers': base.get('fertilizers', ['NPK Complex']),
+                }
+            targets = self._targets = (crop_stats, fertilizer_db, self._compile_fertilizer_table(fertilizer_db))
+        return targets
 
     def recommend(self, crop_type, current_n, current_p, current_k, soil_type):
         """Recommend fertilizer based on crop and current NPK levels."""
         crop_type = crop_type.lower()
+        fertilizer_db = self._current_targets()[1]
 
-        if crop_type in self.fertilizer_db:
-            required = self.fertilizer_db[crop_type]
+        if crop_type in fertilizer_db:
+            required = fertilizer_db[crop_type]
         else:
             required = {'N': 100, 'P': 50, 'K': 50, 'fertilizers': ['NPK Complex']}
 
@@ -339,6 +1003,88 @@ class FertilizerRecommender:
             'target_soil_moisture': required.get('soil_moisture'),
         }
 
+    @staticmethod
+    def _compile_fertilizer_table(fertilizer_db):
+        """Lay fertilizer_db out as arrays indexed by crop code; the last row is the default."""
+        crops = list(fertilizer_db)
+        rows = [fertilizer_db[crop] for crop in crops]
+        rows.append({'N': 100, 'P': 50, 'K': 50, 'fertilizers': ['NPK Complex']})
+        table = {'crops': pd.Index(crops)}
+        for key in ('N', 'P', 'K'):
+            values = [row[key] for row in rows]
+            table[key] = np.array(values, dtype=float)
+            # Keep the scalar path's int formatting, e.g. "40 kg/hectare" rather than "40.0"
+            table[f'{key}_is_int'] = np.array([isinstance(v, (int, np.integer)) for v in values])
+            table[f'{key}_raw'] = np.array(values, dtype=object)
+        table['pH'] = np.array([row.get('pH') for row in rows], dtype=object)
+        table['soil_moisture'] = np.array([row.get('soil_moisture') for row in rows], dtype=object)
+        return table
+
+    @instrumentation.timed('fertilizer_recommender', 'recommend_many')
+    def recommend_many(self, crop_types, current_n, current_p, current_k, soil_types):
+        """Vectorized ``recommend`` over many plots; returns one DataFrame row per plot.
+
+        Every argument is array-like of equal length (``soil_types`` may also be a
+        single string). Values match ``recommend`` row for row.
+        """
+        table = self._current_targets()[2]
+
+        crop_names = pd.Series(np.asarray(crop_types, dtype=object)).str.lower()
+        codes = table['crops'].get_indexer(crop_names)
+        codes[codes < 0] = len(table['crops'])
+        n_rows = len(codes)
+
+        inputs = [np.asarray(values) for values in (current_n, current_p, current_k)]
+        deficits = {}
+        for key, current in zip(('N', 'P', 'K'), inputs):
+            required = table[key][codes]
+            deficit = np.maximum(0, required - current.astype(float))
+            int_rows = table[f'{key}_is_int'][codes] & np.issubdtype(current.dtype, np.integer)
+            deficits[key] = (required, deficit, int_rows)
+        (req_n, n_deficit, n_int), (req_p, p_deficit, _), (req_k, k_deficit, _) = (
+            deficits['N'], deficits['P'], deficits['K']
+        )
+
+        is_urea = (n_deficit > p_deficit) & (n_deficit > k_deficit)
+        is_dap = ~is_urea & (p_deficit > k_deficit)
+        is_mop = ~is_urea & ~is_dap & (k_deficit > 0)
+        choice = np.select([is_urea, is_dap, is_mop], [0, 1, 2], default=3)
+        rate_value = np.select([is_urea, is_dap, is_mop], [n_deficit * 2, p_deficit * 2.2, k_deficit * 1.7], default=0.0)
+
+        fertilizers = np.array(['Urea', 'DAP (Di-ammonium Phosphate)', 'MOP (Muriate of Potash)', 'NPK Complex'])
+        npk_ratios = np.array(['46-0-0', '18-46-0', '0-0-60', '19-19-19'])
+        rates = [
+            "50 kg/hectare (maintenance)" if c == 3 else f"{int(v) if c == 0 and is_int else v} kg/hectare"
+            for c, v, is_int in zip(choice.tolist(), rate_value.tolist(), n_int.tolist())
+        ]
+
+        soil = pd.Series(np.broadcast_to(np.asarray(soil_types, dtype=object), (n_rows,))).str.lower()
+        soil_factor = np.select([soil == 'sandy', soil == 'clay'], [1.2, 0.9], default=1.0)
+
+        def percent(deficit, required):
+            ratio = np.divide(deficit, required, out=np.zeros(n_rows), where=required > 0)
+            return np.trunc(ratio * 100).astype(int)
+
+        return pd.DataFrame(
+            {
+                'fertilizer': fertilizers[choice],
+                'npk_ratio': npk_ratios[choice],
+                'application_rate': rates,
+                'n_deficit': _round_like_python(n_deficit, 2),
+                'p_deficit': _round_like_python(p_deficit, 2),
+                'k_deficit': _round_like_python(k_deficit, 2),
+                'required_n': table['N_raw'][codes],
+                'required_p': table['P_raw'][codes],
+                'required_k': table['K_raw'][codes],
+                'n_deficit_percent': percent(n_deficit, req_n),
+                'p_deficit_percent': percent(p_deficit, req_p),
+                'k_deficit_percent': percent(k_deficit, req_k),
+                'soil_adjustment_factor': soil_factor,
+                'target_ph': table['pH'][codes],
+                'target_soil_moisture': table['soil_moisture'][codes],
+            }
+        )
+
     def recommend_from_soil(self, nitrogen, phosphorus, potassium, ph, soil_moisture, soil_type):
         """Predict the likely crop from soil stats and return a fertilizer plan."""
         prediction = self.crop_classifier.predict_crop(nitrogen, phosphorus, potassium, ph, soil_moisture)
@@ -371,6 +1117,10 @@ class IrrigationScheduler:
             'banana': {'daily': 7, 'frequency': 2},
             'mango': {'daily': 4, 'frequency': 5},
         }
+        # Total available water in the root zone (mm) used by simulate()
+        self.soil_water_capacity = {'sandy': 40.0, 'loamy': 70.0, 'clay': 90.0}
+        self.default_soil_water_capacity = 60.0
+        self.effective_rainfall_fraction = 0.8
 
     def create_schedule(self, crop_type, soil_type, area, temperature, humidity):
         """Create irrigation schedule for next 30 days."""
@@ -419,3 +1169,164 @@ class IrrigationScheduler:
                 'soil_factor': soil_factor,
             },
         }
+
+    @instrumentation.timed('irrigation_scheduler', 'schedule_arrays')
+    def schedule_arrays(self, crop_types, soil_types, areas, temperatures, humidities):
+        """Vectorized ``create_schedule`` core for many fields at once.
+
+        Returns per-field arrays (factors, water amount, duration, total) plus flat
+        ``event_field``/``event_day`` arrays with one entry per irrigation event.
+        """
+        crops = pd.Series(np.asarray(crop_types, dtype=object)).str.lower()
+        n_fields = len(crops)
+        soil = pd.Series(np.broadcast_to(np.asarray(soil_types, dtype=object), (n_fields,))).str.lower()
+        area = np.asarray(areas, dtype=float)
+        temperature = np.asarray(temperatures, dtype=float)
+        humidity = np.asarray(humidities, dtype=float)
+
+        known = pd.Index(list(self.crop_water_requirements))
+        codes = known.get_indexer(crops)
+        daily = np.array([req['daily'] for req in self.crop_water_requirements.values()] + [6], dtype=float)[codes]
+        frequency = np.array([req['frequency'] for req in self.crop_water_requirements.values()] + [3])[codes]
+
+        temp_factor = 1 + (temperature - 25) * 0.02
+        humidity_factor = 1 - (humidity - 60) * 0.005
+        soil_factor = np.select([soil == 'sandy', soil == 'clay'], [1.3, 0.8], default=1.0)
+
+        base_water = daily * area * temp_factor * humidity_factor * soil_factor
+        water_amount = _round_like_python(base_water, 2)
+        duration = np.trunc(base_water / 10).astype(int)
+
+        n_events = (29 // frequency) + 1
+        event_field = np.repeat(np.arange(n_fields), n_events)
+        starts = np.cumsum(n_events) - n_events
+        event_day = (np.arange(len(event_field)) - np.repeat(starts, n_events)) * np.repeat(frequency, n_events)
+
+        # Accumulate one event at a time so totals match the scalar path's sum() bit for bit
+        total_water = np.zeros(n_fields)
+        for step in range(int(n_events.max()) if n_fields else 0):
+            total_water += np.where(step < n_events, water_amount, 0.0)
+
+        return {
+            'crop_type': crops.to_numpy(),
+            'frequency': frequency,
+            'temperature_factor': _round_like_python(temp_factor, 2),
+            'humidity_factor': _round_like_python(humidity_factor, 2),
+            'soil_factor': soil_factor,
+            'water_amount': water_amount,
+            'duration': duration,
+            'total_water': _round_like_python(total_water, 2),
+            'event_field': event_field,
+            'event_day': event_day,
+        }
+
+    @instrumentation.timed('irrigation_scheduler', 'simulate')
+    def simulate(self, crop_types, soil_types, areas, temperature, humidity, rainfall,
+                 depletion_threshold=0.5, initial_depletion=0.0, return_depletion=False):
+        """Daily soil-water-balance simulation for many fields over any horizon.
+
+        Weather arguments are ``(days,)`` series shared by every field or
+        ``(fields, days)`` matrices. Each day the root-zone depletion grows by the
+        crop's water use (the crop's daily requirement adjusted for that day's
+        temperature and humidity) minus effective rainfall; once it exceeds
+        ``depletion_threshold`` of the soil's available water the field is
+        irrigated back to capacity. Returns flat per-event arrays sorted by field
+        and day, plus per-field totals.
+        """
+        crops = pd.Series(np.asarray(crop_types, dtype=object)).str.lower()
+        n_fields = len(crops)
+        soil = pd.Series(np.broadcast_to(np.asarray(soil_types, dtype=object), (n_fields,))).str.lower()
+        area = np.broadcast_to(np.asarray(areas, dtype=float), (n_fields,))
+
+        codes = pd.Index(list(self.crop_water_requirements)).get_indexer(crops)
+        daily = np.array([req['daily'] for req in self.crop_water_requirements.values()] + [6], dtype=float)[codes]
+        soil_codes = pd.Index(list(self.soil_water_capacity)).get_indexer(soil)
+        capacity = np.array(list(self.soil_water_capacity.values()) + [self.default_soil_water_capacity])[soil_codes]
+        trigger = depletion_threshold * capacity
+
+        def by_day(series):
+            series = np.atleast_1d(np.asarray(series, dtype=float))
+            if series.ndim == 1:
+                return series[:, None]
+            # Days on the first axis keep each day's slice contiguous
+            return np.ascontiguousarray(series.T)
+
+        temperature, humidity, rainfall = by_day(temperature), by_day(humidity), by_day(rainfall)
+        n_days = max(temperature.shape[0], humidity.shape[0], rainfall.shape[0])
+        water_use = daily * (1 + (temperature - 25) * 0.02) * (1 - (humidity - 60) * 0.005)
+        net_loss = np.broadcast_to(water_use - self.effective_rainfall_fraction * rainfall, (n_days, n_fields))
+
+        depletion = np.minimum(np.broadcast_to(np.asarray(initial_depletion, dtype=float), (n_fields,)), capacity)
+        history = np.empty((n_days, n_fields), dtype=np.float32) if return_depletion else None
+        event_fields, event_days, event_depths = [], [], []
+        for day in range(n_days):
+            # Rain beyond field capacity drains away; depletion stops at the wilting point
+            depletion = np.clip(depletion + net_loss[day], 0.0, capacity)
+            irrigate = np.flatnonzero(depletion > trigger)
+            if irrigate.size:
+                event_fields.append(irrigate)
+                event_days.append(np.full(irrigate.size, day))
+                event_depths.append(depletion[irrigate])
+                depletion[irrigate] = 0.0
+            if history is not None:
+                history[day] = depletion
+
+        if event_fields:
+            event_field = np.concatenate(event_fields)
+            event_day = np.concatenate(event_days)
+            event_depth = np.concatenate(event_depths)
+            order = np.lexsort((event_day, event_field))
+            event_field, event_day, event_depth = event_field[order], event_day[order], event_depth[order]
+        else:
+            event_field = np.empty(0, dtype=np.int64)
+            event_day = np.empty(0, dtype=np.int64)
+            event_depth = np.empty(0)
+
+        water_amount = event_depth * area[event_field]
+        result = {
+            'crop_type': crops.to_numpy(),
+            'n_days': n_days,
+            'event_field': event_field,
+            'event_day': event_day,
+            'depth_mm': event_depth,
+            'water_amount': water_amount,
+            'duration': np.trunc(water_amount / 10).astype(int),
+            'events_per_field': np.bincount(event_field, minlength=n_fields),
+            'total_water': np.bincount(event_field, weights=water_amount, minlength=n_fields),
+        }
+        if history is not None:
+            result['depletion'] = history.T
+        return result
+
+    def create_schedules(self, fields):
+        """Create 30-day schedules for a list of field dicts; each result matches ``create_schedule``."""
+        plan = self.schedule_arrays(
+            [field['crop_type'] for field in fields],
+            [field['soil_type'] for field in fields],
+            [field['area'] for field in fields],
+            [field['temperature'] for field in fields],
+            [field['humidity'] for field in fields],
+        )
+        schedules = []
+        for crop_type, frequency, temp_factor, humidity_factor, soil_factor, water, duration, total in zip(
+            plan['crop_type'].tolist(), plan['frequency'].tolist(), plan['temperature_factor'].tolist(),
+            plan['humidity_factor'].tolist(), plan['soil_factor'].tolist(), plan['water_amount'].tolist(),
+            plan['duration'].tolist(), plan['total_water'].tolist(),
+        ):
+            schedules.append(
+                {
+                    'schedule': [
+                        {'day': day, 'date': f"Day {day}", 'water_amount': water, 'duration': duration}
+                        for day in range(0, 30, frequency)
+                    ],
+                    'total_water': total,
+                    'frequency': frequency,
+                    'crop_type': crop_type,
+                    'adjustments': {
+                        'temperature_factor': temp_factor,
+                        'humidity_factor': humidity_factor,
+                        'soil_factor': soil_factor,
+                    },
+                }
+            )
+        return schedules
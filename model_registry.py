@@ -0,0 +1,111 @@
+"""Lazy, thread-safe registry for the web app's ML models.
+
+Models are registered as factories and only built on first use or by a
+background warmup thread, so importing the app never blocks on joblib loads
+(or, worse, on training).  ``readiness()`` backs the /healthz/ready probe.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a model is still loading or failed to load."""
+
+
+class _Entry:
+    def __init__(self, factory, warmup):
+        self.factory = factory
+        self.warmup = warmup
+        self.instance = None
+        self.error = None
+        self.state = 'pending'
+        self.load_seconds = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Build named models on demand and report their readiness."""
+
+    def __init__(self, load_timeout=30.0):
+        self.load_timeout = load_timeout
+        self._entries = {}
+        self._warmup_thread = None
+
+    def register(self, name, factory, warmup=None):
+        """Register a zero-argument factory and an optional warmup callable."""
+        self._entries[name] = _Entry(factory, warmup)
+
+    def _load(self, name, entry):
+        entry.state = 'loading'
+        started = time.perf_counter()
+        try:
+            instance = entry.factory()
+            if entry.warmup is not None:
+                entry.warmup(instance)
+        except Exception as e:
+            entry.state = 'failed'
+            entry.error = str(e)
+            logger.exception("Failed to load model %s", name)
+            raise ModelNotReadyError(f"Model '{name}' failed to load: {e}") from e
+
+        entry.instance = instance
+        entry.error = None
+        entry.load_seconds = time.perf_counter() - started
+        entry.state = 'ready'
+        logger.info("Loaded model %s in %.2fs", name, entry.load_seconds)
+        return instance
+
+    def get(self, name, timeout=None):
+        """Return a loaded model, building it now if nobody else is."""
+        entry = self._entries[name]
+        if entry.instance is not None:
+            return entry.instance
+
+        timeout = self.load_timeout if timeout is None else timeout
+        if not entry.lock.acquire(timeout=timeout):
+            raise ModelNotReadyError(f"Model '{name}' is still loading")
+        try:
+            if entry.instance is not None:
+                return entry.instance
+            return self._load(name, entry)
+        finally:
+            entry.lock.release()
+
+    def is_loaded(self, name):
+        return self._entries[name].instance is not None
+
+    def load_all(self):
+        """Load every registered model in the calling thread."""
+        for name in self._entries:
+            try:
+                self.get(name, timeout=-1)
+            except ModelNotReadyError:
+                # Already logged; readiness() reports the failure
+                pass
+
+    def warmup_async(self):
+        """Load every registered model on a daemon thread."""
+        if self._warmup_thread is not None and self._warmup_thread.is_alive():
+            return self._warmup_thread
+        self._warmup_thread = threading.Thread(target=self.load_all, name='model-warmup', daemon=True)
+        self._warmup_thread.start()
+        return self._warmup_thread
+
+    def readiness(self):
+        """Summarize per-model state for health checks."""
+        models = {}
+        for name, entry in self._entries.items():
+            models[name] = {'state': entry.state}
+            if entry.load_seconds is not None:
+                models[name]['load_seconds'] = round(entry.load_seconds, 3)
+            if entry.error:
+                models[name]['error'] = entry.error
+        return {
+            'ready': all(entry.state == 'ready' for entry in self._entries.values()),
+            'pid': os.getpid(),
+            'models': models,
+        }
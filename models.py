@@ -22,6 +22,8 @@ class User(UserMixin, db.Model):
         self.password_hash = password_hash
 
 class CropPrediction(db.Model):
+    __table_args__ = (db.Index('ix_crop_prediction_user_created', 'user_id', 'created_at'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     nitrogen = db.Column(db.Float, nullable=False)
@@ -51,6 +53,8 @@ class CropPrediction(db.Model):
         self.confidence = confidence
 
 class IrrigationSchedule(db.Model):
+    __table_args__ = (db.Index('ix_irrigation_schedule_user_date', 'user_id', 'schedule_date'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     crop_type = db.Column(db.String(50), nullable=False)
@@ -73,6 +77,8 @@ class IrrigationSchedule(db.Model):
         self.duration = duration
 
 class FertilizerRecommendation(db.Model):
+    __table_args__ = (db.Index('ix_fertilizer_recommendation_user_created', 'user_id', 'created_at'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     crop_type = db.Column(db.String(50), nullable=False)
@@ -98,3 +104,10 @@ class FertilizerRecommendation(db.Model):
         self.fertilizer_name = fertilizer_name
         self.npk_ratio = npk_ratio
         self.application_rate = application_rate
+
+
+def create_indexes():
+    """Create any missing indexes; create_all() skips indexes on tables that already exist."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
@@ -0,0 +1,294 @@
+"""Score a lab export offline with the crop model and the fertilizer pipeline.
+
+The input CSV (or Parquet, with pyarrow installed) is streamed in fixed-size
+chunks. Chunks are scored in a process pool with a bounded number in flight,
+and appended to the output CSV in input order, so memory stays bounded by
+roughly ``chunk_size * 2 * jobs`` rows. After each chunk is written, a
+``<output>.progress.json`` checkpoint records it; ``--resume`` truncates any
+partially written chunk and continues from the last completed one.
+
+Usage:
+    python score_batch.py samples.csv scored.csv
+    python score_batch.py samples.csv scored.csv --models crop --chunk-size 50000 --jobs 4
+    python score_batch.py samples.csv scored.csv --resume
+
+Crop scoring needs N, P, K, temperature, humidity, ph and rainfall columns.
+Fertilizer scoring needs N, P, K, pH (or ph) and soil_moisture, and uses
+optional soil_type and crop_type columns (a blank crop_type is predicted).
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ml_models import CropPredictor, FertilizerCropClassifier, FertilizerRecommender
+
+CROP_COLUMNS = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FERTILIZER_COLUMNS = ['N', 'P', 'K', 'pH', 'soil_moisture']
+# The two models spell the pH column differently; either spelling is accepted
+ALIASES = {'ph': 'pH', 'pH': 'ph'}
+
+_models = {}
+
+
+def load_models(models, threads=None):
+    """Load the requested models into this process; runs once per pool worker."""
+    if 'crop' in models:
+        _models['crop'] = CropPredictor(allow_train=False)
+    if 'fertilizer' in models:
+        _models['fertilizer'] = FertilizerRecommender(
+            crop_classifier=FertilizerCropClassifier(allow_train=False), allow_train=False
+        )
+    if threads:
+        for model in (getattr(_models.get('crop'), 'model', None),
+                      getattr(getattr(_models.get('fertilizer'), 'crop_classifier', None), 'model', None)):
+            if hasattr(model, 'set_params'):
+                model.set_params(n_jobs=threads)
+
+
+def feature_matrix(chunk, columns):
+    names = [c if c in chunk.columns else ALIASES.get(c, c) for c in columns]
+    return chunk[names].to_numpy(dtype=float)
+
+
+def score_crop(chunk, top_k):
+    predictions = _models['crop'].predict_batch(feature_matrix(chunk, CROP_COLUMNS), top_k=top_k)
+    return pd.DataFrame(
+        {
+            'predicted_crop': [p['crop'] for p in predictions],
+            'crop_confidence': [p['confidence'] for p in predictions],
+            'crop_candidates': [
+                ';'.join(f"{r['crop']}:{r['probability']:.2f}" for r in p['recommendations']) for p in predictions
+            ],
+        },
+        index=chunk.index,
+    )
+
+
+def score_fertilizer(chunk, default_soil_type):
+    recommender = _models['fertilizer']
+    predictions = recommender.crop_classifier.predict_crop_batch(feature_matrix(chunk, FERTILIZER_COLUMNS))
+    predicted = np.array([p['crop'] for p in predictions], dtype=object)
+
+    confidence = np.array([p['confidence'] for p in predictions], dtype=float)
+
+    crop_types = predicted
+    if 'crop_type' in chunk.columns:
+        given = chunk['crop_type'].fillna('').astype(str).str.strip().to_numpy(dtype=object)
+        crop_types = np.where(given != '', given, predicted)
+        # The classifier's confidence only describes rows whose crop it chose
+        confidence[given != ''] = np.nan
+    soil_types = chunk['soil_type'].fillna(default_soil_type) if 'soil_type' in chunk.columns else default_soil_type
+
+    plan = recommender.recommend_many(crop_types, chunk['N'], chunk['P'], chunk['K'], soil_types)
+    plan.index = chunk.index
+    return pd.DataFrame(
+        {
+            'fertilizer_crop': crop_types,
+            'fertilizer_crop_confidence': confidence,
+            'fertilizer': plan['fertilizer'],
+            'npk_ratio': plan['npk_ratio'],
+            'application_rate': plan['application_rate'],
+            'n_deficit': plan['n_deficit'],
+            'p_deficit': plan['p_deficit'],
+            'k_deficit': plan['k_deficit'],
+        },
+        index=chunk.index,
+    )
+
+
+def score_chunk(index, chunk, models, top_k, default_soil_type):
+    """Score one chunk; returns its index so results can be written back in order."""
+    parts = [chunk]
+    if 'crop' in models:
+        parts.append(score_crop(chunk, top_k))
+    if 'fertilizer' in models:
+        parts.append(score_fertilizer(chunk, default_soil_type))
+    return index, pd.concat(parts, axis=1)
+
+
+def required_columns(models):
+    columns = []
+    if 'crop' in models:
+        columns += CROP_COLUMNS
+    if 'fertilizer' in models:
+        columns += [c for c in FERTILIZER_COLUMNS if c not in columns and ALIASES.get(c) not in columns]
+    return columns
+
+
+def iter_chunks(path, chunk_size, skip_chunks=0):
+    """Yield ``(index, DataFrame)`` chunks of ``chunk_size`` rows, starting after ``skip_chunks``."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for index, batch in enumerate(parquet.iter_batches(batch_size=chunk_size)):
+            if index >= skip_chunks:
+                yield index, batch.to_pandas()
+        return
+
+    # Completed chunks are read and dropped one at a time; a skiprows list would grow with the row count
+    reader = pd.read_csv(path, chunksize=chunk_size)
+    for index, chunk in enumerate(reader):
+        if index >= skip_chunks:
+            yield index, chunk
+
+
+def check_columns(path, models):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        header = pq.ParquetFile(path).schema_arrow.names
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+    header = set(header)
+    missing = [c for c in required_columns(models) if c not in header and ALIASES.get(c) not in header]
+    if missing:
+        raise SystemExit(f"{path} is missing required columns: {', '.join(missing)}")
+
+
+class Progress:
+    """Checkpoint of completed chunks and the output size they occupy."""
+
+    def __init__(self, output_path, settings):
+        self.path = output_path + '.progress.json'
+        self.settings = settings
+        self.completed_chunks = 0
+        self.rows = 0
+        self.output_bytes = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        if state['settings'] != self.settings:
+            raise SystemExit(
+                f"{self.path} was written with different settings {state['settings']}; "
+                "rerun without --resume to start over"
+            )
+        self.completed_chunks = state['completed_chunks']
+        self.rows = state['rows']
+        self.output_bytes = state['output_bytes']
+        return True
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(
+                {
+                    'settings': self.settings,
+                    'completed_chunks': self.completed_chunks,
+                    'rows': self.rows,
+                    'output_bytes': self.output_bytes,
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def run(args):
+    models = args.models
+    check_columns(args.input, models)
+    settings = {
+        'input': os.path.abspath(args.input),
+        'chunk_size': args.chunk_size,
+        'models': sorted(models),
+        'top_k': args.top_k,
+        'default_soil_type': args.default_soil_type,
+    }
+    progress = Progress(args.output, settings)
+    if args.resume and progress.load():
+        # Drop anything written after the last checkpoint (a chunk cut short by a crash)
+        with open(args.output, 'r+b') as f:
+            f.truncate(progress.output_bytes)
+        print(f"Resuming after chunk {progress.completed_chunks} ({progress.rows} rows already scored)")
+    else:
+        open(args.output, 'w').close()
+        progress.save()
+
+    chunks = iter_chunks(args.input, args.chunk_size, skip_chunks=progress.completed_chunks)
+    jobs = max(1, args.jobs)
+    max_in_flight = jobs * 2
+    started = time.perf_counter()
+    rows_this_run = 0
+
+    with open(args.output, 'ab') as out:
+        def write(scored):
+            nonlocal rows_this_run
+            out.write(scored.to_csv(index=False, header=progress.output_bytes == 0).encode())
+            out.flush()
+            os.fsync(out.fileno())
+            progress.output_bytes = out.tell()
+            progress.completed_chunks += 1
+            progress.rows += len(scored)
+            progress.save()
+            rows_this_run += len(scored)
+            elapsed = time.perf_counter() - started
+            print(f"chunk {progress.completed_chunks}: {progress.rows} rows total, "
+                  f"{rows_this_run / elapsed:,.0f} rows/s", flush=True)
+
+        if jobs == 1:
+            load_models(models)
+            for index, chunk in chunks:
+                write(score_chunk(index, chunk, models, args.top_k, args.default_soil_type)[1])
+        else:
+            threads = max(1, (os.cpu_count() or 1) // jobs)
+            with ProcessPoolExecutor(max_workers=jobs, initializer=load_models, initargs=(models, threads)) as pool:
+                pending = {}
+                done = {}
+                next_index = progress.completed_chunks
+
+                def drain(block):
+                    nonlocal next_index
+                    if block and pending:
+                        oldest = min(pending)
+                        done[oldest] = pending.pop(oldest).result()[1]
+                    for index in [i for i, future in pending.items() if future.done()]:
+                        done[index] = pending.pop(index).result()[1]
+                    while next_index in done:
+                        write(done.pop(next_index))
+                        next_index += 1
+
+                for index, chunk in chunks:
+                    pending[index] = pool.submit(
+                        score_chunk, index, chunk, models, args.top_k, args.default_soil_type
+                    )
+                    while len(pending) + len(done) >= max_in_flight:
+                        drain(block=True)
+                while pending:
+                    drain(block=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {rows_this_run} rows in {elapsed:.2f}s ({rows_this_run / elapsed if elapsed else 0:,.0f} rows/s); "
+          f"{progress.rows} rows in {args.output}")
+    return progress
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream a CSV/Parquet file through the crop and fertilizer models.')
+    parser.add_argument('input', help='input .csv or .parquet file')
+    parser.add_argument('output', help='output .csv file (appended chunk by chunk)')
+    parser.add_argument('--models', nargs='+', choices=['crop', 'fertilizer'], default=['crop', 'fertilizer'])
+    parser.add_argument('--chunk-size', type=int, default=20000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes (1 scores in-process)')
+    parser.add_argument('--top-k', type=int, default=3, help='crop candidates listed per row')
+    parser.add_argument('--default-soil-type', default='loamy', help='used when soil_type is missing or blank')
+    parser.add_argument('--resume', action='store_true', help='continue from the last completed chunk')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size < 1:
+        parser.error('--chunk-size must be positive')
+    if not os.path.exists(args.input):
+        parser.error(f'{args.input} does not exist')
+    return run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Batch request validation (api_schema) and the JSON shapes the batch handlers answer with."""
+import json
+
+import numpy as np
+import pytest
+
+from api_schema import CROP_RECORD, FERTILIZER_RECORD, IRRIGATION_RECORD, MAX_ERRORS, SchemaError
+
+CROP_ROW = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.9, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 202.9}
+
+
+def _errors(schema, records):
+    with pytest.raises(SchemaError) as info:
+        schema.validate(records)
+    return [(e['index'], e['field'], e['error']) for e in info.value.errors]
+
+
+def test_objects_rows_and_aliases_give_the_same_columns():
+    positional = list(CROP_ROW.values())
+    aliased = dict(CROP_ROW)
+    aliased['pH'] = aliased.pop('ph')
+
+    columns = CROP_RECORD.validate([CROP_ROW, positional, aliased])
+
+    assert list(columns) == CROP_RECORD.names
+    for name, value in CROP_ROW.items():
+        assert columns[name].dtype == np.float64
+        assert columns[name].tolist() == [value] * 3
+
+
+def test_errors_name_record_and_field():
+    records = [
+        dict(CROP_ROW, N=None),
+        dict(CROP_ROW, humidity=101),
+        dict(CROP_ROW, temperature='hot', rainfall=True),
+        dict(CROP_ROW, P=float('inf')),
+        dict(CROP_ROW, K=10 ** 400),
+        CROP_ROW,
+    ]
+    assert _errors(CROP_RECORD, records) == [
+        (0, 'N', 'is required'),
+        (1, 'humidity', 'must be between 0 and 100'),
+        (2, 'temperature', 'must be a number'),
+        (2, 'rainfall', 'must be a number'),
+        (3, 'P', 'must be between 0 and 1000'),
+        (4, 'K', 'must be a number'),
+    ]
+    assert _errors(CROP_RECORD, [[1, 2, 3]]) == [(0, None, 'must have 7 values')]
+    assert _errors(IRRIGATION_RECORD, [CROP_ROW.values()]) == [(0, None, 'must be an object')]
+    for records in (None, [], {'N': 1}):
+        assert _errors(CROP_RECORD, records) == [(None, None, 'records must be a non-empty list')]
+
+
+def test_optional_fields_and_strings():
+    columns = FERTILIZER_RECORD.validate([
+        {'crop_type': 'rice', 'N': 80, 'P': 40, 'K': 40},
+        {'N': 10, 'P': 20, 'K': 30, 'soil_type': 'loamy', 'ph': 6.1, 'soil_moisture': 40},
+    ])
+    assert columns['crop_type'] == ['rice', '']
+    assert columns['soil_type'] == ['', 'loamy']
+    np.testing.assert_array_equal(columns['pH'], [np.nan, 6.1])
+
+    field = {'soil_type': 'clay', 'area': 2, 'temperature': 25, 'humidity': 60}
+    assert _errors(IRRIGATION_RECORD, [
+        dict(field, crop_type=''),
+        dict(field, crop_type=7),
+        dict(field, crop_type='x' * 65),
+        field,
+    ]) == [
+        (0, 'crop_type', 'must not be empty'),
+        (1, 'crop_type', 'must be a string'),
+        (2, 'crop_type', 'must be at most 64 characters'),
+        (3, 'crop_type', 'is required'),
+    ]
+
+
+def test_error_list_is_capped():
+    errors = _errors(CROP_RECORD, [dict(CROP_ROW, N=-1)] * 100)
+    assert len(errors) == MAX_ERRORS
+    assert [index for index, _, _ in errors] == list(range(MAX_ERRORS))
+
+
+def test_batch_handlers_answer_in_the_api_shape():
+    import app as appmod
+
+    body, status = appmod.crop_batch(b'not json', None)
+    assert status == 400 and json.loads(body) == {'success': False, 'message': 'Request body must be a JSON object'}
+
+    body, status = appmod.crop_batch(json.dumps({'records': [dict(CROP_ROW, humidity=-1)]}), None)
+    response = json.loads(body)
+    assert status == 400 and response['success'] is False
+    assert response['message'] == 'Invalid records: record 0: humidity must be between 0 and 100'
+    assert response['errors'] == [{'index': 0, 'field': 'humidity', 'error': 'must be between 0 and 100'}]
+
+    body, status = appmod.crop_batch(json.dumps({'records': [CROP_ROW], 'top_k': 0}), None)
+    assert status == 400
+
+    too_many = appmod.app.config['BATCH_PREDICTION_MAX_ROWS'] + 1
+    assert appmod.crop_batch(json.dumps({'records': [CROP_ROW] * too_many}), None)[1] == 413
+
+    body, status = appmod.fertilizer_batch(json.dumps({'records': [{'N': 1, 'P': 2, 'K': 3, 'pH': 6}]}), None)
+    assert status == 400
+    assert json.loads(body)['errors'] == [
+        {'index': 0, 'field': 'crop_type', 'error': 'is required unless pH and soil_moisture are given'}
+    ]
+
+    body, status = appmod.crop_batch(json.dumps({'records': [CROP_ROW, list(CROP_ROW.values())], 'top_k': 2}), None)
+    response = json.loads(body)
+    assert status == 200
+    assert (response['success'], response['count'], response['saved']) == (True, 2, 0)
+    assert response['predictions'][0] == response['predictions'][1]
+    prediction = response['predictions'][0]
+    assert len(prediction['recommendations']) == 2
+    assert prediction['crop'] == prediction['recommendations'][0]['crop']
+    assert prediction['confidence'] == round(prediction['recommendations'][0]['probability'], 2)
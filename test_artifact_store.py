@@ -0,0 +1,97 @@
+"""ArtifactStore publication, rollback and the predictors' hot reload of published versions."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from artifact_store import ArtifactError, ArtifactStore
+from ml_models import CropPredictor
+
+FEATURES = ['N', 'P', 'K', 'pH', 'soil_moisture']
+ROWS = [[90, 42, 43, 6.5, 40], [20, 130, 200, 5.8, 70], [60, 55, 44, 7.2, 20]]
+
+
+def _payload(seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.uniform(0, 100, size=(300, len(FEATURES))), columns=FEATURES)
+    y = (X['N'] > 50).astype(int) + (X['pH'] > 50)
+    model = xgb.XGBClassifier(n_estimators=10, max_depth=3, random_state=seed, n_jobs=1).fit(X, y)
+    return {'model': model, 'classes': np.array(['maize', 'rice', 'wheat'], dtype=object), 'crop_stats': {}}
+
+
+@pytest.mark.parametrize('model_format', ['joblib', 'ubj'])
+def test_publish_and_load_round_trip(tmp_path, model_format):
+    store = ArtifactStore(str(tmp_path))
+    assert store.current_version() is None
+    payload = _payload(0)
+
+    manifest = store.publish(payload, FEATURES, payload['classes'], {'model': 'test'}, model_format=model_format)
+
+    assert store.current_version() == manifest['version']
+    assert store.versions() == [manifest['version']]
+    assert manifest['feature_columns'] == FEATURES and manifest['model'] == 'test'
+    assert not [name for name in os.listdir(store.versions_dir) if name.startswith('.staging-')]
+    loaded, loaded_manifest = store.load()
+    assert loaded_manifest == manifest
+    assert list(loaded['classes']) == list(payload['classes'])
+    X = np.array(ROWS, dtype=float)
+    np.testing.assert_allclose(loaded['model'].predict_proba(X), payload['model'].predict_proba(X), atol=1e-6)
+
+
+def test_rollback_prune_and_corruption(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    versions = [store.publish(_payload(seed), FEATURES, ['a', 'b', 'c'], keep=None)['version'] for seed in range(4)]
+    assert store.current_version() == versions[-1]
+
+    store.activate(versions[0])
+    assert store.current_version() == versions[0]
+    assert store.load()[1]['version'] == versions[0]
+    with pytest.raises(ArtifactError):
+        store.activate('no-such-version')
+    assert store.current_version() == versions[0]
+
+    # Only the newest version name is kept, plus the current one wherever it sorts
+    newest = max(versions)
+    assert sorted(store.prune(keep=1)) == sorted(set(versions) - {newest, versions[0]})
+    assert store.versions() == sorted({newest, versions[0]})
+
+    with open(store.model_file(), 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ArtifactError, match='Checksum mismatch'):
+        store.load()
+
+
+def test_predictor_hot_reloads_and_rolls_back(tmp_path):
+    options = {'synthetic_samples': 400}
+    paths = {
+        'data_path': str(tmp_path / 'missing.csv'),
+        'model_path': str(tmp_path / 'crop.joblib'),
+        'artifact_dir': str(tmp_path / 'crop'),
+    }
+
+    trainer = CropPredictor(train_options=options, **paths)
+    first = trainer.version
+    assert first is not None
+    server = CropPredictor(allow_train=False, reload_interval=1e-9, **paths)
+    assert server.version == first
+
+    trainer = CropPredictor(force_retrain=True, train_options=dict(options, synthetic_samples=600), **paths)
+    second = trainer.version
+    assert second != first
+    prediction = server.predict(90, 42, 43, 20.9, 82.0, 6.5, 202.9)
+    assert server.version == second
+    assert prediction == trainer.predict(90, 42, 43, 20.9, 82.0, 6.5, 202.9)
+
+    server.store.activate(first)
+    server.predict(90, 42, 43, 20.9, 82.0, 6.5, 202.9)
+    assert server.version == first
+
+    # A corrupt version is rejected once and the loaded model keeps serving
+    with open(server.store.model_file(second), 'ab') as f:
+        f.write(b'\0')
+    server.store.activate(second)
+    assert server.reload_if_changed() is False
+    assert server.version == first
+    assert server.predict(90, 42, 43, 20.9, 82.0, 6.5, 202.9)['crop']
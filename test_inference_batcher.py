@@ -0,0 +1,82 @@
+"""MicroBatcher must hand every caller its own row's result, whatever batch it lands in."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+
+from inference_batcher import MicroBatcher
+
+
+def _echo_batches(batches):
+    def batch_fn(rows):
+        batches.append(len(rows))
+        return [row * 10 for row in rows]
+    return batch_fn
+
+
+def test_concurrent_submits_fan_out_to_their_callers():
+    batches = []
+    echo = _echo_batches(batches)
+    release = threading.Event()
+
+    def batch_fn(rows):
+        # Hold the first batch so the rest queue up behind it
+        release.wait(5)
+        return echo(rows)
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        futures = [pool.submit(batcher.submit, i, 10) for i in range(20)]
+        time.sleep(0.2)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == [i * 10 for i in range(20)]
+    assert sum(batches) == 20
+    assert max(batches) <= 8
+    assert len(batches) < 20
+
+    stats = batcher.stats()
+    assert stats['requests'] == 20
+    assert stats['batches'] == len(batches)
+    assert stats['queue_depth'] == 0
+    assert sum(size * count for size, count in stats['batch_size_histogram'].items()) == 20
+
+
+def test_lone_request_is_flushed_after_max_wait():
+    batches = []
+    batcher = MicroBatcher(_echo_batches(batches), max_batch_size=32, max_wait_ms=20)
+
+    started = time.monotonic()
+    assert batcher.submit(4, timeout=5) == 40
+    assert time.monotonic() - started < 1
+    assert batches == [1]
+
+
+def test_submit_timeout_and_batch_errors():
+    release = threading.Event()
+
+    def slow(rows):
+        release.wait(5)
+        return rows
+
+    batcher = MicroBatcher(slow, max_wait_ms=0)
+    with pytest.raises(TimeoutError):
+        batcher.submit(1, timeout=0.05)
+    release.set()
+
+    def broken(rows):
+        raise ValueError('bad batch')
+
+    batcher = MicroBatcher(broken, max_batch_size=4, max_wait_ms=20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(batcher.submit, i, 5) for i in range(4)]
+        for future in futures:
+            with pytest.raises(ValueError, match='bad batch'):
+                future.result()
+
+
+def test_max_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(lambda rows: rows, max_batch_size=0)
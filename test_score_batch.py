@@ -0,0 +1,79 @@
+"""score_batch --resume must produce the same output as an uninterrupted run."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import score_batch
+
+
+class StubCropPredictor:
+    """Deterministic stand-in for CropPredictor that can fail on its n-th batch."""
+
+    def __init__(self, fail_on_call=None):
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def predict_batch(self, X, top_k=3):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError('worker killed')
+        return [
+            {
+                'crop': 'rice' if row[0] > 50 else 'maize',
+                'confidence': round(row[4], 2),
+                'recommendations': [{'crop': 'rice', 'probability': row[4]}][:top_k],
+            }
+            for row in X.tolist()
+        ]
+
+
+@pytest.fixture
+def samples(tmp_path):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(np.round(rng.uniform(0, 100, size=(1000, 7)), 2), columns=score_batch.CROP_COLUMNS)
+    path = tmp_path / 'samples.csv'
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def _run(monkeypatch, samples, output, *extra, predictor=None):
+    predictor = predictor or StubCropPredictor()
+    models = {}
+    monkeypatch.setattr(score_batch, '_models', models)
+    monkeypatch.setattr(score_batch, 'load_models', lambda names, threads=None: models.update(crop=predictor))
+    return score_batch.main([samples, output, '--models', 'crop', '--chunk-size', '128', *extra])
+
+
+@pytest.mark.parametrize('jobs', ['1', '2'])
+def test_resume_after_crash_matches_a_clean_run(monkeypatch, samples, tmp_path, jobs):
+    reference = str(tmp_path / 'reference.csv')
+    _run(monkeypatch, samples, reference, '--jobs', '1')
+
+    output = str(tmp_path / 'scored.csv')
+    with pytest.raises(RuntimeError, match='worker killed'):
+        _run(monkeypatch, samples, output, '--jobs', '1', predictor=StubCropPredictor(fail_on_call=4))
+    with open(output + '.progress.json') as f:
+        assert json.load(f)['completed_chunks'] == 3
+    # A chunk cut short after the last checkpoint
+    with open(output, 'a') as f:
+        f.write('90.0,42.0,43')
+
+    progress = _run(monkeypatch, samples, output, '--jobs', jobs, '--resume')
+
+    assert (progress.completed_chunks, progress.rows) == (8, 1000)
+    with open(output) as actual, open(reference) as expected:
+        assert actual.read() == expected.read()
+    assert len(pd.read_csv(output)) == 1000
+
+
+def test_resume_refuses_other_settings(monkeypatch, samples, tmp_path):
+    output = str(tmp_path / 'scored.csv')
+    _run(monkeypatch, samples, output, '--jobs', '1')
+    with pytest.raises(SystemExit, match='different settings'):
+        _run(monkeypatch, samples, output, '--jobs', '1', '--top-k', '2', '--resume')
+
+    # Without a checkpoint, --resume simply starts over
+    fresh = str(tmp_path / 'fresh.csv')
+    assert _run(monkeypatch, samples, fresh, '--jobs', '1', '--resume').rows == 1000
@@ -0,0 +1,47 @@
+"""Block-seeded synthetic crop data must not depend on how the stream is chunked."""
+import numpy as np
+import pytest
+
+from ml_models import (
+    SYNTHETIC_FEATURE_RANGES, _SYNTHETIC_BLOCK_ROWS, generate_synthetic_crop_data, iter_synthetic_crop_data,
+)
+
+N_SAMPLES = 2 * _SYNTHETIC_BLOCK_ROWS + 12345
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return generate_synthetic_crop_data(N_SAMPLES, seed=7)
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 4099, _SYNTHETIC_BLOCK_ROWS, _SYNTHETIC_BLOCK_ROWS + 1, 10 ** 6])
+def test_stream_is_identical_for_any_chunk_size(reference, chunk_size):
+    chunks = list(iter_synthetic_crop_data(N_SAMPLES, seed=7, chunk_size=chunk_size))
+
+    assert all(len(X) == len(y) == chunk_size for X, y in chunks[:-1])
+    assert 0 < len(chunks[-1][0]) <= chunk_size
+    np.testing.assert_array_equal(np.concatenate([X for X, _ in chunks]), reference[0])
+    np.testing.assert_array_equal(np.concatenate([y for _, y in chunks]), reference[1])
+
+
+def test_rows_are_in_range_and_seeded(reference):
+    X, y = reference
+    assert X.shape == (N_SAMPLES, len(SYNTHETIC_FEATURE_RANGES)) and X.dtype == np.float32
+    assert (X >= SYNTHETIC_FEATURE_RANGES[:, 0].astype(np.float32)).all()
+    assert (X <= SYNTHETIC_FEATURE_RANGES[:, 1].astype(np.float32)).all()
+    assert y.min() >= 0 and y.max() < 23
+
+    again = generate_synthetic_crop_data(N_SAMPLES, seed=7)
+    np.testing.assert_array_equal(again[0], X)
+    other = generate_synthetic_crop_data(N_SAMPLES, seed=8)
+    assert not np.array_equal(other[0], X)
+
+    # Each block has its own generator, so earlier blocks do not depend on the total size
+    shorter, _ = generate_synthetic_crop_data(_SYNTHETIC_BLOCK_ROWS, seed=7)
+    np.testing.assert_array_equal(shorter, X[:_SYNTHETIC_BLOCK_ROWS])
+
+
+def test_empty_request():
+    X, y = generate_synthetic_crop_data(0)
+    assert X.shape == (0, len(SYNTHETIC_FEATURE_RANGES)) and len(y) == 0
+    assert list(iter_synthetic_crop_data(0)) == []
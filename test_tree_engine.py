@@ -0,0 +1,89 @@
+"""CompiledForest must reproduce XGBoost's predict_proba, as ``python tree_engine.py`` checks for the saved models."""
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from ml_models import SYNTHETIC_CROPS, generate_synthetic_crop_data
+from tree_engine import CompiledForest, NativeBooster, compile_booster, export_model
+
+TOLERANCE = 1e-5
+CROP_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+FERTILIZER_FEATURES = ['N', 'P', 'K', 'pH', 'soil_moisture']
+
+
+def _crop_data(n_samples=3000, seed=0):
+    X, y = generate_synthetic_crop_data(n_samples, seed=seed, n_classes=len(SYNTHETIC_CROPS))
+    return pd.DataFrame(X, columns=CROP_FEATURES), y
+
+
+def _fertilizer_data(n_samples=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform([0, 5, 5, 4, 10], [200, 150, 205, 9, 90], size=(n_samples, 5)).astype(np.float32)
+    y = (X[:, 0] // 50).astype(int) * 2 + (X[:, 3] > 6.5)
+    return pd.DataFrame(X, columns=FERTILIZER_FEATURES), y
+
+
+def _check_rows(X, seed=1, n_rows=2000, missing=False):
+    rng = np.random.default_rng(seed)
+    low, high = X.min(axis=0).to_numpy(), X.max(axis=0).to_numpy()
+    rows = rng.uniform(low - 10, high + 10, size=(n_rows, X.shape[1])).astype(np.float32)
+    if missing:
+        rows[rng.random(rows.shape) < 0.1] = np.nan
+    return pd.DataFrame(rows, columns=X.columns)
+
+
+def _assert_matches(model, forest, rows):
+    expected = model.predict_proba(rows)
+    actual = forest.predict_proba(rows.to_numpy())
+    assert actual.shape == expected.shape
+    assert float(np.abs(expected - actual).max()) <= TOLERANCE
+    np.testing.assert_array_equal(forest.predict(rows.to_numpy()), expected.argmax(axis=1))
+
+
+@pytest.mark.parametrize('data, params', [
+    # CropPredictor._train_from_dataset and _train_synthetic
+    (_crop_data, {'n_estimators': 60, 'max_depth': 6, 'learning_rate': 0.08, 'subsample': 0.9,
+                  'colsample_bytree': 0.9, 'objective': 'multi:softprob'}),
+    (_crop_data, {'n_estimators': 40, 'max_depth': 8, 'learning_rate': 0.1, 'objective': 'multi:softmax'}),
+    # FertilizerCropClassifier.train
+    (_fertilizer_data, {'n_estimators': 60, 'max_depth': 4, 'learning_rate': 0.08, 'subsample': 0.9,
+                        'colsample_bytree': 0.9, 'objective': 'multi:softprob'}),
+], ids=['crop', 'crop-softmax', 'fertilizer'])
+def test_compiled_forest_matches_predict_proba(data, params, tmp_path):
+    X, y = data()
+    model = xgb.XGBClassifier(random_state=42, n_jobs=1, **params).fit(X, y)
+    payload = {'model': model, 'classes': np.arange(len(np.unique(y))), 'crop_stats': {}}
+
+    forest, _ = export_model(payload, str(tmp_path))
+    assert forest.feature_names == list(X.columns)
+    rows = _check_rows(X)
+    _assert_matches(model, forest, rows)
+    # Served forests are memory-mapped from the exported arrays
+    _assert_matches(model, CompiledForest.load(str(tmp_path), mmap_mode='r'), rows)
+
+
+def test_missing_values_follow_default_direction():
+    X, y = _fertilizer_data()
+    X = X.mask(np.random.default_rng(2).random(X.shape) < 0.2)
+    model = xgb.XGBClassifier(n_estimators=40, max_depth=4, random_state=42, n_jobs=1).fit(X, y)
+    _assert_matches(model, compile_booster(model), _check_rows(X, missing=True))
+
+
+def test_early_stopped_model_uses_best_iteration():
+    X, y = _crop_data()
+    model = xgb.XGBClassifier(n_estimators=300, max_depth=6, early_stopping_rounds=5, random_state=42, n_jobs=1)
+    model.fit(X[:2400], y[:2400], eval_set=[(X[2400:], y[2400:])], verbose=False)
+    assert model.best_iteration + 1 < model.get_booster().num_boosted_rounds()
+    _assert_matches(model, compile_booster(model), _check_rows(X))
+
+
+def test_binary_and_native_booster():
+    X, y = _fertilizer_data()
+    y = (y % 2).astype(int)
+    model = xgb.XGBClassifier(n_estimators=40, max_depth=4, random_state=42, n_jobs=1).fit(X, y)
+    rows = _check_rows(X)
+    _assert_matches(model, compile_booster(model), rows)
+
+    native = NativeBooster(model.get_booster(), model.get_xgb_params())
+    assert float(np.abs(native.predict_proba(rows.to_numpy()) - model.predict_proba(rows)).max()) <= TOLERANCE
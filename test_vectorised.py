@@ -0,0 +1,76 @@
+"""The vectorised fertilizer and irrigation paths must match their scalar versions row for row."""
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ml_models import FertilizerRecommender, IrrigationScheduler
+
+CROPS = ['rice', 'Wheat', 'maize', 'cotton', 'banana', 'tomato', 'chickpea', 'lentil', 'unknown-crop']
+SOILS = ['sandy', 'Clay', 'loamy', 'silt']
+
+
+@pytest.fixture
+def recommender():
+    # Dataset stats as FertilizerCropClassifier produces them: float targets, some for crops not in the base table
+    crop_stats = {
+        'chickpea': {'N': 40.12, 'P': 67.79, 'K': 79.92, 'pH': 7.34, 'soil_moisture': 18.06},
+        'lentil': {'N': 18.77, 'P': 68.36, 'K': 19.41, 'pH': 6.93, 'soil_moisture': 64.8},
+        'maize': {'N': 77.76, 'P': 48.44, 'K': 19.79, 'pH': 6.25, 'soil_moisture': 65.09},
+    }
+    return FertilizerRecommender(crop_classifier=SimpleNamespace(crop_stats=crop_stats))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('integer_inputs', [False, True])
+def test_recommend_many_matches_recommend(recommender, seed, integer_inputs):
+    rng = np.random.default_rng(seed)
+    n_rows = 500
+    crops = rng.choice(CROPS, n_rows)
+    soils = rng.choice(SOILS, n_rows)
+    if integer_inputs:
+        n, p, k = (rng.integers(0, 250, n_rows) for _ in range(3))
+    else:
+        n, p, k = (np.round(rng.uniform(0, 250, n_rows), rng.integers(0, 3)) for _ in range(3))
+
+    frame = recommender.recommend_many(crops, n, p, k, soils)
+
+    assert len(frame) == n_rows
+    for i, row in enumerate(frame.to_dict(orient='records')):
+        expected = recommender.recommend(crops[i], n[i].item(), p[i].item(), k[i].item(), soils[i])
+        assert row == expected, f'row {i}'
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_schedule_arrays_matches_create_schedule(seed):
+    rng = np.random.default_rng(seed)
+    scheduler = IrrigationScheduler()
+    n_fields = 300
+    crops = rng.choice(CROPS + ['sugarcane', 'mango', 'potato'], n_fields)
+    soils = rng.choice(SOILS, n_fields)
+    areas = np.round(rng.uniform(0, 50, n_fields), 2)
+    temperatures = np.round(rng.uniform(-50, 70, n_fields), 1)
+    humidities = np.round(rng.uniform(0, 100, n_fields), 1)
+
+    plan = scheduler.schedule_arrays(crops, soils, areas, temperatures, humidities)
+
+    for i in range(n_fields):
+        expected = scheduler.create_schedule(
+            crops[i], soils[i], areas[i].item(), temperatures[i].item(), humidities[i].item()
+        )
+        assert plan['crop_type'][i] == expected['crop_type']
+        assert plan['frequency'][i] == expected['frequency']
+        assert plan['temperature_factor'][i] == expected['adjustments']['temperature_factor']
+        assert plan['humidity_factor'][i] == expected['adjustments']['humidity_factor']
+        assert plan['soil_factor'][i] == expected['adjustments']['soil_factor']
+        assert plan['total_water'][i] == expected['total_water']
+        assert plan['event_day'][plan['event_field'] == i].tolist() == [s['day'] for s in expected['schedule']]
+        for event in expected['schedule']:
+            assert plan['water_amount'][i] == event['water_amount']
+            assert plan['duration'][i] == event['duration']
+
+    fields = [
+        {'crop_type': c, 'soil_type': s, 'area': a, 'temperature': t, 'humidity': h}
+        for c, s, a, t, h in zip(crops, soils, areas.tolist(), temperatures.tolist(), humidities.tolist())
+    ]
+    assert scheduler.create_schedules(fields) == [scheduler.create_schedule(**field) for field in fields]
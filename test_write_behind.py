@@ -0,0 +1,117 @@
+"""WriteBehindBuffer must write every acknowledged row exactly once, in order, by shutdown at the latest."""
+import threading
+import time
+
+import pytest
+
+from write_behind import WriteBehindBuffer
+
+
+class Sink:
+    """flush_fn that records what it was handed, optionally failing the first ``failures`` calls."""
+
+    def __init__(self, failures=0, delay=0.0):
+        self.rows = []
+        self.calls = 0
+        self.failures = failures
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, groups):
+        with self.lock:
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise RuntimeError('database is locked')
+        time.sleep(self.delay)
+        with self.lock:
+            for model, rows in groups.items():
+                self.rows.extend((model, row['i']) for row in rows)
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_flushes_on_batch_size_and_interval():
+    sink = Sink()
+    buffer = WriteBehindBuffer(sink, max_batch_size=10, flush_interval_ms=60_000, max_pending=100)
+    buffer.add('prediction', [{'i': i} for i in range(10)])
+    _wait_for(lambda: len(sink.rows) == 10)
+    buffer.close()
+
+    sink = Sink()
+    buffer = WriteBehindBuffer(sink, max_batch_size=500, flush_interval_ms=20, max_pending=1000)
+    buffer.add('prediction', [{'i': 0}])
+    buffer.add('schedule', [{'i': 1}, {'i': 2}])
+    _wait_for(lambda: len(sink.rows) == 3)
+    assert sorted(sink.rows) == [('prediction', 0), ('schedule', 1), ('schedule', 2)]
+    assert buffer.stats()['depth'] == 0
+    buffer.close()
+
+
+def test_close_flushes_pending_rows_and_later_writes_are_synchronous():
+    sink = Sink()
+    buffer = WriteBehindBuffer(sink, max_batch_size=500, flush_interval_ms=60_000, max_pending=1000)
+    buffer.add('prediction', [{'i': i} for i in range(25)])
+    assert sink.rows == []
+
+    buffer.close()
+    assert sink.rows == [('prediction', i) for i in range(25)]
+
+    buffer.add('prediction', [{'i': 25}])
+    assert sink.rows[-1] == ('prediction', 25)
+    assert buffer.stats()['flushed_rows'] == 26
+
+
+def test_max_pending_bounds_unflushed_rows():
+    sink = Sink(delay=0.02)
+    buffer = WriteBehindBuffer(sink, max_batch_size=5, flush_interval_ms=5, max_pending=10)
+    peak = 0
+
+    def writer(start):
+        nonlocal peak
+        for i in range(start, start + 20):
+            buffer.add('prediction', [{'i': i}])
+            stats = buffer.stats()
+            peak = max(peak, stats['depth'] + stats['in_flight'])
+
+    threads = [threading.Thread(target=writer, args=(start,)) for start in (0, 100, 200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    buffer.close()
+
+    assert peak <= 10
+    assert sorted(i for _, i in sink.rows) == sorted(i for start in (0, 100, 200) for i in range(start, start + 20))
+
+    sink = Sink()
+    buffer = WriteBehindBuffer(sink, max_pending=0)
+    buffer.add('prediction', [{'i': 0}])
+    assert sink.rows == [('prediction', 0)]
+
+
+def test_failed_flushes_are_retried_then_dropped():
+    sink = Sink(failures=2)
+    buffer = WriteBehindBuffer(sink, max_batch_size=3, flush_interval_ms=5, max_pending=10, max_retries=3)
+    buffer.add('prediction', [{'i': i} for i in range(3)])
+    _wait_for(lambda: len(sink.rows) == 3)
+    stats = buffer.stats()
+    assert (stats['failed_flushes'], stats['dropped_rows'], stats['flushed_rows']) == (2, 0, 3)
+    buffer.close()
+
+    sink = Sink(failures=100)
+    buffer = WriteBehindBuffer(sink, max_batch_size=3, flush_interval_ms=5, max_pending=10, max_retries=1)
+    buffer.add('prediction', [{'i': i} for i in range(3)])
+    _wait_for(lambda: buffer.stats()['dropped_rows'] == 3)
+    assert buffer.stats()['in_flight'] == 0
+    buffer.close()
+    assert sink.rows == []
+
+
+def test_max_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        WriteBehindBuffer(Sink(), max_batch_size=0)
@@ -1,21 +1,182 @@
-"""Utility to (re)train XGBoost models on project datasets."""
+"""Utility to (re)train XGBoost models on project datasets.
+
+Both models train concurrently in a process pool, each with its own share of
+the CPU threads, and the pipeline reports wall-clock time, peak memory and
+holdout accuracy for every model.
+
+Usage:
+    python train_models.py
+    python train_models.py --models crop --early-stopping-rounds 30
+    python train_models.py --sequential --jobs 8
+    python train_models.py --incremental         # warm-start from logged predictions
+"""
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 from ml_models import CropPredictor, FertilizerCropClassifier
 
+MODEL_BUILDERS = {
+    'crop': CropPredictor,
+    'fertilizer': FertilizerCropClassifier,
+}
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def train_model(name: str, train_options: dict) -> dict:
+    """Train one model and return its report; runs inside a pool worker."""
+    started = time.perf_counter()
+    model = MODEL_BUILDERS[name](force_retrain=True, train_options=train_options)
+    report = dict(model.training_report or {})
+    report.update(
+        {
+            'model': name,
+            'classes': [str(c) for c in model.label_encoder.classes_],
+            'wall_seconds': time.perf_counter() - started,
+            'peak_rss_mb': _peak_rss_mb(),
+            'n_jobs': train_options.get('n_jobs'),
+            'version': model.version,
+            'artifact_path': model.store.model_file(model.version) if model.store else model.model_path,
+        }
+    )
+    return report
+
+
+def run_pipeline(models, train_options: dict, jobs: int, sequential: bool = False):
+    """Train ``models`` with ``jobs`` threads split between them."""
+    if sequential:
+        options = dict(train_options, n_jobs=jobs)
+        return [train_model(name, options) for name in models]
+
+    threads_per_model = max(1, jobs // len(models))
+    options = dict(train_options, n_jobs=threads_per_model)
+    with ProcessPoolExecutor(max_workers=len(models)) as pool:
+        futures = [pool.submit(train_model, name, options) for name in models]
+        return [future.result() for future in futures]
+
+
+def load_logged_predictions(since_id: int):
+    """Return features, labels and the max id of CropPrediction rows newer than ``since_id``."""
+    from config import app
+    from models import CropPrediction
+
+    columns = [
+        CropPrediction.nitrogen,
+        CropPrediction.phosphorus,
+        CropPrediction.potassium,
+        CropPrediction.temperature,
+        CropPrediction.humidity,
+        CropPrediction.ph,
+        CropPrediction.rainfall,
+    ]
+    with app.app_context():
+        rows = (
+            CropPrediction.query.with_entities(CropPrediction.id, *columns, CropPrediction.predicted_crop)
+            .filter(CropPrediction.id > since_id)
+            .order_by(CropPrediction.id)
+            .all()
+        )
+
+    features = [list(row[1:8]) for row in rows]
+    labels = [row[8] for row in rows]
+    watermark = rows[-1][0] if rows else since_id
+    return features, labels, watermark
+
+
+def run_incremental(n_rounds: int, jobs: int, model_format: str = 'ubj'):
+    """Warm-start the crop model on predictions logged since the last checkpoint."""
+    predictor = CropPredictor(allow_train=False, train_options={'n_jobs': jobs, 'model_format': model_format})
+    since_id = predictor.read_checkpoint(predictor.version)['watermark']
+    features, labels, watermark = load_logged_predictions(since_id)
+
+    started = time.perf_counter()
+    report = predictor.train_incremental(features, labels, watermark, n_rounds=n_rounds)
+    print(
+        f"Incremental update: {report['rows']} new rows after id {since_id} "
+        f"({report['dropped_rows']} with unknown crops dropped), {report['rounds']} rounds added "
+        f"in {time.perf_counter() - started:.2f}s; watermark now {report['watermark']}; "
+        f"serving version {predictor.version or predictor.model_path}"
+    )
+    return report
+
+
+def print_report(reports, wall_seconds: float):
+    print(f"{'model':<12}{'threads':>8}{'wall s':>9}{'peak MB':>9}{'accuracy':>10}{'best it':>9}")
+    for report in reports:
+        accuracy = report.get('accuracy')
+        best_iteration = report.get('best_iteration')
+        peak_rss_mb = report['peak_rss_mb']
+        print(
+            f"{report['model']:<12}{report['n_jobs']:>8}{report['wall_seconds']:>9.2f}"
+            f"{(f'{peak_rss_mb:.1f}' if peak_rss_mb is not None else '-'):>9}"
+            f"{(f'{accuracy:.4f}' if accuracy is not None else '-'):>10}"
+            f"{(best_iteration if best_iteration is not None else '-'):>9}"
+        )
+    for report in reports:
+        print(f"{report['model']} classes: {report['classes']}")
+        version = f" (version {report['version']})" if report['version'] else ''
+        print(f"{report['model']} saved to: {report['artifact_path']}{version}")
+    print(f"Total wall-clock time: {wall_seconds:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the crop and fertilizer XGBoost models.')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODEL_BUILDERS), default=['crop', 'fertilizer'])
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='total XGBoost threads, split evenly between concurrently trained models')
+    parser.add_argument('--sequential', action='store_true',
+                        help='train one model at a time, each using every thread')
+    parser.add_argument('--tree-method', default='hist')
+    parser.add_argument('--validation-fraction', type=float, default=0.2,
+                        help='holdout share used for accuracy and early stopping, after which the '
+                             'saved model is refit on all rows (0 disables)')
+    parser.add_argument('--early-stopping-rounds', type=int, default=None)
+    parser.add_argument('--stream', action='store_true',
+                        help='train from the CSV chunk by chunk through an external-memory QuantileDMatrix '
+                             'instead of loading it, for datasets larger than RAM')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='CSV rows per chunk with --stream')
+    parser.add_argument('--synthetic-samples', type=int, default=2200,
+                        help='rows to generate when Data/Crop_recommendation.csv is missing')
+    parser.add_argument('--model-format', choices=['ubj', 'joblib'], default='ubj',
+                        help='artifact format: native XGBoost UBJSON with a JSON sidecar, or a joblib pickle')
+    parser.add_argument('--incremental', action='store_true',
+                        help='continue boosting the crop model on predictions logged since the last checkpoint')
+    parser.add_argument('--incremental-rounds', type=int, default=20)
+    args = parser.parse_args(argv)
 
-def main(force_retrain: bool = True):
-    # Train crop recommendation model on Data/Crop_recommendation.csv
-    crop_model = CropPredictor(force_retrain=force_retrain)
-    print("Crop model trained. Classes:", list(crop_model.label_encoder.classes_))
+    if args.incremental:
+        return run_incremental(args.incremental_rounds, args.jobs, args.model_format)
 
-    # Train fertilizer soil-to-crop model on Data/fertilizer.csv
-    fert_model = FertilizerCropClassifier(force_retrain=force_retrain)
-    print("Fertilizer model trained. Classes:", list(fert_model.label_encoder.classes_))
+    train_options = {
+        'tree_method': args.tree_method,
+        'validation_fraction': args.validation_fraction,
+        'early_stopping_rounds': args.early_stopping_rounds,
+        'synthetic_samples': args.synthetic_samples,
+        'stream': args.stream,
+        'chunksize': args.chunk_size,
+        'model_format': args.model_format,
+    }
 
-    # Model artifacts are stored under instance/
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    print("Saved models in:", os.path.join(base_dir, "instance"))
+    started = time.perf_counter()
+    reports = run_pipeline(args.models, train_options, args.jobs, sequential=args.sequential)
+    print_report(reports, time.perf_counter() - started)
+    return reports
 
 
 if __name__ == "__main__":
-    main(force_retrain=True)
+    main()
@@ -0,0 +1,342 @@
+"""Compile trained XGBoost boosters into flat NumPy arrays and evaluate them.
+
+The exporter walks the booster's JSON dump once and lays every tree out in
+shared node arrays (feature index, threshold, children, default direction,
+leaf value).  ``CompiledForest`` then scores a whole batch against all trees
+at once with NumPy gathers, so serving only needs NumPy: no xgboost runtime,
+no DMatrix construction and no per-call wrapper overhead.
+
+``NativeBooster`` is the middle ground for models stored in XGBoost's native
+UBJSON format: a bare ``Booster`` scored through ``inplace_predict``, with the
+same probabilities as ``XGBClassifier.predict_proba`` minus the sklearn layer.
+
+Usage:
+    python tree_engine.py                  # export both models under instance/
+    python tree_engine.py --model crop     # export only the crop model
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+FOREST_ARRAYS = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'roots', 'tree_group')
+
+
+class CompiledForest:
+    """Vectorized evaluator for a compiled gradient-boosted tree ensemble."""
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, tree_group,
+                 base_margin, objective, max_depth, classes=None, feature_names=None, extra=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.tree_group = tree_group
+        self.base_margin = np.asarray(base_margin, dtype=np.float64)
+        self.objective = objective
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes) if classes is not None else None
+        self.feature_names = list(feature_names) if feature_names else None
+        self.extra = extra or {}
+        self.n_groups = len(self.base_margin)
+        # Summing leaf values per output group is a single matrix product
+        self._group_matrix = np.zeros((len(roots), self.n_groups), dtype=np.float64)
+        self._group_matrix[np.arange(len(roots)), tree_group] = 1.0
+
+    def _leaf_values(self, X):
+        n_rows, n_features = X.shape
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+        # Leaves point at themselves, so a fixed number of steps settles every tree
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_left = x < self.threshold.take(nodes)
+            if has_missing:
+                go_left |= np.isnan(x) & self.default_left.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+        return self.value.take(nodes)
+
+    def predict_margin(self, X, chunk_size=256):
+        """Return raw per-group margins for an N×F feature matrix."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        margins = np.empty((X.shape[0], self.n_groups), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            leaves = self._leaf_values(X[start:start + chunk_size])
+            margins[start:start + chunk_size] = leaves @ self._group_matrix + self.base_margin
+        return margins
+
+    def predict_proba(self, X):
+        """Return class probabilities, matching XGBClassifier.predict_proba."""
+        margins = self.predict_margin(X)
+        if self.objective.startswith('multi:'):
+            margins -= margins.max(axis=1, keepdims=True)
+            np.exp(margins, out=margins)
+            margins /= margins.sum(axis=1, keepdims=True)
+            return margins
+        if self.objective.startswith('binary:'):
+            positive = 1.0 / (1.0 + np.exp(-margins[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        raise ValueError(f"Unsupported objective for probabilities: {self.objective}")
+
+    def predict(self, X):
+        """Return the index of the most likely class for each row."""
+        return self.predict_proba(X).argmax(axis=1)
+
+    def save(self, output_dir):
+        """Write the node arrays as .npy files plus a small meta.json."""
+        os.makedirs(output_dir, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            np.save(os.path.join(output_dir, f'{name}.npy'), getattr(self, name))
+        meta = {
+            'objective': self.objective,
+            'max_depth': self.max_depth,
+            'base_margin': self.base_margin.tolist(),
+            'classes': self.classes_.tolist() if self.classes_ is not None else None,
+            'feature_names': self.feature_names,
+            'extra': self.extra,
+        }
+        with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, input_dir, mmap_mode=None):
+        """Load a compiled forest; ``mmap_mode='r'`` maps the arrays read-only."""
+        with open(os.path.join(input_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(input_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in FOREST_ARRAYS
+        }
+        return cls(
+            **arrays,
+            base_margin=meta['base_margin'],
+            objective=meta['objective'],
+            max_depth=meta['max_depth'],
+            classes=meta['classes'],
+            feature_names=meta['feature_names'],
+            extra=meta.get('extra'),
+        )
+
+
+class NativeBooster:
+    """``predict_proba`` over a bare xgboost Booster loaded from a native .ubj/.json model file."""
+
+    def __init__(self, booster, params=None):
+        self.booster = booster
+        self.params = dict(params or {})
+        self.objective = json.loads(booster.save_config())['learner']['objective']['name']
+        # Early-stopped models predict with their best iteration, as the sklearn wrapper does
+        best_iteration = booster.attr('best_iteration')
+        self.iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+
+    @classmethod
+    def load(cls, path, params=None):
+        import xgboost as xgb
+
+        booster = xgb.Booster()
+        booster.load_model(path)
+        return cls(booster, params)
+
+    def get_booster(self):
+        return self.booster
+
+    def get_xgb_params(self):
+        return dict(self.params)
+
+    def set_params(self, **params):
+        if params.get('n_jobs') is not None:
+            self.booster.set_param('nthread', int(params['n_jobs']))
+            self.params['n_jobs'] = params['n_jobs']
+        return self
+
+    def predict_proba(self, X):
+        if self.objective == 'multi:softmax':
+            from scipy.special import softmax
+
+            margin = self.booster.inplace_predict(
+                X, iteration_range=self.iteration_range, predict_type='margin', validate_features=False
+            )
+            return softmax(margin, axis=1)
+        probabilities = self.booster.inplace_predict(
+            X, iteration_range=self.iteration_range, validate_features=False
+        )
+        if probabilities.ndim == 1:
+            return np.vstack((1 - probabilities, probabilities)).transpose()
+        return probabilities
+
+
+def _tree_depth(left, right):
+    depth = 0
+    frontier = [0]
+    while frontier:
+        frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if frontier:
+            depth += 1
+    return depth
+
+
+def compile_booster(booster, classes=None, feature_names=None, extra=None):
+    """Flatten an xgboost Booster (or sklearn wrapper) into a CompiledForest."""
+    if hasattr(booster, 'get_booster'):
+        booster = booster.get_booster()
+
+    learner = json.loads(booster.save_raw('json'))['learner']
+    gbm = learner['gradient_booster']
+    if gbm['name'] != 'gbtree':
+        raise ValueError(f"Only gbtree boosters can be compiled, got {gbm['name']}")
+    model = gbm['model']
+    objective = learner['objective']['name']
+    n_groups = max(1, int(learner['learner_model_param']['num_class']))
+
+    # Respect early stopping the same way predict_proba does
+    trees = model['trees']
+    tree_info = model['tree_info']
+    best_iteration = booster.attr('best_iteration')
+    iteration_range = (0, 0)
+    if best_iteration is not None:
+        iteration_range = (0, int(best_iteration) + 1)
+        n_trees = int(model['iteration_indptr'][int(best_iteration) + 1])
+        trees = trees[:n_trees]
+        tree_info = tree_info[:n_trees]
+
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        if any(tree['split_type']):
+            raise ValueError("Categorical splits are not supported by the compiled engine")
+        tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+        tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+        n_nodes = len(tree_left)
+        is_leaf = tree_left == -1
+        local = np.arange(n_nodes)
+
+        roots.append(offset)
+        feature.append(np.where(is_leaf, 0, tree['split_indices']))
+        threshold.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        left.append(np.where(is_leaf, local, tree_left) + offset)
+        right.append(np.where(is_leaf, local, tree_right) + offset)
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        # Leaf weights live in split_conditions for leaf nodes
+        value.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float64), 0.0))
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        offset += n_nodes
+
+    forest = CompiledForest(
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.int32),
+        tree_group=np.asarray(tree_info, dtype=np.int32),
+        base_margin=np.zeros(n_groups),
+        objective=objective,
+        max_depth=max_depth,
+        classes=classes,
+        feature_names=feature_names,
+        extra=extra,
+    )
+
+    # The stored base_score encoding varies between xgboost releases, so read the
+    # intercept back from the booster itself: margin minus the summed leaves, over the kept trees.
+    probe = np.zeros((1, int(learner['learner_model_param']['num_feature'])), dtype=np.float32)
+    margin = np.asarray(
+        booster.inplace_predict(
+            probe, iteration_range=iteration_range, predict_type='margin', validate_features=False
+        )
+    ).reshape(1, -1)
+    forest.base_margin = (margin - forest.predict_margin(probe))[0]
+    return forest
+
+
+def export_model(payload, output_dir):
+    """Compile a ``{'model', 'classes', ...}`` payload saved by CropPredictor or FertilizerCropClassifier."""
+    extra = {}
+    if payload.get('crop_stats'):
+        extra['crop_stats'] = payload['crop_stats']
+    forest = compile_booster(
+        payload['model'],
+        classes=payload['classes'],
+        feature_names=payload['model'].get_booster().feature_names,
+        extra=extra,
+    )
+    forest.save(output_dir)
+    return forest, payload['model']
+
+
+def main():
+    import pandas as pd
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    instance_dir = os.path.join(base_dir, 'instance')
+    artifacts = {
+        'crop': ('crop_xgb_model.joblib', 'crop_trees'),
+        'fertilizer': ('fertilizer_xgb_model.joblib', 'fertilizer_trees'),
+    }
+    import joblib
+
+    from artifact_store import ArtifactStore
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', choices=['all', *artifacts], default='all')
+    parser.add_argument('--check-rows', type=int, default=2000,
+                        help='random rows used to verify against predict_proba')
+    parser.add_argument('--tolerance', type=float, default=1e-5)
+    args = parser.parse_args()
+
+    names = list(artifacts) if args.model == 'all' else [args.model]
+    rng = np.random.default_rng(0)
+    for name in names:
+        model_file, output_name = artifacts[name]
+        # Compile the store's current version, falling back to the legacy single-file artifact
+        store = ArtifactStore(os.path.join(instance_dir, 'models', name))
+        model_path = os.path.join(instance_dir, model_file)
+        if store.current_version() is not None:
+            payload = store.load()[0]
+        elif os.path.exists(model_path):
+            payload = joblib.load(model_path)
+        else:
+            print(f"Skipping {name}: no model in {store.root} or {model_path}")
+            continue
+
+        output_dir = os.path.join(instance_dir, output_name)
+        forest, model = export_model(payload, output_dir)
+
+        n_features = model.get_booster().num_features()
+        X = rng.uniform(0, 200, size=(args.check_rows, n_features)).astype(np.float32)
+        # Models fitted on DataFrames validate feature names at predict time
+        frame = pd.DataFrame(X, columns=forest.feature_names) if forest.feature_names else X
+        expected = model.predict_proba(frame)
+        actual = forest.predict_proba(X)
+        max_error = float(np.abs(expected - actual).max())
+
+        single = frame[:1]
+        started = time.perf_counter()
+        for _ in range(200):
+            model.predict_proba(single)
+        xgb_ms = (time.perf_counter() - started) / 200 * 1000
+        started = time.perf_counter()
+        for _ in range(200):
+            forest.predict_proba(X[:1])
+        numpy_ms = (time.perf_counter() - started) / 200 * 1000
+
+        print(f"{name}: {len(forest.roots)} trees, depth {forest.max_depth} -> {output_dir}")
+        print(f"  max |proba difference| = {max_error:.2e} (tolerance {args.tolerance:.0e})")
+        print(f"  single-row latency: xgboost {xgb_ms:.3f} ms, numpy {numpy_ms:.3f} ms")
+        if max_error > args.tolerance:
+            raise SystemExit(f"{name}: compiled model deviates from predict_proba")
+
+
+if __name__ == '__main__':
+    main()
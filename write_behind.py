@@ -0,0 +1,189 @@
+"""Write-behind buffering of history rows (predictions, recommendations, schedules).
+
+Request threads queue plain row dicts and return immediately; a background
+thread bulk-inserts them in one transaction whenever ``max_batch_size`` rows
+are pending or ``flush_interval_ms`` has passed, and once more at interpreter
+exit. ``max_pending`` bounds how many acknowledged rows a crash can lose:
+writers block while that many rows are waiting until the next flush lands.
+``max_pending=0`` makes every write synchronous.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Collect rows per model and hand them to ``flush_fn({model: [row, ...]})`` in batches."""
+
+    def __init__(self, flush_fn, max_batch_size=500, flush_interval_ms=1000.0, max_pending=1000, max_retries=3):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.flush_fn = flush_fn
+        self.max_batch_size = int(max_batch_size)
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.max_pending = max(0, int(max_pending))
+        self.max_retries = int(max_retries)
+        self._pending = []
+        self._in_flight = 0
+        self._attempts = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._owner_pid = None
+        self._closed = False
+
+        self._flushes = 0
+        self._flushed_rows = 0
+        self._failed_flushes = 0
+        self._dropped_rows = 0
+        self._total_flush_seconds = 0.0
+        self._last_flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+        atexit.register(self.close)
+
+    def _ensure_worker(self):
+        # Same fork rule as MicroBatcher: a forked child starts its own thread and
+        # drops rows it inherited, which belong to (and are flushed by) the parent.
+        if self._thread is not None and self._owner_pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is not None and self._owner_pid == os.getpid():
+                return
+            if self._owner_pid is not None and self._owner_pid != os.getpid():
+                self._pending = []
+                self._in_flight = 0
+                self._flush_lock = threading.Lock()
+            self._owner_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def add(self, model, rows):
+        """Queue row dicts for ``model``; blocks only while ``max_pending`` rows are unflushed."""
+        if not rows:
+            return
+        if self.max_pending == 0 or self._closed:
+            self._flush_batch([(model, row) for row in rows])
+            return
+
+        self._ensure_worker()
+        with self._cond:
+            # Wait for room first, so at most max_pending acknowledged rows are ever unflushed
+            while (self._pending or self._in_flight) and not self._closed and \
+                    len(self._pending) + self._in_flight + len(rows) > self.max_pending:
+                self._cond.notify_all()
+                self._cond.wait()
+            self._pending.extend((model, row) for row in rows)
+            self._cond.notify_all()
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        self._in_flight = len(batch)
+        return batch
+
+    def _run(self):
+        flush_at = min(self.max_batch_size, self.max_pending)
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                # Rows wait at most flush_interval after the first one arrives
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._pending) < flush_at and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                batch = self._take()
+            self._flush_with_retry(batch)
+
+    def _flush_with_retry(self, batch):
+        try:
+            self._flush_batch(batch)
+        except Exception:
+            self._attempts += 1
+            if self._attempts > self.max_retries:
+                logger.exception("Dropping %d buffered rows after %d failed flushes", len(batch), self._attempts)
+                self._attempts = 0
+                with self._cond:
+                    self._dropped_rows += len(batch)
+                    self._in_flight = 0
+                    self._cond.notify_all()
+                return
+            logger.exception("Flush of %d buffered rows failed; will retry", len(batch))
+            with self._cond:
+                self._pending[:0] = batch
+                self._in_flight = 0
+            time.sleep(min(self.flush_interval, 1.0))
+        else:
+            self._attempts = 0
+
+    def _flush_batch(self, batch):
+        if not batch:
+            return
+        groups = defaultdict(list)
+        for model, row in batch:
+            groups[model].append(row)
+
+        with self._flush_lock:
+            started = time.perf_counter()
+            try:
+                self.flush_fn(dict(groups))
+            except Exception:
+                with self._cond:
+                    self._failed_flushes += 1
+                raise
+            elapsed = time.perf_counter() - started
+
+        with self._cond:
+            self._flushes += 1
+            self._flushed_rows += len(batch)
+            self._total_flush_seconds += elapsed
+            self._last_flush_seconds = elapsed
+            self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+            self._in_flight = 0
+            self._cond.notify_all()
+
+    def flush(self):
+        """Synchronously write every pending row."""
+        with self._cond:
+            batch = self._take()
+        self._flush_batch(batch)
+
+    def close(self):
+        """Stop the background thread and flush what is left; runs at interpreter exit."""
+        if self._owner_pid is not None and self._owner_pid != os.getpid():
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final write-behind flush failed")
+
+    def stats(self):
+        """Return buffer depth and flush latency metrics."""
+        with self._cond:
+            return {
+                'depth': len(self._pending),
+                'in_flight': self._in_flight,
+                'max_pending': self.max_pending,
+                'max_batch_size': self.max_batch_size,
+                'flush_interval_ms': self.flush_interval * 1000.0,
+                'flushes': self._flushes,
+                'flushed_rows': self._flushed_rows,
+                'failed_flushes': self._failed_flushes,
+                'dropped_rows': self._dropped_rows,
+                'avg_flush_ms': round(self._total_flush_seconds / self._flushes * 1000.0, 3) if self._flushes else 0.0,
+                'last_flush_ms': round(self._last_flush_seconds * 1000.0, 3),
+                'max_flush_ms': round(self._max_flush_seconds * 1000.0, 3),
+            }